@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+已知 item 集合基準測試
+比較監聽器的 Set[str]、處理器的 processed_items dict 與 CompactKnownSet
+在不同歷史 items 數量下的記憶體、查詢時間與實際誤判率
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from datetime import datetime
+from typing import List, Dict, Any, Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from project_monitor.known_items import CompactKnownSet
+
+
+def _item_ids(count: int, prefix: str = 'PVTI_lADOBenchmark') -> List[str]:
+    """產生與 GraphQL node id 長度相近的 item ID"""
+    return [f"{prefix}{index:012d}" for index in range(count)]
+
+
+def _measure_build(build: Callable[[], Any]) -> (Any, int):
+    """建立資料結構並回傳 tracemalloc 量到的配置大小"""
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    structure = build()
+    size = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return structure, size
+
+
+def _lookup_us(structure: Any, keys: List[str]) -> float:
+    """平均每次查詢的微秒數"""
+    start = time.perf_counter()
+    for key in keys:
+        key in structure
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def run(size: int, lookups: int, recent: int, error_rate: float, max_mb: float) -> List[Dict[str, Any]]:
+    """量測單一大小"""
+    # ID 字串在三種結構間共用，只量測結構本身的額外配置
+    ids = _item_ids(size)
+    hits = ids[::max(1, size // lookups)][:lookups]
+    misses = _item_ids(lookups, prefix='PVTI_lADOMissing')
+    now = datetime.now()
+
+    def build_compact():
+        known = CompactKnownSet(recent_size=recent, error_rate=error_rate, max_bytes=int(max_mb * 1024 * 1024))
+        known.update(ids)
+        return known
+
+    candidates = {
+        'set (監聽器)': lambda: set(ids),
+        'dict (processed_items)': lambda: {item_id: now for item_id in ids},
+        'CompactKnownSet': build_compact
+    }
+
+    # 字串本身的大小（set 與 dict 需要一直持有所有字串，CompactKnownSet 只持有近期視窗）
+    string_bytes = sum(sys.getsizeof(item_id) for item_id in ids)
+    results = []
+    for name, build in candidates.items():
+        structure, size_bytes = _measure_build(build)
+        if name == 'CompactKnownSet':
+            held = sum(sys.getsizeof(item_id) for item_id in structure.recent)
+        else:
+            held = string_bytes
+        false_positives = sum(1 for key in misses if key in structure)
+        result = {
+            'name': name,
+            'items': size,
+            'memory_mb': round((size_bytes + held) / 1024 / 1024, 2),
+            'hit_us': round(_lookup_us(structure, hits), 3),
+            'miss_us': round(_lookup_us(structure, misses), 3),
+            'false_positive_rate': false_positives / len(misses)
+        }
+        print(f"   {name:<24} {result['memory_mb']:>9.2f} MB | hit {result['hit_us']:>7.3f} µs | "
+              f"miss {result['miss_us']:>7.3f} µs | 誤判 {result['false_positive_rate']:.2e}")
+        results.append(result)
+        del structure
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='比較已知 item 集合的記憶體與查詢時間')
+    parser.add_argument('--sizes', default='10000,100000,500000', help='歷史 items 數量（逗號分隔）')
+    parser.add_argument('--lookups', type=int, default=20000, help='每項查詢次數')
+    parser.add_argument('--recent', type=int, default=10000, help='CompactKnownSet 的精確視窗大小')
+    parser.add_argument('--error-rate', type=float, default=1e-6)
+    parser.add_argument('--max-mb', type=float, default=8)
+    parser.add_argument('--json', dest='json_output', help='將結果寫入 JSON 檔案')
+    args = parser.parse_args()
+
+    results = []
+    for size in [int(value) for value in args.sizes.split(',')]:
+        print(f"🏁 {size:,} 個歷史 items（查詢 {args.lookups:,} 次）")
+        results.extend(run(size, args.lookups, args.recent, args.error_rate, args.max_mb))
+
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump({'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+process_project_items.py 冷啟動基準測試
+量測 GitHub Actions 每次觸發時「沒有新任務」快速路徑的啟動成本
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import statistics
+import subprocess
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import List, Dict, Any
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts', 'process_project_items.py')
+
+# 假的水位線探測回應，與預先寫入的快取一致，讓處理器走快速路徑
+PROBE_RESPONSE = {
+    'data': {
+        'repository': {
+            'projectV2': {
+                'items': {
+                    'totalCount': 42,
+                    'nodes': [{'id': 'PVTI_benchmark'}]
+                }
+            }
+        }
+    }
+}
+
+
+class _ProbeHandler(BaseHTTPRequestHandler):
+    """回應水位線探測的本地 GraphQL 替身"""
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        body = json.dumps(PROBE_RESPONSE).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _time_command(cmd: List[str], runs: int, env: Dict[str, str] = None, cwd: str = None) -> List[float]:
+    """重複執行指令並回傳每次的牆鐘時間（毫秒）"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, env=env, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _summarize(name: str, samples: List[float]) -> Dict[str, Any]:
+    """計算並印出統計值"""
+    result = {
+        'name': name,
+        'min_ms': round(min(samples), 1),
+        'median_ms': round(statistics.median(samples), 1),
+        'max_ms': round(max(samples), 1)
+    }
+    print(f"   {name:<28} min {result['min_ms']:>7.1f} ms | median {result['median_ms']:>7.1f} ms | max {result['max_ms']:>7.1f} ms")
+    return result
+
+
+def _imports_requests(env: Dict[str, str], cwd: str) -> bool:
+    """以 -X importtime 檢查快速路徑是否載入了 requests"""
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', SCRIPT_PATH],
+        env=env, cwd=cwd, capture_output=True, text=True, check=False
+    )
+    return any(line.rstrip().endswith('| requests') for line in process.stderr.splitlines())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='量測 process_project_items.py 的冷啟動成本')
+    parser.add_argument('--runs', type=int, default=10, help='每個項目的執行次數')
+    parser.add_argument('--json', dest='json_output', help='將結果寫入 JSON 檔案，方便追蹤每次執行的變化')
+    args = parser.parse_args()
+
+    server = HTTPServer(('127.0.0.1', 0), _ProbeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    workdir = tempfile.mkdtemp(prefix='processor_startup_')
+    try:
+        # 預先寫入與探測回應一致的快取，模擬「沒有新任務」的情境
+        cache = {
+            'project_fields': {
+                'project_id': 'PVT_benchmark',
+                'status_field_id': 'PVTSSF_benchmark',
+                'review_option_id': 'review',
+                'backlog_option_id': 'backlog',
+                'cached_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+            },
+            'watermark': {
+                'total_count': 42,
+                'last_item_id': 'PVTI_benchmark'
+            }
+        }
+        with open(os.path.join(workdir, 'project_cache.json'), 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+
+        env = dict(os.environ)
+        env.update({
+            'GITHUB_TOKEN': 'benchmark-token',
+            'GITHUB_GRAPHQL_URL': f'http://127.0.0.1:{server.server_port}/graphql',
+            'GITHUB_OUTPUT': os.path.join(workdir, 'github_output')
+        })
+
+        print(f"🏁 冷啟動基準測試（每項 {args.runs} 次）")
+        results = [
+            _summarize('python 直譯器基準', _time_command([sys.executable, '-c', 'pass'], args.runs)),
+            _summarize('import requests', _time_command([sys.executable, '-c', 'import requests'], args.runs)),
+            _summarize('快速路徑（無新任務）', _time_command([sys.executable, SCRIPT_PATH], args.runs, env=env, cwd=workdir))
+        ]
+
+        loads_requests = _imports_requests(env, workdir)
+        print(f"   快速路徑是否載入 requests: {'是 ⚠️' if loads_requests else '否 ✅'}")
+
+        if args.json_output:
+            with open(args.json_output, 'w', encoding='utf-8') as f:
+                json.dump({'results': results, 'fast_path_imports_requests': loads_requests}, f, ensure_ascii=False, indent=2)
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
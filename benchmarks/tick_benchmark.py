@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+監聽器每次檢查的 CPU 開銷基準測試
+以 100、1 萬、10 萬個 items 的合成 Project 量測 check_for_new_items 中不涉及網路的熱點：
+_diff_items（建立 current_items 與已知 items 的差集）、_backlog_new_items、_is_item_in_backlog 掃描、
+自定義字段格式化，以及 send_discord_notification 建立 Discord embed（不實際送出），
+並以 tracemalloc 記錄配置量。所有項目都直接呼叫監聽器本身的方法
+
+可以把結果存成 JSON，之後以 --compare 比較，任一項的中位數變慢超過 --tolerance 時以非零狀態結束。
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+import tracemalloc
+from contextlib import redirect_stdout
+from typing import List, Dict, Any, Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from github_project_monitor import GitHubProjectMonitor
+from project_monitor.known_items import known_item_set
+
+BACKLOG_OPTION_ID = 'opt_backlog'
+STATUS_OPTIONS = [BACKLOG_OPTION_ID, 'opt_ready', 'opt_in_progress', 'opt_review', 'opt_done']
+
+
+class _Response:
+    status_code = 204
+
+
+class _RecordingHttp:
+    """取代 HttpClient，只保留最後一個 payload，不送出請求"""
+
+    def __init__(self):
+        self.last_payload = None
+
+    def post(self, consumer: str, url: str, **kwargs) -> _Response:
+        self.last_payload = kwargs.get('json')
+        return _Response()
+
+
+def synthetic_board(size: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    產生與 GraphQL 回應結構相同的 items
+
+    約三分之一是 Draft Issue，其餘為 Issue / Pull Request；每個 item 有狀態、優先度、
+    估計點數與 iteration 字段，約 5% 沒有狀態字段。
+    """
+    rng = random.Random(seed)
+    words = ['monitor', 'project', 'backlog', 'review', 'discord', 'claude', 'task', 'queue', 'status', 'field']
+    items = []
+    for index in range(size):
+        body = ' '.join(rng.choice(words) for _ in range(rng.randint(20, 120)))
+        content = {'title': f"Task {index}: {' '.join(rng.choice(words) for _ in range(6))}", 'body': body}
+        if index % 3:
+            kind = 'pull' if index % 7 == 0 else 'issues'
+            content.update({'number': index, 'state': 'OPEN', 'url': f"https://github.com/owner/repo/{kind}/{index}"})
+        nodes = [
+            {'text': f"{rng.randint(1, 13)}", 'field': {'name': 'Estimate'}},
+            {'name': rng.choice(['P0', 'P1', 'P2']), 'optionId': 'opt_priority', 'field': {'name': 'Priority'}},
+            {'title': 'Sprint 12', 'field': {'name': 'Iteration'}},
+            {}
+        ]
+        if rng.random() >= 0.05:
+            status = rng.choice(STATUS_OPTIONS)
+            nodes.insert(rng.randint(0, len(nodes)), {'name': status, 'optionId': status, 'field': {'name': 'Status'}})
+        items.append({
+            'id': f"PVTI_lADOBenchmark{index:012d}",
+            'createdAt': f"2026-10-{1 + index % 28:02d}T{index % 24:02d}:00:00Z",
+            'updatedAt': '2026-10-19T00:00:00Z',
+            'content': content,
+            'fieldValues': {'nodes': nodes}
+        })
+    return items
+
+
+def _monitor() -> GitHubProjectMonitor:
+    """不連線 GitHub 的監聽器，只設定被量測的方法需要的屬性"""
+    monitor = GitHubProjectMonitor.__new__(GitHubProjectMonitor)
+    monitor.owner = 'owner'
+    monitor.repo = 'repo'
+    monitor.backlog_option_id = BACKLOG_OPTION_ID
+    monitor.discord_webhook_url = 'https://discord.invalid/webhook'
+    monitor.http = _RecordingHttp()
+    return monitor
+
+
+def _measure(func: Callable[[], Any], operations: int, repeat: int) -> Dict[str, Any]:
+    """
+    重複執行並回傳每次操作的時間（微秒）與 tracemalloc 量到的配置量
+
+    計時與記憶體量測分開進行，tracemalloc 的開銷不計入時間。
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) / operations * 1e6)
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    result = func()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {
+        'operations': operations,
+        'min_us': round(min(samples), 3),
+        'median_us': round(statistics.median(samples), 3),
+        'retained_kb': round((current - baseline) / 1024, 1),
+        'peak_kb': round((peak - baseline) / 1024, 1)
+    }
+
+
+def run(size: int, new_ratio: float, notifications: int, repeat: int) -> List[Dict[str, Any]]:
+    """量測單一大小"""
+    monitor = _monitor()
+    items = synthetic_board(size)
+
+    # 模擬穩定狀態：大部分 items 已知，new_ratio 比例是這次新出現的
+    monitor.known_items = known_item_set()
+    new_count = max(1, int(size * new_ratio))
+    monitor.known_items.update(item['id'] for item in items[:size - new_count])
+    current_items, new_item_ids = monitor._diff_items(items)
+    notify_items = items[:min(size, notifications)]
+
+    def notify_all():
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            for item in notify_items:
+                monitor.send_discord_notification(item, True, '0:03:12', status_updated=True)
+        return monitor.http.last_payload
+
+    cases = {
+        'diff_items': (lambda: monitor._diff_items(items), size),
+        'backlog_new_items': (lambda: monitor._backlog_new_items(current_items, new_item_ids), len(new_item_ids)),
+        'is_item_in_backlog': (lambda: [monitor._is_item_in_backlog(item) for item in items], size),
+        'custom_fields': (lambda: [monitor._format_custom_fields(item) for item in items], size),
+        'discord_embed': (notify_all, len(notify_items))
+    }
+
+    results = []
+    for name, (func, operations) in cases.items():
+        result = {'name': name, 'items': size, **_measure(func, operations, repeat)}
+        total_ms = result['median_us'] * operations / 1000
+        print(f"   {name:<20} {result['median_us']:>9.3f} µs/op (min {result['min_us']:>9.3f}) × {operations:>7,} "
+              f"= {total_ms:>9.2f} ms | 配置 {result['retained_kb']:>9.1f} KB (峰值 {result['peak_kb']:>9.1f} KB)")
+        results.append(result)
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> List[str]:
+    """回傳中位數比基準慢超過 tolerance 的項目"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(entry['name'], entry['items']): entry for entry in json.load(f)['results']}
+    regressions = []
+    for result in results:
+        previous = baseline.get((result['name'], result['items']))
+        if previous and previous['median_us'] and result['median_us'] > previous['median_us'] * (1 + tolerance):
+            regressions.append(f"{result['name']} @ {result['items']:,}: {previous['median_us']:.3f} → "
+                               f"{result['median_us']:.3f} µs/op (+{result['median_us'] / previous['median_us'] - 1:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='量測監聽器每次檢查的 diff 與通知熱點')
+    parser.add_argument('--sizes', default='100,10000,100000', help='Project items 數量（逗號分隔）')
+    parser.add_argument('--new-ratio', type=float, default=0.01, help='每次檢查新出現的 items 比例')
+    parser.add_argument('--notifications', type=int, default=1000, help='建立 Discord embed 的次數上限')
+    parser.add_argument('--repeat', type=int, default=7, help='每項重複次數（取中位數）')
+    parser.add_argument('--json', dest='json_output', help='將結果寫入 JSON 檔案')
+    parser.add_argument('--compare', help='與先前 --json 的結果比較')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='中位數允許變慢的比例')
+    args = parser.parse_args()
+
+    results = []
+    for size in [int(value) for value in args.sizes.split(',')]:
+        print(f"🏁 {size:,} 個 items（新 items {args.new_ratio:.1%}，重複 {args.repeat} 次）")
+        results.extend(run(size, args.new_ratio, args.notifications, args.repeat))
+
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump({'results': results}, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            print(f"\n⚠️ {len(regressions)} 項比基準慢超過 {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"   - {line}")
+            sys.exit(1)
+        print(f"\n✅ 沒有比基準慢超過 {args.tolerance:.0%} 的項目")
+
+
+if __name__ == '__main__':
+    main()
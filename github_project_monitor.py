@@ -6,12 +6,35 @@ GitHub Project Item 監聽器
 
 import os
 import time
+import socket
+import threading
 import subprocess
 from datetime import datetime
-from typing import Set, Dict, Any
-import requests
+from typing import Set, Dict, Any, List, Optional, Tuple
 from dotenv import load_dotenv
 
+from project_monitor.admission import AdmissionController, author_of, DEFER, DROP
+from project_monitor.backends import execution_backend
+from project_monitor.batching import TaskBatcher, parse_batch_results
+from project_monitor.dedupe import DedupeIndex
+from project_monitor.durations import DurationHistory, task_key, labels_from_item
+from project_monitor import events
+from project_monitor.events import EventLog, created_timestamp
+from project_monitor.executor import HostAwareExecutor
+from project_monitor.health import HealthMonitor
+from project_monitor.known_items import known_item_set
+from project_monitor.profiling import TickProfiler
+from project_monitor.prompt import PromptBuilder, format_prompt_metrics
+from project_monitor.repo import RepoManager, GitError
+from project_monitor.result_cache import ResultCache, prompt_hash
+from project_monitor.resources import ResourceLedger, format_resources
+from project_monitor.retry import HttpClient
+from project_monitor.scan import ProjectScanner
+from project_monitor.state import state_path, load_json, save_json
+from project_monitor.task_queue import TaskQueue, LINKED, SUCCEEDED
+from project_monitor.tracing import Tracer
+from project_monitor.usage import UsageLedger, parse_cli_output, format_usage
+
 # 載入環境變數
 load_dotenv()
 
@@ -42,10 +65,16 @@ class GitHubProjectMonitor:
         }
         
         # GraphQL API endpoint
-        self.graphql_url = 'https://api.github.com/graphql'
+        self.graphql_url = os.getenv('GITHUB_GRAPHQL_URL', 'https://api.github.com/graphql')
+        
+        # 所有 GraphQL 與 Discord 請求共用的重試 client
+        self.http = HttpClient(consumer='monitor')
+        
+        # Project items 掃描（分頁；SCAN_SHARDS 設定時平行分片）
+        self.scanner = ProjectScanner.from_env(self.http, self.graphql_url, self.headers, owner, repo, project_number)
         
-        # 儲存已知的 item IDs
-        self.known_items: Set[str] = set()
+        # 儲存已知的 item IDs（KNOWN_ITEMS_MODE=compact 時使用固定記憶體上限的 Bloom filter）
+        self.known_items = known_item_set()
         self.first_run = True
         
         # Claude Code CLI 設定
@@ -55,14 +84,97 @@ class GitHubProjectMonitor:
         # Claude Code CLI 是否要求 commit
         self.request_commit = os.getenv('REQUEST_COMMIT', 'true').lower() == 'true'
         
-        # Discord webhook URL
-        self.discord_webhook_url = 'https://discord.com/api/webhooks/1404465505888108664/GBq0HXWkrAOwGPE2yEprpZxiAbj6D3oaHs9qQTSSYNhDXLrS06CS2HErQojYj1nE8ozt'
+        # Claude CLI 輸出格式（json 時可取得 token 用量與費用，text 為原本的純文字輸出）
+        self.claude_output_format = os.getenv('CLAUDE_OUTPUT_FORMAT', 'json').lower()
+        
+        # 提示詞壓縮：合併重複的行、截斷過長的內容，過大的內容存成檔案讓 Claude 讀取
+        self.prompt_builder = PromptBuilder.from_env(os.path.abspath(state_path('attachments')))
+        
+        # REPO_MANAGED=true 時由監聽器同步工作目錄並自行 commit/push
+        self.repo_manager = RepoManager.from_env(self.project_dir)
+        
+        # 任務批次設定（預設每批一個任務，與逐一執行相同）
+        self.batcher = TaskBatcher(
+            max_tasks=int(os.getenv('BATCH_MAX_TASKS', '1')),
+            max_prompt_chars=int(os.getenv('BATCH_MAX_PROMPT_CHARS', '20000')),
+            max_wait_seconds=float(os.getenv('BATCH_MAX_WAIT_SECONDS', '0'))
+        )
+        
+        # 持久化任務佇列，監聽器重啟後可以恢復未完成的任務
+        # 多個節點共用 TASK_QUEUE_DB 時，每個任務只會由取得租約的節點執行
+        self.node_id = os.getenv('MONITOR_NODE_ID') or socket.gethostname()
+        self.task_queue = TaskQueue(
+            os.getenv('TASK_QUEUE_DB') or state_path('task_queue.db'),
+            max_attempts=int(os.getenv('TASK_MAX_ATTEMPTS', '3'))
+        )
+        self.task_lease_seconds = float(os.getenv('TASK_LEASE_SECONDS', '120'))
+        
+        # Item 生命週期事件記錄（EVENT_LOG_DIR 設為空字串可停用）
+        self.events = EventLog.from_env('monitor', state_path('events'), self.node_id)
+        self.heartbeat_seconds = float(os.getenv('TASK_HEARTBEAT_SECONDS', str(self.task_lease_seconds / 3)))
+        self._heartbeat_thread = None
+        
+        # 任務准入控制：Backlog 大量湧入時限制佇列長度、每小時任務數與每位建立者的配額
+        # 被延後的 item 不會記為已知，之後的檢查週期會再次嘗試
+        self.admission = AdmissionController.from_env()
+        self.deferred_path = state_path('deferred_items.json')
+        self.deferred_items: Set[str] = set(load_json(self.deferred_path, []))
+        
+        # 依主機資源決定是否啟動新執行的執行器（EXECUTOR_MAX_WORKERS 控制平行數）
+        self.executor = HostAwareExecutor.from_env()
+        
+        # 執行時間歷史，用來依任務大小與標籤計算每個任務的逾時
+        self.duration_history = DurationHistory.from_env(state_path('durations.db'))
+        
+        # 每個任務的 token 用量與費用
+        self.usage_ledger = UsageLedger(state_path('usage.db'))
+        
+        # 提示詞與基準 commit 都沒有變動時直接套用上次成功執行的 patch（需要 REPO_MANAGED=true）
+        self.result_cache = ResultCache.from_env(state_path('result_cache.db'))
+        
+        # 執行期間取樣 Claude 程序樹的 CPU、記憶體與 I/O（RESOURCE_SAMPLE_SECONDS=0 可停用）
+        self.resource_ledger = ResourceLedger(state_path('resources.db'))
+        self.resource_sample_seconds = float(os.getenv('RESOURCE_SAMPLE_SECONDS', '1'))
+        self.resource_memory_bound_mb = float(os.getenv('RESOURCE_MEMORY_BOUND_MB', os.getenv('EXECUTOR_RUN_MEMORY_MB', '2048')))
+        
+        # Claude 的執行後端（EXECUTOR_BACKEND: subprocess / process_pool / job_server）
+        # 在遠端 worker 執行時不依本機負載決定准入，只限制同時執行數量
+        self.backend = execution_backend(self.executor, self.resource_sample_seconds, self.resource_memory_bound_mb)
+        self.executor.host_checks = not self.backend.remote
+        
+        # 各階段 span 追蹤（TRACE_FILE 設為空字串可停用）
+        self.tracer = Tracer(os.getenv('TRACE_FILE', state_path('traces.jsonl')))
+        
+        # 線上剖析（SIGUSR1 或觸發檔案啟動）
+        self.profiler = TickProfiler.from_env()
+        
+        # 健康檢查與偵測延遲 SLO（HEALTH_PORT 設定時提供 HTTP 端點），超過 SLO 時發送 Discord 警報
+        self.health = HealthMonitor.from_env()
+        self.health.task_queue = self.task_queue
+        self.health.executor = self.executor
+        self.health.alert = self.send_alert_notification
+        
+        # 本程序正在執行或收尾中的 item，避免與中斷恢復流程重複處理
+        self._active_items: Set[str] = set()
+        self._active_lock = threading.Lock()
+        
+        # 重複任務索引（相似度門檻為 0 時只比對完全相同的內容），與任務佇列共用資料庫，多節點時判斷一致
+        self.dedupe_index = DedupeIndex(
+            self.task_queue.path,
+            legacy_path=state_path('dedupe_index.json'),
+            similarity_threshold=float(os.getenv('DEDUPE_SIMILARITY_THRESHOLD', '0')),
+            max_entries=int(os.getenv('DEDUPE_MAX_ENTRIES', '5000'))
+        )
+        
+        # Discord webhook URL（可用 DISCORD_WEBHOOK_URL 覆寫，例如指向重播伺服器）
+        self.discord_webhook_url = os.getenv('DISCORD_WEBHOOK_URL') or 'https://discord.com/api/webhooks/1404465505888108664/GBq0HXWkrAOwGPE2yEprpZxiAbj6D3oaHs9qQTSSYNhDXLrS06CS2HErQojYj1nE8ozt'
         
         # Project 欄位資訊（將在初始化時獲取）
         self.project_id = None
         self.status_field_id = None
         self.review_option_id = None
         self.backlog_option_id = None
+        self.status_options: Dict[str, str] = {}
         
         # 初始化時獲取 Project 欄位資訊
         self._initialize_project_fields()
@@ -106,7 +218,8 @@ class GitHubProjectMonitor:
                 'projectNumber': self.project_number
             }
             
-            response = requests.post(
+            response = self.http.post(
+                'graphql_query',
                 self.graphql_url,
                 headers=self.headers,
                 json={'query': query, 'variables': variables}
@@ -131,6 +244,7 @@ class GitHubProjectMonitor:
                     self.status_field_id = field.get('id')
                     options = field.get('options', [])
                     for option in options:
+                        self.status_options[option.get('name')] = option.get('id')
                         if option.get('name') == 'Review':
                             self.review_option_id = option.get('id')
                         elif option.get('name') == 'Backlog':
@@ -163,6 +277,11 @@ class GitHubProjectMonitor:
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 缺少必要的 Project 欄位資訊，無法更新狀態")
             return False
         
+        option_id = self.status_options.get(status)
+        if not option_id:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ❌ Status 欄位沒有 {status} 選項，無法更新狀態")
+            return False
+        
         try:
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 📝 正在更新 Item 狀態為 {status}...")
             
@@ -189,10 +308,11 @@ class GitHubProjectMonitor:
                 'projectId': self.project_id,
                 'itemId': item_id,
                 'fieldId': self.status_field_id,
-                'optionId': self.review_option_id
+                'optionId': option_id
             }
             
-            response = requests.post(
+            response = self.http.post(
+                'graphql_mutation',
                 self.graphql_url,
                 headers=self.headers,
                 json={'query': mutation, 'variables': variables}
@@ -217,86 +337,9 @@ class GitHubProjectMonitor:
     
     def get_project_items(self) -> Dict[str, Any]:
         """
-        透過 GraphQL API 獲取 Project 的所有 Items
+        透過 GraphQL API 獲取 Project 的所有 Items（分頁，設定 SCAN_SHARDS 時平行分片掃描）
         """
-        query = """
-        query($owner: String!, $repo: String!, $projectNumber: Int!) {
-          repository(owner: $owner, name: $repo) {
-            projectV2(number: $projectNumber) {
-              title
-              items(first: 100) {
-                nodes {
-                  id
-                  createdAt
-                  updatedAt
-                  content {
-                    ... on Issue {
-                      title
-                      number
-                      state
-                      url
-                    }
-                    ... on PullRequest {
-                      title
-                      number
-                      state
-                      url
-                    }
-                    ... on DraftIssue {
-                      title
-                      body
-                    }
-                  }
-                  fieldValues(first: 10) {
-                    nodes {
-                      ... on ProjectV2ItemFieldTextValue {
-                        text
-                        field {
-                          ... on ProjectV2Field {
-                            name
-                          }
-                        }
-                      }
-                      ... on ProjectV2ItemFieldSingleSelectValue {
-                        name
-                        optionId
-                        field {
-                          ... on ProjectV2SingleSelectField {
-                            name
-                          }
-                        }
-                      }
-                    }
-                  }
-                }
-                totalCount
-              }
-            }
-          }
-        }
-        """
-        
-        variables = {
-            'owner': self.owner,
-            'repo': self.repo,
-            'projectNumber': self.project_number
-        }
-        
-        response = requests.post(
-            self.graphql_url,
-            headers=self.headers,
-            json={'query': query, 'variables': variables}
-        )
-        
-        if response.status_code != 200:
-            raise Exception(f"GraphQL query failed: {response.status_code} - {response.text}")
-        
-        data = response.json()
-        
-        if 'errors' in data:
-            raise Exception(f"GraphQL errors: {data['errors']}")
-        
-        return data.get('data', {}).get('repository', {}).get('projectV2', {})
+        return self.scanner.scan()
     
     def _is_item_in_backlog(self, item: Dict[str, Any]) -> bool:
         """
@@ -322,23 +365,57 @@ class GitHubProjectMonitor:
         # 如果沒有找到狀態欄位，預設為 True（可能是新創建的 item）
         return True
     
+    def _diff_items(self, items: List[Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], Set[str]]:
+        """
+        依 ID 整理這次掃描到的 items，並找出不在已知 items 中的新 ID
+        
+        Returns:
+            Tuple[Dict[str, Dict[str, Any]], Set[str]]: item ID -> item 與新的 item IDs
+        """
+        current_items = {item['id']: item for item in items if item}
+        new_item_ids = {item_id for item_id in current_items if item_id not in self.known_items}
+        return current_items, new_item_ids
+    
+    def _backlog_new_items(self, current_items: Dict[str, Dict[str, Any]], new_item_ids: Set[str]) -> List[str]:
+        """新 items 中處於 Backlog 狀態的 ID，依建立時間排序"""
+        return sorted(
+            (item_id for item_id in new_item_ids if self._is_item_in_backlog(current_items[item_id])),
+            key=lambda item_id: current_items[item_id].get('createdAt') or ''
+        )
+    
+    @staticmethod
+    def _format_custom_fields(item: Dict[str, Any]) -> List[str]:
+        """將 item 有值的自定義字段格式化為「名稱: 值」"""
+        custom_fields = []
+        for field in item.get('fieldValues', {}).get('nodes', []):
+            if field:
+                field_name = field.get('field', {}).get('name', '')
+                field_value = field.get('text') or field.get('name', '')
+                if field_name and field_value:
+                    custom_fields.append(f"{field_name}: {field_value}")
+        return custom_fields
+    
     def check_for_new_items(self):
         """
         檢查是否有新的 Items 被創建
         """
         try:
-            project_data = self.get_project_items()
+            with self.tracer.span('poll') as span:
+                project_data = self.get_project_items()
+                span['attributes']['items.count'] = len((project_data or {}).get('items', {}).get('nodes', []))
             
             if not project_data:
                 print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ❌ 無法獲取 Project 數據")
+                self.health.record_poll(False, '無法獲取 Project 數據')
                 return
             
             items = project_data.get('items', {}).get('nodes', [])
-            current_items = {item['id']: item for item in items if item}
+            current_items, new_item_ids = self._diff_items(items)
             
             # 第一次執行時，記錄所有現有的 items
+            # 上次被延後的 item 不算已知，重新啟動後仍會再次嘗試
             if self.first_run:
-                self.known_items = set(current_items.keys())
+                self.known_items.update(item_id for item_id in current_items if item_id not in self.deferred_items)
                 project_title = project_data.get('title', 'Unknown')
                 print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🚀 開始監聽 Project: {project_title}")
                 print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 📊 目前有 {len(self.known_items)} 個 items")
@@ -348,27 +425,28 @@ class GitHubProjectMonitor:
                 self.first_run = False
                 return
             
-            # 檢查新的 items
-            new_item_ids = set(current_items.keys()) - self.known_items
+            # 過濾出只有 Backlog 狀態的新 items（依建立時間排序，准入控制時先建立的先接受）
+            backlog_new_items = self._backlog_new_items(current_items, new_item_ids)
             
-            # 過濾出只有 Backlog 狀態的新 items
-            backlog_new_items = []
-            for item_id in new_item_ids:
-                item = current_items[item_id]
-                if self._is_item_in_backlog(item):
-                    backlog_new_items.append(item_id)
+            # 已經不在 Backlog 或已被刪除的延後 item 不再追蹤
+            deferred_before = set(self.deferred_items)
+            self.deferred_items &= set(backlog_new_items)
+            fresh_items = [item_id for item_id in backlog_new_items if item_id not in self.deferred_items]
+            overflow: Dict[str, int] = {}
             
             if backlog_new_items:
-                print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🆕 發現 {len(backlog_new_items)} 個新的 Backlog Item!")
-                if len(new_item_ids) > len(backlog_new_items):
-                    print(f"   ℹ️ （忽略了 {len(new_item_ids) - len(backlog_new_items)} 個非 Backlog 狀態的 items）")
-                print("=" * 50)
+                if fresh_items:
+                    print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🆕 發現 {len(fresh_items)} 個新的 Backlog Item!")
+                    if len(new_item_ids) > len(backlog_new_items):
+                        print(f"   ℹ️ （忽略了 {len(new_item_ids) - len(backlog_new_items)} 個非 Backlog 狀態的 items）")
+                    print("=" * 50)
                 
                 for item_id in backlog_new_items:
                     item = current_items[item_id]
                     content = item.get('content', {})
                     
-                    if content:
+                    # 延後的 item 在前一次已經顯示過詳細資訊
+                    if content and item_id not in self.deferred_items:
                         # 判斷 item 類型
                         if 'number' in content:
                             item_type = 'Issue' if 'pull_request' not in content.get('url', '') else 'Pull Request'
@@ -389,15 +467,7 @@ class GitHubProjectMonitor:
                             print(f"   📝 內容預覽: {body_preview}...")
                         
                         # 顯示自定義字段
-                        field_values = item.get('fieldValues', {}).get('nodes', [])
-                        custom_fields = []
-                        for field in field_values:
-                            if field:
-                                field_name = field.get('field', {}).get('name', '')
-                                field_value = field.get('text') or field.get('name', '')
-                                if field_name and field_value:
-                                    custom_fields.append(f"{field_name}: {field_value}")
-                        
+                        custom_fields = self._format_custom_fields(item)
                         if custom_fields:
                             print("   🏷️  自定義字段:")
                             for field_info in custom_fields:
@@ -405,25 +475,36 @@ class GitHubProjectMonitor:
                         
                         print(f"   📅 創建時間: {item.get('createdAt', 'Unknown')}")
                         print("-" * 30)
-                        
-                        # 執行 Claude Code CLI
+                    
+                    if content:
+                        # 加入持久化任務佇列，稍後由 Claude Code CLI 執行
                         task_content = self.extract_task_content(item)
                         if task_content and task_content != "無法提取任務內容":
-                            print(f"\n🚀 開始執行任務...")
-                            
-                            # 執行 Claude Code (包含自動 commit/push 和 Discord 通知)
-                            claude_success = self.run_claude_cli(task_content, item_id, item)
-                            
-                            if claude_success:
-                                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🎉 任務執行完成")
-                            else:
-                                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 😞 任務執行失敗")
+                            # 先檢查重複，重複任務不會執行，不佔用准入配額
+                            if self._link_if_duplicate(item_id, item, task_content):
+                                continue
+                            admitted, reason = self.admission.check(author_of(item), self.task_queue)
+                            if not admitted:
+                                overflow[reason] = overflow.get(reason, 0) + 1
+                                self._handle_overflow(item_id, item, reason)
+                                continue
+                            self.deferred_items.discard(item_id)
+                            self._trace_detection(item_id, item)
+                            self.task_queue.enqueue(item_id, item, task_content, author=author_of(item))
+                            self.events.emit(events.QUEUED, item_id)
                         else:
                             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 無法提取有效的任務內容，跳過執行")
                 
-                # 更新已知的 items（包括所有新 items，不只是 Backlog）
-                self.known_items.update(new_item_ids)
-                print("=" * 50)
+                # 更新已知的 items（包括所有新 items，不只是 Backlog；延後的 item 除外）
+                self.known_items.update(new_item_ids - self.deferred_items)
+                if fresh_items:
+                    if overflow:
+                        summary = '、'.join(f"{reason} {count}" for reason, count in sorted(overflow.items()))
+                        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🚦 {sum(overflow.values())} 個 item 超出准入限制 ({summary})"
+                              + (f"，目前延後 {len(self.deferred_items)} 個" if self.deferred_items else ''))
+                    print("=" * 50)
+                else:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] ⏸️ 無新 items，{len(self.deferred_items)} 個 item 延後中")
             else:
                 # 簡潔的狀態顯示
                 if new_item_ids:
@@ -431,10 +512,198 @@ class GitHubProjectMonitor:
                 else:
                     print(f"[{datetime.now().strftime('%H:%M:%S')}] ✅ 無新 items (共 {len(current_items)} 個)")
         
+            if self.deferred_items != deferred_before:
+                save_json(self.deferred_path, sorted(self.deferred_items))
+            
+            self.health.record_poll(True)
+        
         except Exception as e:
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ❌ 錯誤: {str(e)}")
+            self.health.record_poll(False, str(e))
+        
+        # 執行已經可以送出的批次（包含等待視窗已到期的任務）
+        self.dispatch_ready_batches()
     
-    def send_discord_notification(self, item: Dict[str, Any], success: bool, execution_time: str = None, status_updated: bool = False):
+    def _handle_overflow(self, item_id: str, item: Dict[str, Any], reason: str):
+        """
+        依 ADMISSION_OVERFLOW_POLICY 處理超出准入限制的 item
+        
+        defer: 保留在 Backlog，之後的檢查週期再次嘗試
+        drop: 不執行並發送 Discord 通知
+        status: 將 item 移到 ADMISSION_DEFERRED_STATUS 狀態並發送 Discord 通知
+        """
+        title = (item.get('content') or {}).get('title', 'No title')
+        if self.admission.policy == DEFER:
+            if item_id not in self.deferred_items:
+                self.deferred_items.add(item_id)
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⏸️ 延後執行 ({reason}): {title}")
+            return
+        
+        # 不會執行的 item 不再作為原始任務，已連結到它的重複任務改為獨立執行
+        self.dedupe_index.release(item_id)
+        self.task_queue.unlink(item_id)
+        
+        status_updated = False
+        if self.admission.policy != DROP:
+            status_updated = self.update_item_status(item_id, self.admission.deferred_status)
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🚫 略過 ({reason}): {title}")
+        self.send_admission_notification(item, reason, status_updated)
+    
+    def _trace_detection(self, item_id: str, item: Dict[str, Any]):
+        """記錄從 item 建立到被偵測到的輪詢延遲"""
+        created_ts = created_timestamp(item)
+        now = time.time()
+        self.events.emit(events.DETECTED, item_id, duration=now - created_ts if created_ts is not None else None, ts=now)
+        if created_ts is None:
+            return
+        self.tracer.record_span('poll_delay', item_id, created_ts, now)
+        self.health.record_lag('detection', item_id, now - created_ts, (item.get('content') or {}).get('title'))
+    
+    def _link_if_duplicate(self, item_id: str, item: Dict[str, Any], task_content: str) -> bool:
+        """
+        檢查任務是否與既有任務重複，重複時在任務佇列中連結到原始任務而不重新執行
+        
+        Args:
+            item_id: Project Item 的 ID
+            item: Project Item 數據
+            task_content: 任務內容
+        
+        Returns:
+            bool: 是否為重複任務
+        """
+        # 找不到原始任務時登記為原始任務
+        status, original = self.dedupe_index.check_and_register(item_id, item)
+        if original is None:
+            return False
+        
+        self.deferred_items.discard(item_id)
+        self._trace_detection(item_id, item)
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ♻️ 與既有任務重複，連結到原始任務: {original.get('title', 'Untitled')}")
+        
+        # 原始任務尚在處理時記錄為 linked，完成時由任務佇列一併更新；已有結果時直接沿用
+        state, execution_time = self.task_queue.link(item_id, item, task_content, original['item_id'],
+                                                     original_succeeded=status == 'succeeded',
+                                                     execution_time=original.get('execution_time'))
+        if state != LINKED:
+            self._finalize_item(item_id, item, state == SUCCEEDED, execution_time)
+        return True
+    
+    def dispatch_ready_batches(self, flush: bool = False):
+        """
+        執行批次器中已就緒的批次
+        
+        Args:
+            flush: 是否忽略等待視窗，立即執行所有待處理任務
+        """
+        # 先完成上次中斷時尚未完成的狀態更新與通知
+        self.resume_unfinished_finalizations()
+        
+        requeued = self.task_queue.requeue_expired()
+        if requeued:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🔁 {requeued} 個中斷的任務已重新排入佇列")
+        
+        self.batcher.sync(self.task_queue.queued_tasks())
+        for batch in self.batcher.ready_batches(flush=flush):
+            # 主機資源不足時保留在佇列中，下次檢查再排程
+            admitted, _ = self.executor.admit()
+            if not admitted:
+                break
+            
+            # 取得執行權，已被其他流程或節點取得的任務會被略過
+            batch = self.task_queue.claim([task['item_id'] for task in batch], self.task_lease_seconds, owner=self.node_id)
+            if not batch:
+                continue
+            
+            with self._active_lock:
+                self._active_items.update(task['item_id'] for task in batch)
+            self._ensure_heartbeat()
+            
+            claimed_at = time.time()
+            for task in batch:
+                self.tracer.record_span('queue', task['item_id'], task['enqueued_at'], claimed_at, attempt=task['attempts'])
+                self.events.emit(events.STARTED, task['item_id'], duration=claimed_at - task['enqueued_at'],
+                                 attempt=task['attempts'], ts=claimed_at)
+            
+            print(f"\n🚀 開始執行任務... (本批 {len(batch)} 個)")
+            self.executor.submit(self._run_batch, batch)
+        
+        queued = self.task_queue.counts().get('queued', 0)
+        if queued:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] ⏳ {queued} 個任務等待執行")
+    
+    def _ensure_heartbeat(self):
+        """啟動續約執行中任務租約的背景執行緒"""
+        if self._heartbeat_thread is None or not self._heartbeat_thread.is_alive():
+            self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name='lease-heartbeat', daemon=True)
+            self._heartbeat_thread.start()
+    
+    def _heartbeat_loop(self):
+        """
+        定期延長本節點執行中任務的租約
+        
+        節點停止或卡住時不再續約，租約到期後由其他節點接手。
+        """
+        while True:
+            time.sleep(self.heartbeat_seconds)
+            with self._active_lock:
+                item_ids = list(self._active_items)
+            if not item_ids:
+                continue
+            try:
+                lost = self.task_queue.renew_leases(item_ids, self.task_lease_seconds, owner=self.node_id)
+            except Exception as e:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 無法續約任務租約: {str(e)}")
+                continue
+            for item_id in lost:
+                # 結果不會被記錄，由接手的節點負責更新狀態與通知
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 任務租約已被其他節點接手: {item_id}")
+    
+    def _run_batch(self, batch: List[Dict[str, Any]]):
+        """
+        在執行器的工作執行緒中執行一個批次
+        
+        Args:
+            batch: 已取得執行權的任務清單
+        """
+        try:
+            if len(batch) == 1:
+                task = batch[0]
+                # 執行 Claude Code (包含自動 commit/push 和 Discord 通知)
+                results = [self.run_claude_cli(task['task_content'], task['item_id'], task['item_data'])]
+            else:
+                results = self.run_claude_batch(batch)
+            
+            succeeded = sum(1 for result in results if result)
+            if succeeded == len(results):
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🎉 任務執行完成")
+            elif succeeded:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 部分任務執行完成 ({succeeded}/{len(results)})")
+            else:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 😞 任務執行失敗")
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ❌ 執行批次時發生錯誤: {str(e)}")
+        finally:
+            with self._active_lock:
+                self._active_items.difference_update(task['item_id'] for task in batch)
+    
+    def resume_unfinished_finalizations(self):
+        """
+        重新執行已有結果但尚未完成狀態更新或通知的任務
+        （例如監聽器在 update_item_status 之前被終止）
+        """
+        for task in self.task_queue.unfinished_finalizations():
+            with self._active_lock:
+                if task['item_id'] in self._active_items:
+                    continue
+            # 其他節點仍在收尾時略過，收尾租約到期後才接手
+            if not self.task_queue.acquire_finalization(task['item_id'], owner=self.node_id):
+                continue
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🔁 恢復未完成的狀態更新: {task['item_data'].get('content', {}).get('title', 'Untitled')}")
+            self._finalize_item(task['item_id'], task['item_data'], task['success'], task['execution_time'])
+    
+    def send_discord_notification(self, item: Dict[str, Any], success: bool, execution_time: str = None,
+                                  status_updated: bool = False, usage: Dict[str, Any] = None,
+                                  resources: Dict[str, Any] = None):
         """
         發送 Discord 通知
         
@@ -443,6 +712,11 @@ class GitHubProjectMonitor:
             success: 執行是否成功
             execution_time: 執行時間（可選）
             status_updated: 狀態是否已更新為 Review
+            usage: 這個 item 累計的 token 用量與費用（可選）
+            resources: 這個 item 最近一次執行的資源用量（可選）
+        
+        Returns:
+            bool: 通知是否發送成功
         """
         try:
             content = item.get('content', {})
@@ -497,6 +771,20 @@ class GitHubProjectMonitor:
                     "inline": True
                 })
             
+            if usage:
+                embed["fields"].append({
+                    "name": "用量",
+                    "value": format_usage(usage) + (f"（{usage['runs']} 次執行）" if usage.get('runs', 1) > 1 else ''),
+                    "inline": False
+                })
+            
+            if resources:
+                embed["fields"].append({
+                    "name": "資源",
+                    "value": format_resources(resources),
+                    "inline": False
+                })
+            
             # 如果狀態已更新
             if success and status_updated:
                 embed["fields"].append({
@@ -522,7 +810,8 @@ class GitHubProjectMonitor:
             }
             
             # 發送到 Discord
-            response = requests.post(
+            response = self.http.post(
+                'discord',
                 self.discord_webhook_url,
                 json=payload,
                 headers={'Content-Type': 'application/json'}
@@ -530,100 +819,485 @@ class GitHubProjectMonitor:
             
             if response.status_code in [200, 204]:
                 print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 📨 Discord 通知已發送")
+                return True
             else:
                 print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ Discord 通知發送失敗: {response.status_code}")
+                return False
                 
         except Exception as e:
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ❌ 發送 Discord 通知時發生錯誤: {str(e)}")
+            return False
     
-    def run_claude_cli(self, prompt: str, item_id: str, item: Dict[str, Any] = None) -> bool:
+    def send_admission_notification(self, item: Dict[str, Any], reason: str, status_updated: bool = False) -> bool:
         """
-        執行 Claude Code CLI
+        發送任務因准入限制被略過的 Discord 通知
+        
+        Args:
+            item: Project Item 數據
+            reason: 超出的限制（queue_full、hourly_limit、author_quota）
+            status_updated: 是否已將 item 移到 ADMISSION_DEFERRED_STATUS 狀態
+        
+        Returns:
+            bool: 通知是否發送成功
+        """
+        reasons = {'queue_full': '佇列已滿', 'hourly_limit': '超過每小時任務上限', 'author_quota': '超過建立者配額'}
+        content = item.get('content') or {}
+        embed = {
+            "title": "🚦 任務未執行（超出准入限制）",
+            "description": f"**{content.get('title', '無標題')}**",
+            "color": 0xffa500,
+            "fields": [
+                {"name": "原因", "value": reasons.get(reason, reason), "inline": True},
+                {"name": "建立者", "value": author_of(item) or 'unknown', "inline": True}
+            ],
+            "timestamp": datetime.utcnow().isoformat(),
+            "footer": {
+                "text": f"GitHub Project Monitor - {self.owner}/{self.repo}"
+            }
+        }
+        if status_updated:
+            embed["fields"].append({"name": "Project 狀態", "value": f"已移到 {self.admission.deferred_status}", "inline": True})
+        if content.get('url'):
+            embed["fields"].append({"name": "連結", "value": content['url'], "inline": False})
+        
+        try:
+            response = self.http.post(
+                'discord',
+                self.discord_webhook_url,
+                json={"embeds": [embed], "username": "GitHub Project Monitor"},
+                headers={'Content-Type': 'application/json'}
+            )
+            if response.status_code in [200, 204]:
+                return True
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ Discord 通知發送失敗: {response.status_code}")
+            return False
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ❌ 發送 Discord 通知時發生錯誤: {str(e)}")
+            return False
+    
+    def send_alert_notification(self, title: str, description: str, fields: List[Dict[str, Any]] = None) -> bool:
+        """
+        發送健康檢查警報的 Discord 通知（超過 SLO、輪詢停止、任務卡住）
+        
+        Args:
+            title: 警報標題
+            description: 警報內容
+            fields: 額外的 embed 欄位
+        
+        Returns:
+            bool: 通知是否發送成功
+        """
+        embed = {
+            "title": title,
+            "description": description,
+            "color": 0xff0000,
+            "fields": list(fields or []),
+            "timestamp": datetime.utcnow().isoformat(),
+            "footer": {
+                "text": f"GitHub Project Monitor - {self.owner}/{self.repo} ({self.node_id})"
+            }
+        }
+        
+        try:
+            response = self.http.post(
+                'discord',
+                self.discord_webhook_url,
+                json={"embeds": [embed], "username": "GitHub Project Monitor"},
+                headers={'Content-Type': 'application/json'}
+            )
+            if response.status_code in [200, 204]:
+                return True
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ Discord 通知發送失敗: {response.status_code}")
+            return False
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ❌ 發送 Discord 通知時發生錯誤: {str(e)}")
+            return False
+    
+    def _invoke_claude(self, prompt: str, tasks: List[Dict[str, Any]] = None,
+                       prompt_metrics: Dict[str, int] = None) -> Dict[str, Any]:
+        """
+        在工作目錄中執行 Claude Code CLI 並回傳原始結果
+        
+        啟用倉庫管理時，執行前先把工作目錄重設到最新的基準分支，
+        成功後由監聽器 commit 並 push；Git 失敗時視為任務失敗。
+        同樣的提示詞在同一個基準 commit 上成功執行過時，直接套用快取的 patch。
         
         Args:
             prompt: 要執行的提示詞/任務內容
-            item_id: Item ID 用於 log
-            item: Project Item 數據（用於發送通知）
+            tasks: 這次執行包含的任務（item_id、item_data），用於執行時間統計
+            prompt_metrics: PromptBuilder 的提示詞大小統計
         
         Returns:
-            bool: 執行是否成功
+            Dict[str, Any]: 包含 success、returncode、stdout、stderr、execution_time、error
+        """
+        tasks = tasks or []
+        if self.backend.remote:
+            # 在 worker 的工作目錄執行，Git 由 worker 的 REPO_MANAGED 設定管理
+            return self._execute_claude(prompt, tasks, None, prompt_metrics)
+        
+        with self.repo_manager.workspace() as workspace:
+            if not self.repo_manager.enabled:
+                return self._execute_claude(prompt, tasks, workspace, prompt_metrics)
+            
+            git_timings = {}
+            prepare_start = time.time()
+            try:
+                git_timings.update(self.repo_manager.prepare(workspace))
+                base_commit = self.repo_manager.head(workspace)
+            except (GitError, subprocess.TimeoutExpired) as e:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ❌ 無法同步工作目錄: {str(e)}")
+                return {'success': False, 'returncode': None, 'stdout': '', 'stderr': '',
+                        'execution_time': "同步工作目錄失敗", 'error': str(e)}
+            for task in tasks:
+                self.tracer.record_span('git_prepare', task['item_id'], prepare_start, time.time(), workspace=workspace)
+            
+            cache_key = prompt_hash(prompt) if self.result_cache.enabled else None
+            result = self._apply_cached_result(cache_key, base_commit, workspace, tasks) if cache_key else None
+            if result is None:
+                result = self._execute_claude(prompt, tasks, workspace, prompt_metrics)
+                if result['success'] and cache_key:
+                    self._store_result(cache_key, base_commit, workspace, result)
+            
+            if result['success']:
+                publish_start = time.time()
+                error = None
+                try:
+                    git_timings.update(self.repo_manager.publish(workspace, self._commit_message(tasks)))
+                except (GitError, subprocess.TimeoutExpired) as e:
+                    error = str(e)
+                    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ❌ 無法推送變更: {error}")
+                    result['success'] = False
+                    result['error'] = error
+                for task in tasks:
+                    self.tracer.record_span('git_publish', task['item_id'], publish_start, time.time(), error=error,
+                                            commits=git_timings.get('commits', 0))
+            
+            git_seconds = sum(value for name, value in git_timings.items() if name in ('fetch', 'reset', 'commit', 'push'))
+            print(f"   🗂️ Git 時間 {git_seconds:.2f} 秒 (fetch {git_timings.get('fetch', 0):.2f} / "
+                  f"reset {git_timings.get('reset', 0):.2f} / commit {git_timings.get('commit', 0):.2f} / "
+                  f"push {git_timings.get('push', 0):.2f}，{git_timings.get('commits', 0)} 個 commit)")
+            return result
+    
+    def _apply_cached_result(self, cache_key: str, base_commit: str, workspace: str,
+                             tasks: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        套用快取的 patch
+        
+        Returns:
+            Optional[Dict[str, Any]]: 與 _execute_claude() 相同格式的結果（cached 為 True），沒有可用的快取時回傳 None
+        """
+        start = time.time()
+        try:
+            cached = self.result_cache.get(cache_key, base_commit)
+            if not cached:
+                return None
+            self.repo_manager.apply_patch(workspace, cached['patch'])
+        except (GitError, subprocess.TimeoutExpired) as e:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 快取的 patch 無法套用，重新執行: {str(e)}")
+            self.result_cache.discard(cache_key, base_commit)
+            return None
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 無法讀取結果快取: {str(e)}")
+            return None
+        
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ♻️ 提示詞與基準 commit {base_commit[:8]} 都沒有變動，"
+              f"套用快取的結果（{len(cached['patch']):,} bytes patch，原執行時間 {cached['execution_time'] or '-'}，"
+              f"第 {cached['hits']} 次命中）")
+        for task in tasks:
+            self.tracer.record_span('result_cache', task['item_id'], start, time.time(), workspace=workspace,
+                                    **{'cache.base_commit': base_commit, 'cache.hits': cached['hits'],
+                                       'cache.patch_bytes': len(cached['patch'])})
+        return {
+            'success': True,
+            'returncode': 0,
+            'stdout': cached['stdout'],
+            'stderr': '',
+            'execution_time': f"{cached['execution_time'] or '-'}（快取）",
+            'error': None,
+            'resources': None,
+            'duration_seconds': time.time() - start,
+            'cached': True
+        }
+    
+    def _store_result(self, cache_key: str, base_commit: str, workspace: str, result: Dict[str, Any]):
+        """保存成功執行的 patch 與輸出（在推送之前，推送失敗後的重試也能命中）"""
+        try:
+            patch = self.repo_manager.diff_from(workspace, base_commit)
+            if not self.result_cache.put(cache_key, base_commit, patch, result['stdout'], result['execution_time']):
+                print("   ♻️ patch 超過 RESULT_CACHE_MAX_MB，不保存到結果快取")
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 無法保存結果快取: {str(e)}")
+    
+    @staticmethod
+    def _commit_message(tasks: List[Dict[str, Any]]) -> str:
+        """依任務標題產生 commit 訊息"""
+        titles = [task['item_data'].get('content', {}).get('title', 'Untitled') for task in tasks]
+        if len(titles) == 1:
+            return titles[0]
+        return f"處理 {len(titles)} 個任務: {', '.join(titles)}"
+    
+    def _execute_claude(self, prompt: str, tasks: List[Dict[str, Any]], cwd: str,
+                        prompt_metrics: Dict[str, int] = None) -> Dict[str, Any]:
         """
+        執行 Claude Code CLI 並回傳原始結果
+        
+        逾時依同類任務的歷史執行時間決定，逾時時終止整個 process group。
+        實際執行由 EXECUTOR_BACKEND 決定的執行後端負責。
+        
+        Args:
+            prompt: 要執行的提示詞/任務內容
+            tasks: 這次執行包含的任務（item_id、item_data），用於執行時間統計
+            cwd: 執行的工作目錄（遠端 worker 執行時為 None）
+            prompt_metrics: PromptBuilder 的提示詞大小統計
+        
+        Returns:
+            Dict[str, Any]: 包含 success、returncode、stdout、stderr、execution_time、error、resources
+        """
+        labels = sorted({label for task in tasks for label in labels_from_item(task.get('item_data'))})
+        key = task_key(len(prompt), labels, max(1, len(tasks)))
+        estimate = self.duration_history.estimate(key)
+        timeout = estimate['timeout']
+        
         start_time = datetime.now()
+        result = {
+            'success': False,
+            'returncode': None,
+            'stdout': '',
+            'stderr': '',
+            'execution_time': None,
+            'error': None,
+            'resources': None
+        }
+        samples = []
+        execution_seconds = None
+        
         try:
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🤖 啟動 Claude Code CLI...")
             print(f"   📝 執行內容: {prompt[:100]}{'...' if len(prompt) > 100 else ''}")
+            if prompt_metrics:
+                print(f"   📏 提示詞: {format_prompt_metrics(prompt_metrics)}")
+            predicted = f"{estimate['predicted']:.0f} 秒" if estimate['predicted'] is not None else '無歷史資料'
+            print(f"   ⏱️ 預估執行時間: {predicted}，逾時: {timeout:.0f} 秒 (依據: {estimate['source']})")
             
-            # 切換到專案目錄
-            original_dir = os.getcwd()
-            os.chdir(self.project_dir)
-            
-            # 如果需要 commit，在提示詞中加入 commit 指令
+            # 如果需要 commit，在提示詞中加入 commit 指令（由監聽器管理 Git 時不需要）
             full_prompt = prompt
-            if self.request_commit:
+            if self.request_commit and not self.repo_manager.enabled:
                 full_prompt = f"{prompt}\n\n完成後請自動 commit 並 push 變更到 Git 倉庫。"
             
             # 建立 Claude CLI 指令
             cmd = [self.claude_cli, '--dangerously-skip-permissions', full_prompt]
+            if self.claude_output_format == 'json':
+                cmd = [self.claude_cli, '-p', '--output-format', 'json', '--dangerously-skip-permissions', full_prompt]
             
-            # 執行 Claude CLI
-            process = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=600  # 10 分鐘超時（給 commit/push 更多時間）
-            )
-            
-            # 回到原目錄
-            os.chdir(original_dir)
+            # 在專案目錄執行 Claude CLI（獨立 process group、降低優先權並套用資源上限）
+            # 遠端 worker 沒有監聽器上的附件，隨工作一起送出
+            attachments = self.prompt_builder.attachments_in(full_prompt) if self.backend.remote else None
+            raw = self.backend.run(cmd, cwd, timeout, message=self._commit_message(tasks), attachments=attachments)
+            result['resources'] = raw.get('resources')
+            samples = raw.get('samples') or []
+            execution_seconds = raw.get('elapsed_seconds')
+            if raw.get('worker'):
+                git_seconds = sum(value for name, value in (raw.get('git') or {}).items() if name in ('fetch', 'reset', 'commit', 'push'))
+                print(f"   🛰️ Worker: {raw['worker']}" + (f"（Git 時間 {git_seconds:.2f} 秒）" if raw.get('git') else ''))
+            if raw.get('timed_out'):
+                raise subprocess.TimeoutExpired(cmd, timeout)
+            stdout, stderr, returncode = raw['stdout'], raw['stderr'], raw['returncode']
             
             # 計算執行時間
-            execution_time = str(datetime.now() - start_time).split('.')[0]
+            result['execution_time'] = str(datetime.now() - start_time).split('.')[0]
+            result['returncode'] = returncode
+            result['stdout'] = stdout or ''
+            result['stderr'] = stderr or ''
+            result['success'] = returncode == 0
             
-            if process.returncode == 0:
+            # 結構化輸出：取出最後的回覆文字與用量
+            parsed = parse_cli_output(stdout) if self.claude_output_format == 'json' else None
+            if parsed:
+                result['stdout'] = parsed['result']
+                result['usage'] = parsed
+                result['success'] = result['success'] and not parsed['is_error']
+                print(f"   💰 用量: {format_usage(parsed)}")
+            stdout = result['stdout']
+            
+            if result['success']:
                 print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ✅ Claude Code 執行成功")
-                if process.stdout:
-                    print(f"   📤 輸出: {process.stdout.strip()[:200]}{'...' if len(process.stdout.strip()) > 200 else ''}")
-                
-                # 更新 Project Item 狀態為 Review
-                status_updated = False
-                if item_id:
-                    status_updated = self.update_item_status(item_id)
-                    if not status_updated:
-                        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 無法更新 Item 狀態")
-                
-                # 發送 Discord 通知（成功）
-                if item:
-                    self.send_discord_notification(item, success=True, execution_time=execution_time, status_updated=status_updated)
-                
-                return True
+                if stdout:
+                    print(f"   📤 輸出: {stdout.strip()[:200]}{'...' if len(stdout.strip()) > 200 else ''}")
             else:
-                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ❌ Claude Code 執行失敗 (exit code: {process.returncode})")
-                if process.stderr:
-                    print(f"   📥 錯誤: {process.stderr.strip()}")
-                
-                # 發送 Discord 通知（失敗）
-                if item:
-                    self.send_discord_notification(item, success=False, execution_time=execution_time)
-                
-                return False
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ❌ Claude Code 執行失敗 (exit code: {returncode})")
+                if stderr:
+                    print(f"   📥 錯誤: {stderr.strip()}")
+            
+            # worker 端的 Git 同步或推送失敗
+            if raw.get('error'):
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ❌ Worker 執行失敗: {raw['error']}")
+                result['success'] = False
+                result['error'] = raw['error']
                 
         except subprocess.TimeoutExpired:
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⏰ Claude Code 執行超時")
-            
-            # 發送 Discord 通知（超時/失敗）
-            if item:
-                execution_time = "超過 10 分鐘（超時）"
-                self.send_discord_notification(item, success=False, execution_time=execution_time)
-            
-            return False
+            result['execution_time'] = f"超過 {timeout / 60:.0f} 分鐘（超時）"
+            result['error'] = 'timeout'
         except Exception as e:
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ❌ 執行 Claude Code 時發生錯誤: {str(e)}")
-            
-            # 發送 Discord 通知（錯誤/失敗）
-            if item:
-                self.send_discord_notification(item, success=False, execution_time="執行時發生錯誤")
-            
-            return False
+            result['execution_time'] = "執行時發生錯誤"
+            result['error'] = str(e)
+        
+        # 程序樹的資源用量（逾時的執行也記錄，可以看出卡在哪裡）
+        resources = result['resources']
+        if resources:
+            print(f"   🧪 資源: {format_resources(resources)}")
+            try:
+                self.resource_ledger.record([task['item_id'] for task in tasks], start_time.timestamp(),
+                                            resources, samples)
+            except Exception as e:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 無法記錄資源用量: {str(e)}")
+        
+        # 每個任務各自記錄一個 execute span
+        for task in tasks:
+            self.tracer.record_span(
+                'execute', task['item_id'], start_time.timestamp(), time.time(),
+                error=None if result['success'] else (result['error'] or f"exit code {result['returncode']}"),
+                **{'batch.size': len(tasks), 'timeout.seconds': timeout,
+                   **{f"prompt.{name}": value for name, value in (prompt_metrics or {}).items()},
+                   **{f"resources.{name}": value for name, value in (resources or {}).items()}}
+            )
+        
+        # 記錄執行時間（啟動失敗的執行沒有參考價值，不列入）
+        # 使用後端回報的子程序執行時間，不含在工作伺服器佇列中等待 worker 與 worker 端 Git 的時間
+        duration = execution_seconds if execution_seconds is not None else (datetime.now() - start_time).total_seconds()
+        result['duration_seconds'] = duration
+        if result['returncode'] is not None or result['error'] == 'timeout':
+            outcome = 'timeout' if result['error'] == 'timeout' else ('succeeded' if result['success'] else 'failed')
+            self.duration_history.record(
+                key, [task['item_id'] for task in tasks], min(duration, timeout) if outcome == 'timeout' else duration,
+                outcome, estimate['predicted'], timeout
+            )
+            if estimate['predicted'] is not None:
+                print(f"   📏 預估 {estimate['predicted']:.0f} 秒 / 實際 {duration:.0f} 秒")
+        
+        return result
+    
+    def _finalize_item(self, item_id: str, item: Dict[str, Any], success: bool, execution_time: str = None) -> bool:
+        """
+        任務結束後更新 Item 狀態並發送通知
+        
+        Args:
+            item_id: Project Item 的 ID
+            item: Project Item 數據（用於發送通知）
+            success: 任務是否成功
+            execution_time: 執行時間
+        
+        Returns:
+            bool: 任務是否成功
+        """
+        # 先持久化結果，之後的狀態更新與通知在中斷後可以重新執行
+        self.task_queue.complete(item_id, success, execution_time, owner=self.node_id)
+        
+        # 租約已被其他節點接手，或其他節點正在收尾時不重複更新與通知
+        if not self.task_queue.acquire_finalization(item_id, owner=self.node_id):
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⏭️ 由其他節點負責收尾: {item_id}")
+            return success
+        
+        # 成功時更新 Project Item 狀態為 Review（已更新過的不會重複更新）
+        status_updated = self.task_queue.is_status_updated(item_id)
+        if success and item_id and not status_updated:
+            with self.tracer.span('status_update', item_id) as span:
+                status_updated = self.update_item_status(item_id)
+                if not status_updated:
+                    span['error'] = 'update_item_status failed'
+            if status_updated:
+                self.task_queue.mark_status_updated(item_id)
+                created_ts = created_timestamp(item)
+                lead_time = time.time() - created_ts if created_ts is not None else None
+                self.events.emit(events.STATUS_UPDATED, item_id, duration=lead_time)
+                if lead_time is not None:
+                    self.health.record_lag('review', item_id, lead_time, ((item or {}).get('content') or {}).get('title'))
+            else:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 無法更新 Item 狀態")
+        
+        # 發送 Discord 通知（已通知過的不會重複發送）
+        if item and not self.task_queue.is_notified(item_id):
+            with self.tracer.span('notify', item_id) as span:
+                notified = self.send_discord_notification(item, success=success, execution_time=execution_time,
+                                                          status_updated=status_updated,
+                                                          usage=self.usage_ledger.item_usage(item_id),
+                                                          resources=self.resource_ledger.item_summary(item_id))
+                if not notified:
+                    span['error'] = 'send_discord_notification failed'
+            if notified:
+                self.task_queue.mark_notified(item_id)
+                self.events.emit(events.NOTIFIED, item_id)
+        
+        # 連結到此任務的重複 items 已在 complete() 時沿用相同結果，在這裡收尾
+        self.dedupe_index.record_result(item_id, success, execution_time)
+        for duplicate in self.task_queue.linked_results(item_id):
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ♻️ 同步更新重複任務")
+            self._finalize_item(duplicate['item_id'], duplicate['item_data'], duplicate['success'],
+                                duplicate['execution_time'])
+        
+        return success
+    
+    def _record_usage(self, result: Dict[str, Any], tasks: List[Dict[str, Any]], outcomes: List[bool]):
+        """記錄這次執行的用量（批次執行時平均分攤到每個任務）"""
+        if not result.get('usage'):
+            return
+        try:
+            labels = [labels_from_item(task.get('item_data')) for task in tasks]
+            self.usage_ledger.record(result['usage'], tasks, outcomes, labels)
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 無法記錄用量: {str(e)}")
+    
+    def _emit_finished(self, item_id: str, result: Dict[str, Any], success: bool):
+        """記錄執行結束事件"""
+        outcome = 'timeout' if result.get('error') == 'timeout' else ('succeeded' if success else 'failed')
+        self.events.emit(events.FINISHED, item_id, duration=result.get('duration_seconds'), outcome=outcome)
+    
+    def run_claude_cli(self, prompt: str, item_id: str, item: Dict[str, Any] = None) -> bool:
+        """
+        執行 Claude Code CLI
+        
+        Args:
+            prompt: 要執行的提示詞/任務內容
+            item_id: Item ID 用於 log
+            item: Project Item 數據（用於發送通知）
+        
+        Returns:
+            bool: 執行是否成功
+        """
+        tasks = [{'item_id': item_id, 'item_data': item, 'task_content': prompt}]
+        prompt, prompt_metrics = self.prompt_builder.build(tasks)
+        result = self._invoke_claude(prompt, tasks, prompt_metrics)
+        self._record_usage(result, tasks, [result['success']])
+        self._emit_finished(item_id, result, result['success'])
+        return self._finalize_item(item_id, item, result['success'], result['execution_time'])
+    
+    def run_claude_batch(self, batch: List[Dict[str, Any]]) -> List[bool]:
+        """
+        以單次 Claude Code CLI 執行處理一批任務，並逐一更新每個 Item 的狀態
+        
+        Args:
+            batch: 任務清單（item_id、item_data、task_content）
+        
+        Returns:
+            List[bool]: 依任務順序排列的執行結果
+        """
+        prompt, prompt_metrics = self.prompt_builder.build(batch)
+        result = self._invoke_claude(prompt, batch, prompt_metrics)
+        
+        # 只有整體執行成功時才採用 Claude 回報的個別結果
+        if result['success']:
+            outcomes = parse_batch_results(result['stdout'], len(batch), default=True)
+        else:
+            outcomes = [False] * len(batch)
+        self._record_usage(result, batch, outcomes)
+        
+        for task, success in zip(batch, outcomes):
+            self._emit_finished(task['item_id'], result, success)
+            print(f"   {'✅' if success else '❌'} {task['item_data'].get('content', {}).get('title', 'Untitled')}")
+            self._finalize_item(task['item_id'], task['item_data'], success, result['execution_time'])
+        
+        return outcomes
     
     
     def extract_task_content(self, item: Dict[str, Any]) -> str:
@@ -665,14 +1339,25 @@ class GitHubProjectMonitor:
         print(f"📂 Repository: {self.owner}/{self.repo}")
         print(f"📋 Project: #{self.project_number}")
         print(f"⏱️  檢查間隔: {interval} 秒")
+        print(f"🖥️  節點: {self.node_id}")
         print("❌ 按 Ctrl+C 停止監聽")
+        print(f"🔬 剖析: kill -USR1 {os.getpid()}")
         print("=" * 50)
         
+        self.profiler.install_signal_handler()
+        self.repo_manager.start_prefetch()
+        self.backend.start()
+        self.health.start(os.getenv('HEALTH_HOST', '127.0.0.1'), int(os.getenv('HEALTH_PORT', '0')),
+                          float(os.getenv('HEALTH_CHECK_SECONDS', '30')))
         try:
             while True:
-                self.check_for_new_items()
+                with self.profiler.tick():
+                    self.check_for_new_items()
                 time.sleep(interval)
         except KeyboardInterrupt:
+            # 終止執行中的 Claude 子程序，未完成的任務會在租約到期後重新排入佇列
+            self.executor.shutdown()
+            self.backend.shutdown()
             print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🛑 監聽已停止")
             print("👋 再見！")
 
@@ -0,0 +1,4 @@
+"""
+GitHub Project 監聽器的共用元件
+供 github_project_monitor.py 與 scripts/process_project_items.py 使用
+"""
@@ -0,0 +1,88 @@
+"""
+任務准入控制
+大量 items 同時進入 Backlog 時，依佇列長度、每小時任務數與每位建立者的配額決定是否接受任務，
+超出時依設定延後、略過並通知，或將 item 標記為 Deferred 狀態
+"""
+
+import os
+import time
+from typing import Dict, Any, Optional, Tuple
+
+# 超出限制時的處理方式
+DEFER = 'defer'
+DROP = 'drop'
+STATUS = 'status'
+POLICIES = (DEFER, DROP, STATUS)
+
+
+def author_of(item: Dict[str, Any]) -> Optional[str]:
+    """取得把 item 加入 Project 的使用者（沒有時使用 Issue 作者）"""
+    for actor in ((item or {}).get('creator'), ((item or {}).get('content') or {}).get('author')):
+        if actor and actor.get('login'):
+            return actor['login']
+    return None
+
+
+class AdmissionController:
+    def __init__(self, max_queued: int = 0, max_per_hour: int = 0, max_per_author: int = 0,
+                 author_window_seconds: float = 86400, policy: str = DEFER, deferred_status: str = 'Deferred'):
+        """
+        初始化准入控制
+
+        Args:
+            max_queued: 佇列中最多等待的任務數（0 表示不限制）
+            max_per_hour: 最近一小時最多接受的任務數（0 表示不限制）
+            max_per_author: 每位建立者在 author_window_seconds 內最多接受的任務數（0 表示不限制）
+            author_window_seconds: 建立者配額的時間窗
+            policy: 超出限制時的處理方式（defer、drop、status）
+            deferred_status: policy 為 status 時要設定的 Project 狀態
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"ADMISSION_OVERFLOW_POLICY 必須是 {', '.join(POLICIES)} 其中之一")
+        self.max_queued = max_queued
+        self.max_per_hour = max_per_hour
+        self.max_per_author = max_per_author
+        self.author_window_seconds = author_window_seconds
+        self.policy = policy
+        self.deferred_status = deferred_status
+
+    @classmethod
+    def from_env(cls) -> 'AdmissionController':
+        """依環境變數建立准入控制"""
+        return cls(
+            max_queued=int(os.getenv('ADMISSION_MAX_QUEUED', '0')),
+            max_per_hour=int(os.getenv('ADMISSION_MAX_PER_HOUR', '0')),
+            max_per_author=int(os.getenv('ADMISSION_MAX_PER_AUTHOR', '0')),
+            author_window_seconds=float(os.getenv('ADMISSION_AUTHOR_WINDOW_HOURS', '24')) * 3600,
+            policy=os.getenv('ADMISSION_OVERFLOW_POLICY', DEFER).lower(),
+            deferred_status=os.getenv('ADMISSION_DEFERRED_STATUS', 'Deferred')
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """是否設定了任何限制"""
+        return bool(self.max_queued or self.max_per_hour or self.max_per_author)
+
+    def check(self, author: Optional[str], task_queue) -> Tuple[bool, str]:
+        """
+        判斷是否接受新任務
+
+        Args:
+            author: item 建立者
+            task_queue: TaskQueue，用來計算目前的佇列長度與最近接受的任務數
+
+        Returns:
+            Tuple[bool, str]: 是否接受，以及原因（admitted、queue_full、hourly_limit、author_quota）
+        """
+        if not self.enabled:
+            return True, 'admitted'
+
+        now = time.time()
+        if self.max_queued and task_queue.counts().get('queued', 0) >= self.max_queued:
+            return False, 'queue_full'
+        if self.max_per_hour and task_queue.count_enqueued_since(now - 3600) >= self.max_per_hour:
+            return False, 'hourly_limit'
+        if self.max_per_author and author and \
+                task_queue.count_enqueued_since(now - self.author_window_seconds, author=author) >= self.max_per_author:
+            return False, 'author_quota'
+        return True, 'admitted'
@@ -0,0 +1,476 @@
+"""
+Claude 執行後端
+偵測迴圈只負責決定要執行什麼，實際執行 Claude CLI 的方式由 EXECUTOR_BACKEND 決定：
+
+- subprocess（預設）: 在監聽器的工作執行緒中直接啟動子程序
+- process_pool: 交給本機的程序池執行，監聽器程序只等待結果
+- job_server: 監聽器啟動輕量的 HTTP 工作伺服器，由其他機器（或本機）上的
+  worker（python -m project_monitor.worker）拉取工作執行後回報結果，
+  偵測與昂貴的執行可以各自擴充
+
+所有後端的 run() 都回傳相同格式的結果（returncode、stdout、stderr、timed_out、resources、samples、elapsed_seconds）
+"""
+
+import os
+import json
+import time
+import uuid
+import signal
+import threading
+import subprocess
+import multiprocessing
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Callable
+
+from project_monitor.executor import limited_command, popen_kwargs, terminate_group
+from project_monitor.resources import ResourceSampler
+
+SUBPROCESS = 'subprocess'
+PROCESS_POOL = 'process_pool'
+JOB_SERVER = 'job_server'
+
+
+def run_process(cmd: List[str], cwd: Optional[str], timeout: float, nice: int = 0, memory_limit_mb: int = 0,
+                sample_seconds: float = 0, memory_bound_mb: float = 2048,
+                on_start: Callable = None, on_exit: Callable = None) -> Dict[str, Any]:
+    """
+    執行 Claude CLI 子程序並取樣資源用量
+
+    逾時時終止整個 process group，避免 Claude 啟動的工具程序殘留。
+
+    Args:
+        cmd: 指令
+        cwd: 工作目錄
+        timeout: 逾時秒數
+        nice: 子程序的 nice 值
+        memory_limit_mb: 子程序的位址空間上限
+        sample_seconds: 資源取樣間隔（0 表示不取樣）
+        memory_bound_mb: 峰值 RSS 超過此值時視為 memory-bound
+        on_start: 子程序啟動後呼叫（參數為 Popen 物件）
+        on_exit: 子程序結束後呼叫（參數為 Popen 物件）
+
+    Returns:
+        Dict[str, Any]: returncode、stdout、stderr、timed_out、resources、samples、
+        elapsed_seconds（子程序實際執行的秒數，不含排隊與 Git 時間）
+    """
+    started = time.monotonic()
+    process = subprocess.Popen(
+        limited_command(cmd, nice, memory_limit_mb),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        cwd=cwd,
+        **popen_kwargs()
+    )
+    if on_start:
+        on_start(process)
+    sampler = ResourceSampler(process.pid, sample_seconds, memory_bound_mb).start()
+    timed_out = False
+    try:
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            terminate_group(process)
+            stdout, stderr = process.communicate()
+    finally:
+        if on_exit:
+            on_exit(process)
+        resources = sampler.stop()
+    return {
+        'returncode': None if timed_out else process.returncode,
+        'stdout': stdout or '',
+        'stderr': stderr or '',
+        'timed_out': timed_out,
+        'resources': resources,
+        'samples': sampler.samples,
+        'elapsed_seconds': time.monotonic() - started
+    }
+
+
+class SubprocessBackend:
+    name = SUBPROCESS
+    remote = False
+
+    def __init__(self, executor, sample_seconds: float = 1, memory_bound_mb: float = 2048):
+        """
+        在呼叫端的執行緒中直接啟動子程序（原本的執行方式）
+
+        Args:
+            executor: HostAwareExecutor（提供 nice、記憶體上限與子程序登記）
+            sample_seconds: 資源取樣間隔
+            memory_bound_mb: 峰值 RSS 超過此值時視為 memory-bound
+        """
+        self.executor = executor
+        self.sample_seconds = sample_seconds
+        self.memory_bound_mb = memory_bound_mb
+
+    def start(self):
+        pass
+
+    def run(self, cmd: List[str], cwd: Optional[str], timeout: float, message: str = None,
+            attachments: Dict[str, str] = None) -> Dict[str, Any]:
+        """執行指令（message 與 attachments 只有遠端 worker 使用）"""
+        return run_process(
+            cmd, cwd, timeout, self.executor.nice, self.executor.memory_limit_mb,
+            self.sample_seconds, self.memory_bound_mb,
+            on_start=self.executor.track, on_exit=lambda process: self.executor.untrack(process.pid)
+        )
+
+    def shutdown(self):
+        # 執行中的子程序由 HostAwareExecutor.shutdown() 終止
+        pass
+
+
+# 程序池 worker 目前執行中的子程序，收到 SIGTERM 時一併終止
+_pool_current = None
+
+
+def _pool_worker_init():
+    """程序池 worker 初始化：忽略 Ctrl+C（由監聽器處理），SIGTERM 時終止執行中的 Claude"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    def _terminate(signum, frame):
+        if _pool_current is not None:
+            terminate_group(_pool_current, grace_seconds=5)
+        os._exit(1)
+
+    signal.signal(signal.SIGTERM, _terminate)
+
+
+def _pool_set_current(process):
+    global _pool_current
+    _pool_current = process
+
+
+def _pool_run(cmd: List[str], cwd: Optional[str], timeout: float, nice: int, memory_limit_mb: int,
+              sample_seconds: float, memory_bound_mb: float) -> Dict[str, Any]:
+    """在程序池 worker 中執行"""
+    return run_process(cmd, cwd, timeout, nice, memory_limit_mb, sample_seconds, memory_bound_mb,
+                       on_start=_pool_set_current, on_exit=lambda process: _pool_set_current(None))
+
+
+class ProcessPoolBackend:
+    name = PROCESS_POOL
+    remote = False
+
+    def __init__(self, executor, processes: int = 1, sample_seconds: float = 1, memory_bound_mb: float = 2048):
+        """
+        交給本機的程序池執行
+
+        子程序的輸出緩衝、資源取樣與逾時處理都在程序池中進行，不佔用監聽器程序的記憶體與 GIL。
+
+        Args:
+            executor: HostAwareExecutor（提供 nice 與記憶體上限）
+            processes: 程序池大小
+            sample_seconds: 資源取樣間隔
+            memory_bound_mb: 峰值 RSS 超過此值時視為 memory-bound
+        """
+        self.executor = executor
+        self.processes = max(1, processes)
+        self.sample_seconds = sample_seconds
+        self.memory_bound_mb = memory_bound_mb
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """建立程序池（監聽器有多個執行緒，以 spawn 建立避免 fork 複製鎖的狀態）"""
+        with self._lock:
+            if self._pool is None:
+                self._pool = multiprocessing.get_context('spawn').Pool(self.processes, initializer=_pool_worker_init)
+
+    def run(self, cmd: List[str], cwd: Optional[str], timeout: float, message: str = None,
+            attachments: Dict[str, str] = None) -> Dict[str, Any]:
+        """執行指令並等待結果（附件在本機上，不需要處理 attachments）"""
+        self.start()
+        pending = self._pool.apply_async(_pool_run, (cmd, cwd, timeout, self.executor.nice, self.executor.memory_limit_mb,
+                                                     self.sample_seconds, self.memory_bound_mb))
+        # 逾時由程序池中的 run_process 處理，這裡多等一段時間讓它終止子程序並回報
+        return pending.get(timeout + 60)
+
+    def shutdown(self):
+        """終止程序池（worker 收到 SIGTERM 時終止執行中的 Claude）"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.terminate()
+                self._pool = None
+
+
+class JobServerBackend:
+    name = JOB_SERVER
+    remote = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8765, token: str = None, lease_seconds: float = 60,
+                 queue_timeout: float = 600, max_attempts: int = 2):
+        """
+        由 worker 透過 HTTP 拉取工作
+
+        worker 以 POST /jobs/claim 取得工作（沒有工作時 long-poll），執行期間定期送出
+        heartbeat 延長租約，完成後以 POST /jobs/<id>/result 回報。租約到期（worker 當機）的工作
+        重新排入佇列，最多嘗試 max_attempts 次。
+
+        Args:
+            host: 監聽位址
+            port: 監聽埠
+            token: worker 需要在 Authorization 標頭帶上的 Bearer token（未設定時不驗證）
+            lease_seconds: worker 沒有送出 heartbeat 時視為失聯的秒數
+            queue_timeout: 工作在佇列中等待 worker 的上限
+            max_attempts: 每個工作最多嘗試次數
+        """
+        self.host = host
+        self.port = port
+        self.token = token
+        self.lease_seconds = lease_seconds
+        self.queue_timeout = queue_timeout
+        self.max_attempts = max(1, max_attempts)
+
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._queue: deque = deque()
+        self._workers: Dict[str, Dict[str, Any]] = {}
+        self._cond = threading.Condition()
+        self._server = None
+
+    @classmethod
+    def from_env(cls) -> 'JobServerBackend':
+        """依環境變數建立工作伺服器"""
+        return cls(
+            host=os.getenv('JOB_SERVER_HOST', '127.0.0.1'),
+            port=int(os.getenv('JOB_SERVER_PORT', '8765')),
+            token=os.getenv('JOB_SERVER_TOKEN') or None,
+            lease_seconds=float(os.getenv('JOB_LEASE_SECONDS', '60')),
+            queue_timeout=float(os.getenv('JOB_QUEUE_TIMEOUT', '600'))
+        )
+
+    def start(self):
+        """啟動 HTTP 工作伺服器與租約檢查執行緒"""
+        if self._server is not None:
+            return
+        if not self.token and self.host not in ('127.0.0.1', 'localhost', '::1'):
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 工作伺服器監聽 {self.host} 但未設定 JOB_SERVER_TOKEN")
+        self._server = ThreadingHTTPServer((self.host, self.port), _make_handler(self))
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name='job-server', daemon=True).start()
+        threading.Thread(target=self._expire_loop, name='job-server-leases', daemon=True).start()
+        print(f"🛰️ 工作伺服器: http://{self.host}:{self.port}（python -m project_monitor.worker --server http://{self.host}:{self.port}）")
+
+    def run(self, cmd: List[str], cwd: Optional[str], timeout: float, message: str = None,
+            attachments: Dict[str, str] = None) -> Dict[str, Any]:
+        """
+        排入工作並等待 worker 回報結果
+
+        指令的第一個元素（Claude CLI 路徑）由 worker 換成自己的 CLAUDE_CLI_PATH，
+        工作目錄為 worker 的 PROJECT_DIR；worker 設定 REPO_MANAGED=true 時以 message 作為 commit 訊息。
+        attachments（監聽器上的附件路徑 -> 內容）由 worker 寫到本機，並把指令中的路徑換成本機路徑。
+
+        Raises:
+            RuntimeError: 沒有 worker 在 queue_timeout 內取走工作，或重試後仍失聯
+        """
+        job_id = uuid.uuid4().hex
+        job = {
+            'id': job_id,
+            'args': cmd[1:],
+            'timeout': timeout,
+            'message': message,
+            'attachments': attachments or {},
+            'state': 'queued',
+            'attempts': 0,
+            'worker': None,
+            'lease_expires': None,
+            'enqueued_at': time.time(),
+            'result': None,
+            'error': None
+        }
+        with self._cond:
+            self._jobs[job_id] = job
+            self._queue.append(job_id)
+            self._cond.notify_all()
+            try:
+                while job['state'] not in ('done', 'failed'):
+                    if job['state'] == 'queued' and time.time() - job['enqueued_at'] > self.queue_timeout:
+                        self._queue.remove(job_id)
+                        raise RuntimeError(f"{self.queue_timeout:.0f} 秒內沒有 worker 取走工作")
+                    self._cond.wait(timeout=1)
+            finally:
+                self._jobs.pop(job_id, None)
+        if job['state'] == 'failed':
+            raise RuntimeError(job['error'])
+        return {**job['result'], 'worker': job['worker']}
+
+    def claim(self, worker: str, wait: float = 20) -> Optional[Dict[str, Any]]:
+        """worker 取得下一個工作，沒有工作時最多等待 wait 秒"""
+        deadline = time.time() + wait
+        with self._cond:
+            self._workers[worker] = {'seen_at': time.time(), 'job': None}
+            while not self._queue:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(timeout=remaining)
+            job = self._jobs[self._queue.popleft()]
+            job['state'] = 'running'
+            job['attempts'] += 1
+            job['worker'] = worker
+            job['lease_expires'] = time.time() + self.lease_seconds
+            self._workers[worker] = {'seen_at': time.time(), 'job': job['id']}
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🛰️ {worker} 取得工作 {job['id'][:8]}"
+                  f"（第 {job['attempts']} 次，等待 {time.time() - job['enqueued_at']:.1f} 秒）")
+            return {'id': job['id'], 'args': job['args'], 'timeout': job['timeout'], 'message': job['message'],
+                    'attachments': job['attachments']}
+
+    def release(self, job_id: str, worker: str):
+        """把 worker 沒有收到的工作放回佇列最前面"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job and job['state'] == 'running' and job['worker'] == worker:
+                job['state'] = 'queued'
+                job['worker'] = None
+                job['attempts'] -= 1
+                self._queue.appendleft(job_id)
+                self._cond.notify_all()
+
+    def heartbeat(self, job_id: str, worker: str) -> bool:
+        """延長租約，工作已不屬於這個 worker 時回傳 False（worker 應停止執行）"""
+        with self._cond:
+            self._workers[worker] = {'seen_at': time.time(), 'job': job_id}
+            job = self._jobs.get(job_id)
+            if not job or job['state'] != 'running' or job['worker'] != worker:
+                return False
+            job['lease_expires'] = time.time() + self.lease_seconds
+            return True
+
+    def complete(self, job_id: str, worker: str, result: Dict[str, Any]) -> bool:
+        """記錄 worker 回報的結果"""
+        with self._cond:
+            self._workers[worker] = {'seen_at': time.time(), 'job': None}
+            job = self._jobs.get(job_id)
+            if not job or job['state'] != 'running' or job['worker'] != worker:
+                return False
+            job['state'] = 'done'
+            job['result'] = result
+            self._cond.notify_all()
+            return True
+
+    def _expire_loop(self):
+        """租約到期的工作重新排入佇列，超過嘗試次數時失敗"""
+        while True:
+            time.sleep(min(5.0, self.lease_seconds / 3))
+            now = time.time()
+            with self._cond:
+                for job in self._jobs.values():
+                    if job['state'] != 'running' or job['lease_expires'] > now:
+                        continue
+                    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ worker {job['worker']} 失聯，工作 {job['id'][:8]} 租約到期")
+                    if job['attempts'] >= self.max_attempts:
+                        job['state'] = 'failed'
+                        job['error'] = f"worker {job['worker']} 失聯（已嘗試 {job['attempts']} 次）"
+                    else:
+                        job['state'] = 'queued'
+                        job['worker'] = None
+                        job['enqueued_at'] = now
+                        self._queue.appendleft(job['id'])
+                self._cond.notify_all()
+
+    def status(self) -> Dict[str, Any]:
+        """佇列與 worker 狀態"""
+        now = time.time()
+        with self._cond:
+            return {
+                'queued': len(self._queue),
+                'running': sum(1 for job in self._jobs.values() if job['state'] == 'running'),
+                'workers': [{'name': name, 'job': info['job'], 'seen_seconds_ago': round(now - info['seen_at'], 1)}
+                            for name, info in sorted(self._workers.items())]
+            }
+
+    def shutdown(self):
+        """停止工作伺服器（執行中的 worker 之後的 heartbeat 會失敗並停止）"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+
+
+def _make_handler(backend: JobServerBackend):
+    """建立工作伺服器的 request handler"""
+
+    class JobHandler(BaseHTTPRequestHandler):
+        def _authorized(self) -> bool:
+            if backend.token and self.headers.get('Authorization') != f"Bearer {backend.token}":
+                self._send(401, {'error': 'unauthorized'})
+                return False
+            return True
+
+        def do_GET(self):
+            if not self._authorized():
+                return
+            if self.path.split('?', 1)[0] == '/status':
+                self._send(200, backend.status())
+            else:
+                self._send(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if not self._authorized():
+                return
+            length = int(self.headers.get('Content-Length') or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                self._send(400, {'error': 'invalid json'})
+                return
+            worker = str(body.get('worker') or self.client_address[0])
+            parts = self.path.split('?', 1)[0].strip('/').split('/')
+
+            if parts == ['jobs', 'claim']:
+                job = backend.claim(worker, min(30.0, float(body.get('wait', 20))))
+                if job is None:
+                    self._send(204, None)
+                elif not self._send(200, job):
+                    # worker 在 long-poll 期間斷線，工作立即還給佇列
+                    backend.release(job['id'], worker)
+            elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'heartbeat':
+                ok = backend.heartbeat(parts[1], worker)
+                self._send(200 if ok else 409, {'ok': ok})
+            elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'result':
+                ok = backend.complete(parts[1], worker, body.get('result') or {})
+                self._send(200 if ok else 409, {'ok': ok})
+            else:
+                self._send(404, {'error': 'not found'})
+
+        def _send(self, status: int, payload: Optional[Dict[str, Any]]) -> bool:
+            """回傳 JSON，連線已中斷時回傳 False"""
+            data = json.dumps(payload, ensure_ascii=False).encode('utf-8') if payload is not None else b''
+            try:
+                self.send_response(status)
+                if payload is not None:
+                    self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                self.wfile.flush()
+                return True
+            except (BrokenPipeError, ConnectionResetError):
+                return False
+
+        def log_message(self, format, *args):
+            pass
+
+    return JobHandler
+
+
+def execution_backend(executor, sample_seconds: float = 1, memory_bound_mb: float = 2048):
+    """
+    依 EXECUTOR_BACKEND 建立執行後端
+
+    Args:
+        executor: HostAwareExecutor
+        sample_seconds: 資源取樣間隔（job_server 由 worker 的 RESOURCE_SAMPLE_SECONDS 決定）
+        memory_bound_mb: 峰值 RSS 超過此值時視為 memory-bound
+    """
+    name = os.getenv('EXECUTOR_BACKEND', SUBPROCESS).lower()
+    if name == PROCESS_POOL:
+        return ProcessPoolBackend(executor, executor.max_workers, sample_seconds, memory_bound_mb)
+    if name == JOB_SERVER:
+        return JobServerBackend.from_env()
+    if name != SUBPROCESS:
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 未知的 EXECUTOR_BACKEND: {name}，使用 {SUBPROCESS}")
+    return SubprocessBackend(executor, sample_seconds, memory_bound_mb)
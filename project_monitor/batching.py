@@ -0,0 +1,127 @@
+"""
+任務批次處理
+將待處理的任務依數量、提示詞大小與等待時間分組，讓一次 Claude 執行處理多個任務
+"""
+
+import re
+import time
+from typing import Dict, Any, List, Optional
+
+# Claude 在批次執行結束時回報每個任務結果的標記，例如 "TASK_RESULT 2: SUCCESS"
+RESULT_MARKER_PATTERN = re.compile(r'^\s*TASK_RESULT\s+(\d+)\s*:\s*(SUCCESS|FAILED)\b', re.IGNORECASE | re.MULTILINE)
+
+
+class TaskBatcher:
+    def __init__(self, max_tasks: int = 1, max_prompt_chars: int = 20000, max_wait_seconds: float = 0):
+        """
+        初始化任務批次器
+
+        Args:
+            max_tasks: 每批最多任務數
+            max_prompt_chars: 每批提示詞的最大字元數（單一超大任務會自成一批）
+            max_wait_seconds: 批次未滿時最多等待多久就送出（micro-batch 視窗）
+        """
+        self.max_tasks = max(1, max_tasks)
+        self.max_prompt_chars = max_prompt_chars
+        self.max_wait_seconds = max_wait_seconds
+        self.pending: List[Dict[str, Any]] = []
+
+    def sync(self, tasks: List[Dict[str, Any]]):
+        """
+        以外部佇列（例如持久化任務佇列）的內容取代待處理清單
+
+        Args:
+            tasks: 依加入順序排列的待處理任務
+        """
+        self.pending = list(tasks)
+
+    def can_add(self, batch: List[Dict[str, Any]], task: Dict[str, Any]) -> bool:
+        """判斷任務是否還能放進目前的批次"""
+        if not batch:
+            return True
+        if len(batch) >= self.max_tasks:
+            return False
+        size = sum(len(t['task_content']) for t in batch) + len(task['task_content'])
+        return size <= self.max_prompt_chars
+
+    def ready_batches(self, now: Optional[float] = None, flush: bool = False) -> List[List[Dict[str, Any]]]:
+        """
+        取出可以執行的批次
+
+        批次在以下情況送出：達到最大任務數、再加入下一個任務會超過提示詞上限、
+        最早的任務已等待超過 max_wait_seconds，或 flush 為 True。
+
+        Args:
+            now: 目前時間（預設為 time.time()）
+            flush: 是否不論等待時間送出所有待處理任務
+
+        Returns:
+            List[List[Dict[str, Any]]]: 可執行的批次清單
+        """
+        now = now if now is not None else time.time()
+        batches = []
+        current: List[Dict[str, Any]] = []
+
+        for task in self.pending:
+            if not self.can_add(current, task):
+                batches.append(current)
+                current = []
+            current.append(task)
+
+        # 最後一批未滿時，只有等待超時或強制送出才執行
+        if current:
+            oldest = min(t['enqueued_at'] for t in current)
+            if flush or len(current) >= self.max_tasks or now - oldest >= self.max_wait_seconds:
+                batches.append(current)
+                current = []
+
+        self.pending = current
+        return batches
+
+
+def build_batch_prompt(batch: List[Dict[str, Any]]) -> str:
+    """
+    建立批次提示詞
+
+    單一任務時直接回傳任務內容；多個任務時加上編號，並要求 Claude 在最後
+    以 TASK_RESULT 標記回報每個任務的結果。
+
+    Args:
+        batch: 任務清單
+
+    Returns:
+        str: 提示詞
+    """
+    if len(batch) == 1:
+        return batch[0]['task_content']
+
+    sections = [f"以下共有 {len(batch)} 個獨立任務，請依序完成："]
+    for i, task in enumerate(batch, 1):
+        title = task['item_data'].get('content', {}).get('title', 'Untitled')
+        sections.append(f"## Task {i}: {title}\n{task['task_content']}")
+
+    sections.append(
+        "全部完成後，請在輸出的最後為每個任務各印出一行結果，格式為：\n"
+        "TASK_RESULT <任務編號>: SUCCESS 或 TASK_RESULT <任務編號>: FAILED"
+    )
+    return "\n\n".join(sections)
+
+
+def parse_batch_results(output: str, batch_size: int, default: bool) -> List[bool]:
+    """
+    解析批次執行輸出中每個任務的結果
+
+    Args:
+        output: Claude CLI 的輸出
+        batch_size: 批次中的任務數
+        default: 沒有找到標記時使用的結果（通常為整體 exit code 是否成功）
+
+    Returns:
+        List[bool]: 依任務順序排列的成功與否
+    """
+    results = [default] * batch_size
+    for match in RESULT_MARKER_PATTERN.finditer(output or ''):
+        index = int(match.group(1)) - 1
+        if 0 <= index < batch_size:
+            results[index] = match.group(2).upper() == 'SUCCESS'
+    return results
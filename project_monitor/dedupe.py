@@ -0,0 +1,207 @@
+"""
+重複任務偵測
+以正規化後的標題與內容雜湊建立索引，可選擇以 shingle + MinHash 偵測近似重複
+
+索引存放在任務佇列的 SQLite 資料庫（TASK_QUEUE_DB）中，多個節點共用同一個資料庫時，
+偵測與登記在同一個交易內完成，所有節點對哪個是原始任務的判斷一致。
+重複 items 本身以 linked 狀態記錄在任務佇列中（見 TaskQueue.link），由佇列負責沿用結果與收尾。
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import unicodedata
+from typing import Dict, Any, List, Optional, Tuple
+
+from project_monitor.state import connect, load_json
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dedupe_entries (
+    hash TEXT PRIMARY KEY,
+    item_id TEXT NOT NULL,
+    title TEXT,
+    status TEXT NOT NULL,
+    execution_time TEXT,
+    signature TEXT,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_dedupe_item ON dedupe_entries(item_id);
+CREATE INDEX IF NOT EXISTS idx_dedupe_recorded ON dedupe_entries(recorded_at);
+"""
+
+# MinHash 使用的雜湊函數數量
+MINHASH_PERMUTATIONS = 64
+
+# 字元 shingle 長度（中文沒有空白分詞，因此以字元為單位）
+SHINGLE_SIZE = 5
+
+# 以 (a * h + b) mod p 模擬多個獨立的雜湊排列
+_MERSENNE_PRIME = (1 << 61) - 1
+_PERMUTATIONS = [
+    (int.from_bytes(hashlib.sha256(f'a{i}'.encode()).digest()[:8], 'little') % (_MERSENNE_PRIME - 1) + 1,
+     int.from_bytes(hashlib.sha256(f'b{i}'.encode()).digest()[:8], 'little') % _MERSENNE_PRIME)
+    for i in range(MINHASH_PERMUTATIONS)
+]
+
+
+def normalize_text(title: str, body: str) -> str:
+    """
+    正規化標題與內容：統一全半形、轉小寫、移除標點並合併空白
+
+    Args:
+        title: 任務標題
+        body: 任務內容
+
+    Returns:
+        str: 正規化後的文字
+    """
+    text = unicodedata.normalize('NFKC', f"{title or ''}\n{body or ''}").lower()
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def content_hash(title: str, body: str) -> str:
+    """計算正規化內容的 SHA-256 雜湊"""
+    return hashlib.sha256(normalize_text(title, body).encode('utf-8')).hexdigest()
+
+
+def minhash_signature(text: str) -> List[int]:
+    """
+    計算文字的 MinHash 簽章
+
+    Args:
+        text: 正規化後的文字
+
+    Returns:
+        List[int]: 長度為 MINHASH_PERMUTATIONS 的簽章
+    """
+    compact = text.replace(' ', '')
+    if len(compact) <= SHINGLE_SIZE:
+        shingles = {compact}
+    else:
+        shingles = {compact[i:i + SHINGLE_SIZE] for i in range(len(compact) - SHINGLE_SIZE + 1)}
+
+    hashes = [int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little') for shingle in shingles]
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def estimate_similarity(a: List[int], b: List[int]) -> float:
+    """以 MinHash 簽章估計 Jaccard 相似度"""
+    if not a or not b or len(a) != len(b):
+        return 0.0
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+class DedupeIndex:
+    def __init__(self, path: str, similarity_threshold: float = 0, max_entries: int = 5000, legacy_path: str = None):
+        """
+        初始化重複任務索引
+
+        Args:
+            path: SQLite 資料庫路徑（與任務佇列共用，多節點時指向共用的 TASK_QUEUE_DB）
+            similarity_threshold: 近似重複的相似度門檻（0 表示只比對完全相同的內容）
+            max_entries: 最多保留的原始任務數量，超過時移除最舊的記錄
+            legacy_path: 舊版 JSON 索引檔案，資料庫中沒有記錄時匯入
+        """
+        self.path = path
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        with connect(self.path) as conn:
+            conn.executescript(_SCHEMA)
+        if legacy_path and os.path.exists(legacy_path):
+            self._import_legacy(legacy_path)
+
+    def _import_legacy(self, legacy_path: str):
+        """匯入舊版 JSON 索引的原始任務（資料庫已有記錄時略過）"""
+        entries = load_json(legacy_path, {})
+        with connect(self.path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT COUNT(*) FROM dedupe_entries").fetchone()[0] == 0:
+                for key, entry in entries.items():
+                    self._insert(conn, key, entry['item_id'], entry.get('title'), entry.get('signature'),
+                                 entry.get('status', 'pending'), entry.get('execution_time'), entry.get('recorded_at', 0))
+            conn.execute("COMMIT")
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, key: str, item_id: str, title: str, signature: Optional[List[int]],
+                status: str = 'pending', execution_time: str = None, recorded_at: float = None):
+        conn.execute(
+            "INSERT OR REPLACE INTO dedupe_entries (hash, item_id, title, status, execution_time, signature, recorded_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, item_id, title, status, execution_time, json.dumps(signature) if signature else None,
+             recorded_at if recorded_at is not None else time.time())
+        )
+
+    @staticmethod
+    def _to_entry(row: sqlite3.Row) -> Dict[str, Any]:
+        return {'hash': row['hash'], 'item_id': row['item_id'], 'title': row['title'], 'status': row['status'],
+                'execution_time': row['execution_time'], 'recorded_at': row['recorded_at']}
+
+    def _find(self, conn: sqlite3.Connection, key: str, signature: Optional[List[int]]) -> Optional[sqlite3.Row]:
+        """尋找內容相同（或近似）且尚未失敗的原始任務"""
+        row = conn.execute("SELECT * FROM dedupe_entries WHERE hash = ? AND status != 'failed'", (key,)).fetchone()
+        if row or signature is None:
+            return row
+
+        best, best_score = None, 0.0
+        for candidate in conn.execute("SELECT * FROM dedupe_entries WHERE status != 'failed' AND signature IS NOT NULL"):
+            score = estimate_similarity(signature, json.loads(candidate['signature']))
+            if score >= self.similarity_threshold and score > best_score:
+                best, best_score = candidate, score
+        return best
+
+    def check_and_register(self, item_id: str, item: Dict[str, Any]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        在同一個交易內尋找原始任務，找不到時把 item 登記為原始任務
+
+        多個節點同時看到內容相同的 items 時，只有第一個登記的成為原始任務，其他的都會找到它。
+
+        Args:
+            item_id: Project Item 的 ID
+            item: Project Item 數據
+
+        Returns:
+            Tuple[Optional[str], Optional[Dict[str, Any]]]: 原始任務的狀態（pending / succeeded）與索引記錄；
+            item 本身成為原始任務時為 (None, None)
+        """
+        content = item.get('content', {})
+        title, body = content.get('title', ''), content.get('body', '')
+        key = content_hash(title, body)
+        signature = minhash_signature(normalize_text(title, body)) if self.similarity_threshold > 0 else None
+
+        with connect(self.path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = self._find(conn, key, signature)
+            if row is not None and row['item_id'] != item_id:
+                conn.execute("COMMIT")
+                return row['status'], self._to_entry(row)
+
+            self._insert(conn, key, item_id, title, signature)
+            overflow = conn.execute("SELECT COUNT(*) FROM dedupe_entries").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                oldest = [r['hash'] for r in conn.execute(
+                    "SELECT hash FROM dedupe_entries ORDER BY recorded_at LIMIT ?", (overflow,))]
+                conn.executemany("DELETE FROM dedupe_entries WHERE hash = ?", [(h,) for h in oldest])
+            conn.execute("COMMIT")
+            return None, None
+
+    def record_result(self, item_id: str, success: bool, execution_time: str = None):
+        """
+        記錄原始任務的執行結果（失敗的任務之後不再視為原始任務）
+
+        Args:
+            item_id: 原始任務的 Project Item ID
+            success: 是否執行成功
+            execution_time: 執行時間
+        """
+        with connect(self.path) as conn:
+            conn.execute("UPDATE dedupe_entries SET status = ?, execution_time = ? WHERE item_id = ?",
+                         ('succeeded' if success else 'failed', execution_time, item_id))
+
+    def release(self, item_id: str):
+        """移除不會執行的原始任務（例如被准入控制略過），之後內容相同的 item 可以成為原始任務"""
+        with connect(self.path) as conn:
+            conn.execute("DELETE FROM dedupe_entries WHERE item_id = ? AND status = 'pending'", (item_id,))
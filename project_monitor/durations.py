@@ -0,0 +1,230 @@
+"""
+任務執行時間歷史
+依任務大小與標籤記錄每次 Claude 執行的時間，並以歷史百分位數計算每個任務的逾時時間
+
+使用方式：
+    python -m project_monitor.durations    # 輸出預測與實際執行時間的比較報表
+"""
+
+import os
+import sys
+import time
+import sqlite3
+from typing import Dict, Any, List, Optional
+
+from project_monitor.state import connect
+from project_monitor.stats import percentile
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_key TEXT NOT NULL,
+    size_bucket TEXT NOT NULL,
+    item_ids TEXT NOT NULL,
+    duration REAL NOT NULL,
+    outcome TEXT NOT NULL,
+    predicted_duration REAL,
+    timeout REAL NOT NULL,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_key ON runs(task_key, recorded_at);
+CREATE INDEX IF NOT EXISTS idx_runs_bucket ON runs(size_bucket, recorded_at);
+"""
+
+# 提示詞字元數分級
+SIZE_BUCKETS = [(500, 'xs'), (2000, 's'), (8000, 'm'), (32000, 'l')]
+
+
+def size_bucket(prompt_chars: int) -> str:
+    """依提示詞長度分級"""
+    for limit, name in SIZE_BUCKETS:
+        if prompt_chars < limit:
+            return name
+    return 'xl'
+
+
+def labels_from_item(item: Dict[str, Any]) -> List[str]:
+    """
+    取出 item 的自定義欄位值作為標籤（排除每個任務都會變動的 Status）
+
+    Args:
+        item: Project Item 數據
+
+    Returns:
+        List[str]: 排序後的標籤
+    """
+    labels = []
+    for field in (item or {}).get('fieldValues', {}).get('nodes', []):
+        if not field:
+            continue
+        name = field.get('field', {}).get('name', '')
+        value = field.get('text') or field.get('name', '')
+        if name and value and name != 'Status':
+            labels.append(f"{name}={value}")
+    return sorted(labels)
+
+
+def task_key(prompt_chars: int, labels: List[str], batch_size: int = 1) -> str:
+    """組合任務的歷史查詢鍵"""
+    return f"size={size_bucket(prompt_chars)}|batch={batch_size}|labels={','.join(labels)}"
+
+
+class DurationHistory:
+    def __init__(self, path: str, default_timeout: float = 600, min_timeout: float = 120,
+                 max_timeout: float = 1800, timeout_percentile: float = 95, multiplier: float = 1.5,
+                 min_samples: int = 5, window: int = 200):
+        """
+        初始化執行時間歷史
+
+        Args:
+            path: SQLite 資料庫路徑
+            default_timeout: 歷史資料不足時的逾時秒數
+            min_timeout: 逾時下限
+            max_timeout: 逾時上限
+            timeout_percentile: 用來計算逾時的百分位數
+            multiplier: 百分位數乘上的安全係數
+            min_samples: 採用歷史資料所需的最少樣本數
+            window: 每個鍵只看最近幾筆記錄
+        """
+        self.path = path
+        self.default_timeout = default_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_percentile = timeout_percentile
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self.window = window
+        with connect(self.path) as conn:
+            conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_env(cls, path: str) -> 'DurationHistory':
+        """依環境變數建立執行時間歷史"""
+        return cls(
+            path,
+            default_timeout=float(os.getenv('TASK_TIMEOUT_DEFAULT_SECONDS', '600')),
+            min_timeout=float(os.getenv('TASK_TIMEOUT_MIN_SECONDS', '120')),
+            max_timeout=float(os.getenv('TASK_TIMEOUT_MAX_SECONDS', '1800')),
+            timeout_percentile=float(os.getenv('TASK_TIMEOUT_PERCENTILE', '95')),
+            multiplier=float(os.getenv('TASK_TIMEOUT_MULTIPLIER', '1.5'))
+        )
+
+    def _recent_durations(self, column: str, value: str) -> List[float]:
+        """
+        取得某個鍵最近成功或逾時的執行時間
+
+        很快就失敗的執行（認證錯誤、啟動即當掉）不代表任務需要的時間，列入會讓之後的逾時縮短，因此排除。
+        """
+        with connect(self.path) as conn:
+            rows = conn.execute(
+                f"SELECT duration FROM runs WHERE {column} = ? AND outcome IN ('succeeded', 'timeout') "
+                "ORDER BY recorded_at DESC LIMIT ?",
+                (value, self.window)
+            ).fetchall()
+            return [row['duration'] for row in rows]
+
+    def estimate(self, key: str) -> Dict[str, Any]:
+        """
+        預估任務的執行時間與逾時
+
+        先看完全相同的鍵，樣本不足時退回只看大小分級，再不足時使用預設值。
+        只使用成功與逾時的執行，失敗的執行不列入百分位數。
+
+        Args:
+            key: task_key() 產生的鍵
+
+        Returns:
+            Dict[str, Any]: predicted（p50 秒數）、timeout（秒數）、samples、source
+        """
+        bucket = key.split('|', 1)[0]
+        for column, value, source in (('task_key', key, 'key'), ('size_bucket', bucket, 'size')):
+            durations = self._recent_durations(column, value)
+            if len(durations) >= self.min_samples:
+                timeout = percentile(durations, self.timeout_percentile) * self.multiplier
+                return {
+                    'predicted': percentile(durations, 50),
+                    'timeout': max(self.min_timeout, min(self.max_timeout, timeout)),
+                    'samples': len(durations),
+                    'source': source
+                }
+        return {'predicted': None, 'timeout': self.default_timeout, 'samples': 0, 'source': 'default'}
+
+    def record(self, key: str, item_ids: List[str], duration: float, outcome: str,
+               predicted: Optional[float], timeout: float):
+        """
+        記錄一次執行結果
+
+        逾時的執行以逾時秒數記錄（實際時間至少這麼長），讓之後的逾時逐步放寬。
+
+        Args:
+            key: task_key() 產生的鍵
+            item_ids: 這次執行包含的 item IDs
+            duration: 實際執行秒數
+            outcome: succeeded、failed 或 timeout
+            predicted: 執行前預測的秒數
+            timeout: 這次使用的逾時秒數
+        """
+        with connect(self.path) as conn:
+            conn.execute(
+                "INSERT INTO runs (task_key, size_bucket, item_ids, duration, outcome, predicted_duration, timeout, recorded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, key.split('|', 1)[0], ','.join(item_ids), duration, outcome, predicted, timeout, time.time())
+            )
+
+    def report(self, since_seconds: float = 30 * 86400) -> List[Dict[str, Any]]:
+        """
+        依鍵彙總預測與實際執行時間，供容量規劃使用
+
+        Args:
+            since_seconds: 統計最近多久的記錄
+
+        Returns:
+            List[Dict[str, Any]]: 每個鍵的統計
+        """
+        with connect(self.path) as conn:
+            rows = conn.execute(
+                "SELECT * FROM runs WHERE recorded_at > ? ORDER BY task_key", (time.time() - since_seconds,)
+            ).fetchall()
+
+        groups: Dict[str, List[sqlite3.Row]] = {}
+        for row in rows:
+            groups.setdefault(row['task_key'], []).append(row)
+
+        summary = []
+        for key, runs in groups.items():
+            durations = [run['duration'] for run in runs]
+            errors = [abs(run['duration'] - run['predicted_duration']) for run in runs if run['predicted_duration'] is not None]
+            summary.append({
+                'task_key': key,
+                'runs': len(runs),
+                'timeouts': sum(1 for run in runs if run['outcome'] == 'timeout'),
+                'p50': percentile(durations, 50),
+                'p95': percentile(durations, 95),
+                'mean_abs_error': sum(errors) / len(errors) if errors else None,
+                'total_seconds': sum(durations)
+            })
+        return summary
+
+
+def main():
+    """輸出執行時間報表"""
+    from project_monitor.state import state_path
+
+    days = float(sys.argv[1]) if len(sys.argv) > 1 else 30
+    history = DurationHistory.from_env(state_path('durations.db'))
+    summary = history.report(since_seconds=days * 86400)
+
+    if not summary:
+        print("📭 沒有執行記錄")
+        return
+
+    print(f"⏱️ 最近 {days:g} 天的執行時間（秒）")
+    print(f"{'task_key':<48} {'runs':>5} {'timeouts':>8} {'p50':>8} {'p95':>8} {'預測誤差':>8} {'總時數':>8}")
+    for row in summary:
+        error = f"{row['mean_abs_error']:.0f}" if row['mean_abs_error'] is not None else '-'
+        print(f"{row['task_key'][:48]:<48} {row['runs']:>5} {row['timeouts']:>8} {row['p50']:>8.0f} "
+              f"{row['p95']:>8.0f} {error:>8} {row['total_seconds'] / 3600:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
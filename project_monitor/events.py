@@ -0,0 +1,282 @@
+"""
+Item 生命週期事件記錄
+每個 item 的狀態轉換（detected → queued → started → finished → status_updated → notified）
+以固定欄位的 JSON Lines 逐行附加到依日期（UTC）分割的檔案，每一行都是扁平的紀錄，
+可以直接以 DuckDB / pandas / Arrow 讀成欄式表格
+
+報表以串流方式只讀取時間範圍內的檔案，百分位數以固定大小的 reservoir 取樣計算，
+記憶體用量與事件總數無關
+
+使用方式：
+    python -m project_monitor.events                        # 最近 24 小時
+    python -m project_monitor.events --since 7d --json
+    python -m project_monitor.events --since 2026-10-01 --until 2026-10-08
+"""
+
+import os
+import re
+import sys
+import json
+import random
+import argparse
+import threading
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, List, Optional, Iterator
+
+from project_monitor.stats import percentile
+
+# 事件名稱
+DETECTED = 'detected'            # 偵測到新的 Backlog item（duration: 建立到偵測）
+QUEUED = 'queued'                # 加入任務佇列 / matrix
+STARTED = 'started'              # 開始執行（duration: 佇列等待）
+FINISHED = 'finished'            # 執行結束（duration: 執行時間，outcome: succeeded / failed / timeout）
+STATUS_UPDATED = 'status_updated'  # 狀態更新為 Review（duration: 建立到 Review 的 lead time）
+NOTIFIED = 'notified'            # 已發送 Discord 通知
+EVENTS = (DETECTED, QUEUED, STARTED, FINISHED, STATUS_UPDATED, NOTIFIED)
+
+# 每一行固定包含這些欄位（沒有值時為 null），方便直接轉成欄式格式
+FIELDS = ('ts', 'event', 'item_id', 'source', 'node', 'duration_seconds', 'outcome', 'attempt')
+
+
+def created_timestamp(item: Optional[Dict[str, Any]]) -> Optional[float]:
+    """item 的 createdAt（Unix 秒），沒有或無法解析時為 None"""
+    created_at = (item or {}).get('createdAt')
+    if not created_at:
+        return None
+    try:
+        return datetime.fromisoformat(created_at.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def parse_execution_time(value: Optional[str]) -> Optional[float]:
+    """將 H:MM:SS 格式的執行時間轉為秒數，其他格式（例如「超時」說明）回傳 None"""
+    match = re.fullmatch(r'(\d+):(\d{2}):(\d{2})', (value or '').strip())
+    if not match:
+        return None
+    hours, minutes, seconds = (int(part) for part in match.groups())
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def _day(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%d')
+
+
+class EventLog:
+    def __init__(self, directory: Optional[str], source: str, node: str = None):
+        """
+        初始化事件記錄
+
+        Args:
+            directory: 事件檔案目錄，None 或空字串表示停用
+            source: 記錄來源（monitor / processor）
+            node: 節點名稱
+        """
+        self.directory = directory or None
+        self.source = source
+        self.node = node
+        self._lock = threading.Lock()
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, source: str, default_directory: str, node: str = None) -> 'EventLog':
+        """依 EVENT_LOG_DIR 建立事件記錄（設為空字串停用）"""
+        return cls(os.getenv('EVENT_LOG_DIR', default_directory), source, node)
+
+    def emit(self, event: str, item_id: str, duration: float = None, outcome: str = None, attempt: int = None,
+             ts: float = None):
+        """
+        附加一筆事件
+
+        每筆事件以單次 write 寫入以 O_APPEND 開啟的檔案，多個程序同時寫入同一個檔案時行不會交錯。
+
+        Args:
+            event: 事件名稱（EVENTS）
+            item_id: Project Item ID
+            duration: 與事件相關的秒數（見各事件的說明）
+            outcome: 執行結果
+            attempt: 第幾次嘗試
+            ts: 事件時間（Unix 秒，預設為現在）
+        """
+        if not self.directory:
+            return
+        ts = ts if ts is not None else datetime.now().timestamp()
+        record = dict(zip(FIELDS, (round(ts, 3), event, item_id, self.source, self.node,
+                                   round(duration, 3) if duration is not None else None, outcome, attempt)))
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        path = os.path.join(self.directory, f"events-{_day(ts)}.jsonl")
+        try:
+            with self._lock:
+                fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, line)
+                finally:
+                    os.close(fd)
+        except OSError as e:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 無法寫入事件記錄: {str(e)}")
+
+
+def iter_events(directory: str, since: float, until: float) -> Iterator[Dict[str, Any]]:
+    """
+    逐筆讀取時間範圍內的事件（只開啟涵蓋該範圍的日期檔案）
+
+    Args:
+        directory: 事件檔案目錄
+        since: 開始時間（Unix 秒，含）
+        until: 結束時間（Unix 秒，不含）
+    """
+    if not os.path.isdir(directory):
+        return
+    first, last = _day(since), _day(until)
+    for filename in sorted(os.listdir(directory)):
+        match = re.fullmatch(r'events-(\d{4}-\d{2}-\d{2})\.jsonl', filename)
+        if not match or not first <= match.group(1) <= last:
+            continue
+        with open(os.path.join(directory, filename), 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if since <= record.get('ts', 0) < until:
+                    yield record
+
+
+class Reservoir:
+    def __init__(self, capacity: int = 10000, seed: int = 0):
+        """
+        固定大小的均勻取樣，用來在有限記憶體內估計百分位數
+
+        Args:
+            capacity: 最多保留的樣本數（數量不超過時為精確值）
+            seed: 亂數種子（讓同樣的輸入得到同樣的報表）
+        """
+        self.capacity = capacity
+        self.count = 0
+        self.values: List[float] = []
+        self._random = random.Random(seed)
+
+    def add(self, value: float):
+        self.count += 1
+        if len(self.values) < self.capacity:
+            self.values.append(value)
+        else:
+            index = self._random.randrange(self.count)
+            if index < self.capacity:
+                self.values[index] = value
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """樣本的百分位數（與其他報表使用相同的定義）"""
+        return percentile(self.values, pct)
+
+    def summary(self) -> Dict[str, Any]:
+        return {'count': self.count, 'p50': self.percentile(50), 'p95': self.percentile(95)}
+
+
+def analyze(records: Iterator[Dict[str, Any]], bucket_seconds: int = 3600, capacity: int = 10000) -> Dict[str, Any]:
+    """
+    以單次掃描計算吞吐量、佇列等待、成功率與 lead time
+
+    Args:
+        records: iter_events() 的結果
+        bucket_seconds: 吞吐量的時間區間
+        capacity: 每項百分位數的 reservoir 大小
+
+    Returns:
+        Dict[str, Any]: throughput（每個區間各事件數）、success_rate、finished、
+        detection_lag / queue_wait / execution / lead_time 的 count、p50、p95（秒）
+    """
+    buckets: Dict[int, Dict[str, int]] = {}
+    durations = {name: Reservoir(capacity) for name in ('detection_lag', 'queue_wait', 'execution', 'lead_time')}
+    duration_of = {DETECTED: 'detection_lag', STARTED: 'queue_wait', FINISHED: 'execution', STATUS_UPDATED: 'lead_time'}
+    outcomes: Dict[str, int] = {}
+    events = 0
+
+    for record in records:
+        events += 1
+        event = record.get('event')
+        bucket = buckets.setdefault(int(record['ts'] // bucket_seconds * bucket_seconds), dict.fromkeys(EVENTS, 0))
+        if event in bucket:
+            bucket[event] += 1
+        if event == FINISHED:
+            outcome = record.get('outcome') or 'unknown'
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+            bucket['succeeded'] = bucket.get('succeeded', 0) + (outcome == 'succeeded')
+        if event in duration_of and record.get('duration_seconds') is not None:
+            durations[duration_of[event]].add(record['duration_seconds'])
+
+    finished = sum(outcomes.values())
+    return {
+        'events': events,
+        'throughput': [{'start': start, **counts} for start, counts in sorted(buckets.items())],
+        'finished': outcomes,
+        'success_rate': outcomes.get('succeeded', 0) / finished if finished else None,
+        **{name: reservoir.summary() for name, reservoir in durations.items()}
+    }
+
+
+def parse_time(value: str, now: float) -> float:
+    """解析 24h、7d、30m 等相對時間或 ISO 日期時間"""
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([smhd])', value.strip())
+    if match:
+        return now - float(match.group(1)) * {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[match.group(2)]
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _format_seconds(value: Optional[float]) -> str:
+    if value is None:
+        return '-'
+    return str(timedelta(seconds=round(value)))
+
+
+def main():
+    """輸出吞吐量與 lead time 報表"""
+    from project_monitor.state import state_path
+
+    parser = argparse.ArgumentParser(description='Item 生命週期吞吐量與 lead time 報表')
+    parser.add_argument('--dir', default=os.getenv('EVENT_LOG_DIR') or state_path('events'), help='事件檔案目錄')
+    parser.add_argument('--since', default='24h', help='開始時間（24h、7d 或 ISO 日期，預設 24h）')
+    parser.add_argument('--until', help='結束時間（預設為現在）')
+    parser.add_argument('--bucket', default='1h', help='吞吐量的時間區間（預設 1h）')
+    parser.add_argument('--json', action='store_true', help='以 JSON 輸出')
+    args = parser.parse_args()
+
+    now = datetime.now().timestamp()
+    since = parse_time(args.since, now)
+    until = parse_time(args.until, now) if args.until else now
+    bucket_seconds = int(now - parse_time(args.bucket, now))
+    report = analyze(iter_events(args.dir, since, until), bucket_seconds=bucket_seconds)
+
+    if args.json:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return
+    if not report['events']:
+        print(f"📭 {args.dir} 在這段時間沒有事件")
+        return
+
+    def fmt(ts: float) -> str:
+        return datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M')
+
+    print(f"📊 {fmt(since)} ~ {fmt(until)}（{report['events']:,} 筆事件）")
+    print(f"\n{'區間':<17} {'偵測':>6} {'排入':>6} {'開始':>6} {'結束':>6} {'成功':>6} {'Review':>7}")
+    for bucket in report['throughput']:
+        print(f"{fmt(bucket['start']):<17} {bucket[DETECTED]:>6} {bucket[QUEUED]:>6} {bucket[STARTED]:>6} "
+              f"{bucket[FINISHED]:>6} {bucket.get('succeeded', 0):>6} {bucket[STATUS_UPDATED]:>7}")
+
+    rate = report['success_rate']
+    print(f"\n✅ 成功率: {f'{rate:.1%}' if rate is not None else '-'} "
+          f"（{', '.join(f'{name} {count}' for name, count in sorted(report['finished'].items())) or '沒有執行結果'}）")
+    titles = {'detection_lag': '建立 → 偵測', 'queue_wait': '佇列等待', 'execution': '執行時間', 'lead_time': '建立 → Review'}
+    print(f"\n{'':<14} {'count':>7} {'p50':>10} {'p95':>10}")
+    for name, title in titles.items():
+        summary = report[name]
+        print(f"{title:<14} {summary['count']:>7} {_format_seconds(summary['p50']):>10} {_format_seconds(summary['p95']):>10}")
+
+
+if __name__ == '__main__':
+    main()
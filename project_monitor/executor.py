@@ -0,0 +1,282 @@
+"""
+依主機資源排程的執行器
+依照目前的 load average、可用記憶體與每次執行的資源預估決定是否啟動新的 Claude 執行，
+並對子程序套用 nice 值與 rlimit，避免平行執行時把主機拖垮
+"""
+
+import os
+import sys
+import time
+import signal
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, Optional, Callable, List, Tuple
+
+
+def read_available_memory_mb() -> Optional[float]:
+    """
+    從 /proc/meminfo 讀取可用記憶體（MB）
+
+    Returns:
+        Optional[float]: 可用記憶體，非 Linux 環境回傳 None
+    """
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def read_load_average() -> Optional[float]:
+    """讀取 1 分鐘 load average，不支援時回傳 None"""
+    try:
+        return os.getloadavg()[0]
+    except (OSError, AttributeError):
+        return None
+
+
+# 在 exec 前降低優先權並套用位址空間上限的小型包裝程式
+# （監聽器有多個執行緒，preexec_fn 在 fork 後執行 Python 程式碼可能造成死結）
+_LIMIT_WRAPPER = (
+    "import os, sys, resource\n"
+    "nice, limit = int(sys.argv[1]), int(sys.argv[2])\n"
+    "if nice:\n"
+    "    os.nice(nice)\n"
+    "if limit:\n"
+    "    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))\n"
+    "os.execvp(sys.argv[3], sys.argv[3:])\n"
+)
+
+
+def limited_command(cmd: List[str], nice: int = 0, memory_limit_mb: int = 0) -> List[str]:
+    """
+    需要調整 nice 值或記憶體上限時，以包裝程式啟動指令
+
+    包裝程式套用限制後以 exec 取代自己，Claude 與其後代程序從一開始就繼承這些限制，
+    pid 也維持不變（資源取樣與整組終止不受影響）。
+
+    Args:
+        cmd: 原本的指令
+        nice: nice 值（0 表示不調整）
+        memory_limit_mb: 位址空間上限（RLIMIT_AS，0 表示不限制）
+    """
+    if os.name != 'posix' or not (nice or memory_limit_mb):
+        return list(cmd)
+    return [sys.executable, '-S', '-c', _LIMIT_WRAPPER, str(nice), str(memory_limit_mb * 1024 * 1024)] + list(cmd)
+
+
+def popen_kwargs() -> Dict[str, Any]:
+    """
+    回傳啟動 Claude 子程序時使用的 Popen 參數
+
+    子程序以 start_new_session 建立自己的 process group，方便之後整組終止；
+    nice 值與記憶體上限由 limited_command() 套用。
+    """
+    if os.name != 'posix':
+        return {}
+    return {'start_new_session': True}
+
+
+def terminate_group(process, grace_seconds: float = 10):
+    """
+    終止子程序所在的整個 process group（包含 Claude 啟動的工具程序）
+
+    先送 SIGTERM，超過寬限時間仍未結束再送 SIGKILL。
+
+    Args:
+        process: subprocess.Popen 物件
+        grace_seconds: SIGTERM 後等待的秒數
+    """
+    if os.name != 'posix':
+        process.kill()
+        return
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(process.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            return
+        if sig == signal.SIGTERM:
+            deadline = time.monotonic() + grace_seconds
+            while time.monotonic() < deadline and process.poll() is None:
+                time.sleep(0.1)
+            if process.poll() is not None:
+                # 主程序已結束，仍要確保同組的其他程序也被清除
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except (ProcessLookupError, PermissionError):
+                    pass
+                return
+
+
+class HostAwareExecutor:
+    def __init__(self, max_workers: int = 1, run_cpu_estimate: float = 2.0, run_memory_mb: float = 2048,
+                 max_load_per_cpu: float = 1.0, min_free_memory_mb: float = 512, ramp_seconds: float = 60,
+                 nice: int = 10, memory_limit_mb: int = 0, host_checks: bool = True):
+        """
+        初始化執行器
+
+        Args:
+            max_workers: 最多同時執行數量
+            run_cpu_estimate: 每次執行預估使用的 CPU 核心數
+            run_memory_mb: 每次執行預估使用的記憶體（MB）
+            max_load_per_cpu: 允許的 load average / CPU 核心數上限
+            min_free_memory_mb: 啟動新執行後至少要保留的可用記憶體
+            ramp_seconds: 剛啟動的執行尚未反映在量測值的時間，期間以預估值計算
+            nice: 子程序的 nice 值（0 表示不調整）
+            memory_limit_mb: 子程序的位址空間上限（RLIMIT_AS，0 表示不限制）
+            host_checks: 是否依本機的 load 與記憶體決定准入（執行在遠端 worker 時關閉，只限制同時執行數量）
+        """
+        self.max_workers = max(1, max_workers)
+        self.run_cpu_estimate = run_cpu_estimate
+        self.run_memory_mb = run_memory_mb
+        self.max_load_per_cpu = max_load_per_cpu
+        self.min_free_memory_mb = min_free_memory_mb
+        self.ramp_seconds = ramp_seconds
+        self.nice = nice
+        self.memory_limit_mb = memory_limit_mb
+        self.host_checks = host_checks
+        self.cpu_count = os.cpu_count() or 1
+
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='claude-run')
+        self._lock = threading.Lock()
+        self._running: Dict[int, float] = {}
+        self._next_id = 0
+        self._processes: Dict[int, Any] = {}
+        self.decisions: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls) -> 'HostAwareExecutor':
+        """依環境變數建立執行器"""
+        return cls(
+            max_workers=int(os.getenv('EXECUTOR_MAX_WORKERS', '1')),
+            run_cpu_estimate=float(os.getenv('EXECUTOR_RUN_CPU', '2')),
+            run_memory_mb=float(os.getenv('EXECUTOR_RUN_MEMORY_MB', '2048')),
+            max_load_per_cpu=float(os.getenv('EXECUTOR_MAX_LOAD_PER_CPU', '1.0')),
+            min_free_memory_mb=float(os.getenv('EXECUTOR_MIN_FREE_MEMORY_MB', '512')),
+            nice=int(os.getenv('EXECUTOR_NICE', '10')),
+            memory_limit_mb=int(os.getenv('EXECUTOR_MEMORY_LIMIT_MB', '0'))
+        )
+
+    def running_count(self) -> int:
+        """目前執行中的數量"""
+        with self._lock:
+            return len(self._running)
+
+    def _record(self, decision: str):
+        """累計准入決策次數"""
+        self.decisions[decision] = self.decisions.get(decision, 0) + 1
+
+    def admit(self) -> Tuple[bool, str]:
+        """
+        判斷目前是否可以啟動新的執行
+
+        Returns:
+            Tuple[bool, str]: 是否准入，以及決策原因
+        """
+        with self._lock:
+            running = len(self._running)
+            now = time.monotonic()
+            ramping = sum(1 for started in self._running.values() if now - started < self.ramp_seconds)
+
+        load = read_load_average()
+        available_mb = read_available_memory_mb()
+
+        # 剛啟動的執行還沒反映在 load 與記憶體量測上，以預估值補上
+        projected_load = (load or 0) + (ramping + 1) * self.run_cpu_estimate
+        load_limit = self.cpu_count * self.max_load_per_cpu
+        projected_free = None
+        if available_mb is not None:
+            projected_free = available_mb - (ramping + 1) * self.run_memory_mb
+
+        metrics = f"running={running}/{self.max_workers} load={load if load is not None else 'n/a'} " \
+                  f"projected_load={projected_load:.1f}/{load_limit:.1f} " \
+                  f"free_mb={f'{available_mb:.0f}' if available_mb is not None else 'n/a'}"
+
+        # 沒有任何執行中的任務時一律准入，避免主機長期忙碌時任務永遠無法開始
+        if running >= self.max_workers:
+            decision, admitted = 'deferred_workers', False
+        elif self.host_checks and running > 0 and load is not None and projected_load > load_limit:
+            decision, admitted = 'deferred_cpu', False
+        elif self.host_checks and running > 0 and projected_free is not None and projected_free < self.min_free_memory_mb:
+            decision, admitted = 'deferred_memory', False
+        else:
+            decision, admitted = 'admitted', True
+
+        # 名額已滿的延後很常見，只記錄次數不印出
+        self._record(decision)
+        if decision != 'deferred_workers':
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🧮 執行器准入決策: {decision} ({metrics})")
+        return admitted, decision
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        在執行緒池中執行任務，並記錄執行中的數量
+
+        Args:
+            fn: 要執行的函數
+            *args: 函數參數
+            **kwargs: 函數關鍵字參數
+
+        Returns:
+            Future: 執行結果
+        """
+        with self._lock:
+            run_id = self._next_id
+            self._next_id += 1
+            self._running[run_id] = time.monotonic()
+
+        def _wrapped():
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running.pop(run_id, None)
+
+        return self._pool.submit(_wrapped)
+
+    def limited_command(self, cmd: List[str]) -> List[str]:
+        """以這個執行器的 nice 值與記憶體上限包裝指令"""
+        return limited_command(cmd, self.nice, self.memory_limit_mb)
+
+    def track(self, process) -> int:
+        """登記執行中的子程序，停止監聽時可以一併終止"""
+        with self._lock:
+            self._processes[process.pid] = process
+            return process.pid
+
+    def untrack(self, pid: int):
+        """移除已結束的子程序"""
+        with self._lock:
+            self._processes.pop(pid, None)
+
+    def terminate_group(self, process, grace_seconds: float = 10):
+        """終止子程序所在的整個 process group"""
+        terminate_group(process, grace_seconds)
+
+    def metrics(self) -> Dict[str, Any]:
+        """回傳執行器目前的狀態與准入決策統計"""
+        return {
+            'running': self.running_count(),
+            'max_workers': self.max_workers,
+            'load_average': read_load_average(),
+            'available_memory_mb': read_available_memory_mb(),
+            'decisions': dict(self.decisions)
+        }
+
+    def shutdown(self):
+        """終止所有執行中的子程序並關閉執行緒池"""
+        with self._lock:
+            processes: List[Any] = list(self._processes.values())
+        for process in processes:
+            try:
+                if os.name == 'posix':
+                    os.killpg(process.pid, signal.SIGTERM)
+                else:
+                    process.terminate()
+            except (ProcessLookupError, PermissionError):
+                pass
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,308 @@
+"""
+健康檢查與偵測延遲 SLO
+記錄每次輪詢的結果，以及每個 item 從建立到被偵測、到狀態更新為 Review 的延遲，
+延遲超過 SLO、輪詢停止或任務卡住時透過 Discord 發出警報，
+並提供 HTTP 健康檢查端點（/healthz、/readyz、/health、/metrics）
+
+使用方式：
+    HEALTH_PORT=8080 python github_project_monitor.py
+    curl http://127.0.0.1:8080/health
+"""
+
+import os
+import json
+import time
+import threading
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Callable
+
+from project_monitor.stats import percentile
+
+# 延遲指標：detection（建立 → 偵測）、review（建立 → Review）
+LAG_METRICS = ('detection', 'review')
+
+
+class HealthMonitor:
+    def __init__(self, detection_slo_seconds: float = 180, review_slo_seconds: float = 3600,
+                 stale_poll_seconds: float = 300, stuck_task_seconds: float = 7200, window: int = 200,
+                 alert_cooldown_seconds: float = 1800):
+        """
+        初始化健康檢查
+
+        Args:
+            detection_slo_seconds: item 建立到被偵測的延遲上限（0 表示不檢查）
+            review_slo_seconds: item 建立到狀態更新為 Review 的延遲上限（0 表示不檢查）
+            stale_poll_seconds: 超過這段時間沒有成功輪詢視為不健康
+            stuck_task_seconds: 任務等待或執行超過這段時間視為卡住
+            window: 計算延遲百分位數的最近樣本數
+            alert_cooldown_seconds: 同一種警報的最短間隔
+        """
+        self.detection_slo_seconds = detection_slo_seconds
+        self.review_slo_seconds = review_slo_seconds
+        self.stale_poll_seconds = stale_poll_seconds
+        self.stuck_task_seconds = stuck_task_seconds
+        self.alert_cooldown_seconds = alert_cooldown_seconds
+
+        # 由監聽器設定：alert(title, description, fields) 發送警報、task_queue 提供佇列狀態、
+        # executor 提供執行中數量與准入決策統計
+        self.alert: Optional[Callable[[str, str, List[Dict[str, Any]]], Any]] = None
+        self.task_queue = None
+        self.executor = None
+
+        self.started_at = time.time()
+        self.last_poll_at: Optional[float] = None
+        self.last_success_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.consecutive_failures = 0
+        self.polls = 0
+        self.lags: Dict[str, deque] = {metric: deque(maxlen=window) for metric in LAG_METRICS}
+        self.breaches: Dict[str, int] = {metric: 0 for metric in LAG_METRICS}
+        self._last_alert: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    @classmethod
+    def from_env(cls) -> 'HealthMonitor':
+        """依環境變數建立健康檢查"""
+        return cls(
+            detection_slo_seconds=float(os.getenv('SLO_DETECTION_SECONDS', '180')),
+            review_slo_seconds=float(os.getenv('SLO_REVIEW_SECONDS', '3600')),
+            stale_poll_seconds=float(os.getenv('SLO_STALE_POLL_SECONDS', '300')),
+            stuck_task_seconds=float(os.getenv('SLO_STUCK_TASK_SECONDS', '7200')),
+            window=int(os.getenv('SLO_WINDOW', '200')),
+            alert_cooldown_seconds=float(os.getenv('SLO_ALERT_COOLDOWN_SECONDS', '1800'))
+        )
+
+    def record_poll(self, success: bool, error: str = None):
+        """記錄一次輪詢的結果"""
+        with self._lock:
+            now = time.time()
+            self.polls += 1
+            self.last_poll_at = now
+            if success:
+                self.last_success_at = now
+                self.consecutive_failures = 0
+                self.last_error = None
+            else:
+                self.consecutive_failures += 1
+                self.last_error = error
+
+    def record_lag(self, metric: str, item_id: str, seconds: float, title: str = None):
+        """
+        記錄一個 item 的延遲，超過 SLO 時發出警報
+
+        Args:
+            metric: detection 或 review
+            item_id: Project Item 的 ID
+            seconds: 延遲秒數
+            title: item 標題（用於警報）
+        """
+        slo = self.detection_slo_seconds if metric == 'detection' else self.review_slo_seconds
+        with self._lock:
+            self.lags[metric].append(seconds)
+            breached = bool(slo) and seconds > slo
+            if breached:
+                self.breaches[metric] += 1
+            p95 = percentile(list(self.lags[metric]), 95)
+
+        if breached:
+            names = {'detection': '偵測延遲', 'review': 'Review 延遲'}
+            self._alert(
+                f"slo_{metric}",
+                f"⏱️ {names[metric]}超過 SLO",
+                f"**{title or item_id}** 從建立到{'被偵測' if metric == 'detection' else '更新為 Review '}花了 {seconds / 60:.1f} 分鐘",
+                [{"name": "SLO", "value": f"{slo / 60:.1f} 分鐘", "inline": True},
+                 {"name": f"最近 {len(self.lags[metric])} 筆 p95", "value": f"{p95 / 60:.1f} 分鐘", "inline": True}]
+            )
+
+    def problems(self) -> List[Dict[str, Any]]:
+        """
+        檢查目前的問題
+
+        Returns:
+            List[Dict[str, Any]]: 問題清單（key、severity（unhealthy/degraded）、message）
+        """
+        now = time.time()
+        problems = []
+        reference = self.last_success_at or self.started_at
+        if now - reference > self.stale_poll_seconds:
+            problems.append({'key': 'stale_poll', 'severity': 'unhealthy',
+                             'message': f"已經 {(now - reference) / 60:.1f} 分鐘沒有成功輪詢"
+                                        + (f"（{self.last_error}）" if self.last_error else '')})
+        if self.consecutive_failures >= 3:
+            problems.append({'key': 'poll_failures', 'severity': 'degraded',
+                             'message': f"連續 {self.consecutive_failures} 次輪詢失敗"})
+
+        if self.task_queue is not None and self.stuck_task_seconds:
+            try:
+                oldest = self.task_queue.oldest()
+            except Exception as e:
+                oldest = {}
+                problems.append({'key': 'task_queue', 'severity': 'degraded', 'message': f"無法讀取任務佇列: {str(e)}"})
+            for state, label in (('queued', '等待'), ('running', '執行')):
+                if oldest.get(state) and now - oldest[state] > self.stuck_task_seconds:
+                    problems.append({'key': f"stuck_{state}", 'severity': 'degraded',
+                                     'message': f"有任務已{label} {(now - oldest[state]) / 60:.0f} 分鐘"})
+        return problems
+
+    def evaluate(self) -> List[Dict[str, Any]]:
+        """檢查問題並對每個問題發出警報（依 alert_cooldown_seconds 節流）"""
+        problems = self.problems()
+        for problem in problems:
+            self._alert(problem['key'], "🚨 監聽器狀態異常", problem['message'], [])
+        return problems
+
+    def _alert(self, key: str, title: str, description: str, fields: List[Dict[str, Any]]):
+        """發出警報，同一種警報在冷卻時間內只發一次"""
+        now = time.time()
+        with self._lock:
+            if now - self._last_alert.get(key, 0) < self.alert_cooldown_seconds:
+                return
+            self._last_alert[key] = now
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {title}: {description}")
+        if self.alert is not None:
+            try:
+                self.alert(title, description, fields)
+            except Exception as e:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 無法發送警報: {str(e)}")
+
+    @property
+    def ready(self) -> bool:
+        """是否已完成第一次成功的輪詢"""
+        return self.last_success_at is not None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """目前的健康狀態"""
+        problems = self.problems()
+        if any(problem['severity'] == 'unhealthy' for problem in problems):
+            status = 'unhealthy'
+        elif problems:
+            status = 'degraded'
+        else:
+            status = 'ok'
+
+        now = time.time()
+        with self._lock:
+            lags = {}
+            for metric in LAG_METRICS:
+                values = list(self.lags[metric])
+                lags[metric] = {
+                    'count': len(values),
+                    'p50': percentile(values, 50),
+                    'p95': percentile(values, 95),
+                    'max': max(values) if values else None,
+                    'last': values[-1] if values else None,
+                    'breaches': self.breaches[metric],
+                    'slo': self.detection_slo_seconds if metric == 'detection' else self.review_slo_seconds
+                }
+            snapshot = {
+                'status': status,
+                'ready': self.ready,
+                'uptime_seconds': round(now - self.started_at, 1),
+                'polls': self.polls,
+                'last_poll_age_seconds': round(now - self.last_poll_at, 1) if self.last_poll_at else None,
+                'last_success_age_seconds': round(now - self.last_success_at, 1) if self.last_success_at else None,
+                'consecutive_failures': self.consecutive_failures,
+                'lag_seconds': lags,
+                'problems': problems
+            }
+        if self.task_queue is not None:
+            try:
+                snapshot['queue'] = self.task_queue.counts()
+            except Exception:
+                snapshot['queue'] = None
+        if self.executor is not None:
+            snapshot['executor'] = self.executor.metrics()
+        return snapshot
+
+    def metrics_text(self) -> str:
+        """Prometheus 文字格式的指標"""
+        snapshot = self.snapshot()
+        lines = [
+            f"project_monitor_up {0 if snapshot['status'] == 'unhealthy' else 1}",
+            f"project_monitor_ready {int(snapshot['ready'])}",
+            f"project_monitor_polls_total {snapshot['polls']}",
+            f"project_monitor_consecutive_poll_failures {snapshot['consecutive_failures']}"
+        ]
+        if snapshot['last_success_age_seconds'] is not None:
+            lines.append(f"project_monitor_last_success_age_seconds {snapshot['last_success_age_seconds']}")
+        for metric, lag in snapshot['lag_seconds'].items():
+            lines.append(f"project_monitor_{metric}_lag_breaches_total {lag['breaches']}")
+            for name in ('p50', 'p95', 'max'):
+                if lag[name] is not None:
+                    lines.append(f'project_monitor_{metric}_lag_seconds{{stat="{name}"}} {lag[name]:.1f}')
+        for state, count in (snapshot.get('queue') or {}).items():
+            lines.append(f'project_monitor_tasks{{state="{state}"}} {count}')
+        executor = snapshot.get('executor')
+        if executor:
+            lines.append(f"project_monitor_executor_running {executor['running']}")
+            lines.append(f"project_monitor_executor_max_workers {executor['max_workers']}")
+            if executor['load_average'] is not None:
+                lines.append(f"project_monitor_load_average {executor['load_average']:.2f}")
+            if executor['available_memory_mb'] is not None:
+                lines.append(f"project_monitor_available_memory_mb {executor['available_memory_mb']:.0f}")
+            for decision, count in sorted(executor['decisions'].items()):
+                lines.append(f'project_monitor_executor_decisions_total{{decision="{decision}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def start(self, host: str = '127.0.0.1', port: int = 0, watchdog_seconds: float = 30):
+        """
+        啟動健康檢查端點與背景檢查執行緒
+
+        背景檢查獨立於輪詢迴圈，輪詢卡住時仍能發出警報。
+
+        Args:
+            host: 監聽位址
+            port: 監聽埠（0 表示不啟動 HTTP 端點，只執行背景檢查）
+            watchdog_seconds: 背景檢查間隔
+        """
+        if port:
+            self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+            threading.Thread(target=self._server.serve_forever, name='health-server', daemon=True).start()
+            print(f"🩺 健康檢查: http://{host}:{self._server.server_address[1]}/health")
+        threading.Thread(target=self._watchdog, args=(watchdog_seconds,), name='health-watchdog', daemon=True).start()
+
+    def _watchdog(self, interval: float):
+        """定期檢查問題並發出警報"""
+        while True:
+            time.sleep(interval)
+            try:
+                self.evaluate()
+            except Exception as e:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 健康檢查失敗: {str(e)}")
+
+
+def _make_handler(health: HealthMonitor):
+    """建立健康檢查端點的 request handler"""
+
+    class HealthHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split('?', 1)[0]
+            if path == '/healthz':
+                healthy = not any(problem['severity'] == 'unhealthy' for problem in health.problems())
+                self._send(200 if healthy else 503, 'text/plain', 'ok' if healthy else 'unhealthy')
+            elif path == '/readyz':
+                self._send(200 if health.ready else 503, 'text/plain', 'ready' if health.ready else 'not ready')
+            elif path == '/health':
+                snapshot = health.snapshot()
+                self._send(503 if snapshot['status'] == 'unhealthy' else 200, 'application/json',
+                           json.dumps(snapshot, ensure_ascii=False, indent=2))
+            elif path == '/metrics':
+                self._send(200, 'text/plain; version=0.0.4', health.metrics_text())
+            else:
+                self._send(404, 'text/plain', 'not found')
+
+        def _send(self, status: int, content_type: str, body: str):
+            data = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', f"{content_type}; charset=utf-8" if 'charset' not in content_type else content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return HealthHandler
@@ -0,0 +1,193 @@
+"""
+精簡的已知 item 集合
+Project 有數十萬個歷史 items 時，以精確的近期視窗加上輪替的 Bloom filter 取代
+完整的 Set[str]，記憶體有固定上限，誤判率可設定
+
+誤判（新的 item 被當成已知）會讓該 item 不被執行，所以預設誤判率很低；
+不會發生漏判（已知的 item 被當成新的），除非超過記憶體上限後最舊的世代被丟棄。
+"""
+
+import os
+import math
+import base64
+import hashlib
+from datetime import datetime
+from typing import Iterable, List, Dict, Any, Union, Set
+
+from project_monitor.state import load_json, save_json
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        """
+        初始化 Bloom filter
+
+        Args:
+            capacity: 預計加入的數量，超過後誤判率會上升
+            error_rate: 加入 capacity 個元素時的誤判率
+        """
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    @classmethod
+    def for_bytes(cls, num_bytes: int, error_rate: float) -> 'BloomFilter':
+        """依記憶體大小建立 Bloom filter，容量由誤判率推算"""
+        capacity = int(num_bytes * 8 * (math.log(2) ** 2) / -math.log(error_rate))
+        return cls(capacity, error_rate)
+
+    def _positions(self, key: str) -> List[int]:
+        """以兩個雜湊值組合出 k 個位置（Kirsch–Mitzenmacher）"""
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key: str):
+        """加入元素"""
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        # 逐一計算位置，不存在的 key 通常在前一兩個位置就能確定
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        bits, num_bits = self.bits, self.num_bits
+        for i in range(self.num_hashes):
+            position = (h1 + i * h2) % num_bits
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    @property
+    def full(self) -> bool:
+        """是否已達預計容量"""
+        return self.count >= self.capacity
+
+    def to_dict(self) -> Dict[str, Any]:
+        """轉為可寫入 JSON 的格式"""
+        return {
+            'capacity': self.capacity,
+            'error_rate': self.error_rate,
+            'count': self.count,
+            'bits': base64.b64encode(bytes(self.bits)).decode('ascii')
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'BloomFilter':
+        """從 to_dict() 的結果還原"""
+        bloom = cls(data['capacity'], data['error_rate'])
+        bloom.bits = bytearray(base64.b64decode(data['bits']))
+        bloom.count = data['count']
+        return bloom
+
+
+class CompactKnownSet:
+    def __init__(self, recent_size: int = 10000, error_rate: float = 1e-6, max_bytes: int = 8 * 1024 * 1024,
+                 generations: int = 4):
+        """
+        初始化精簡的已知 item 集合
+
+        最近加入的 recent_size 個 item 保存在精確的 dict 中，較舊的移入 Bloom filter。
+        Bloom filter 分成數個世代，目前的世代滿了就建立新的世代，超過 generations 個時丟棄最舊的；
+        在舊世代查到的 item 會重新加入目前的世代，所以仍在 Project 中的 item 不會被丟棄。
+
+        Args:
+            recent_size: 精確視窗的大小
+            error_rate: 整體誤判率（平均分配到每個世代）
+            max_bytes: 所有 Bloom filter 世代的記憶體上限
+            generations: 保留的世代數
+        """
+        self.recent_size = recent_size
+        self.error_rate = error_rate
+        self.generations = max(1, generations)
+        self.generation_bytes = max(64, max_bytes // self.generations)
+        self.recent: Dict[str, None] = {}
+        self.filters: List[BloomFilter] = [self._new_filter()]
+
+    def _new_filter(self) -> BloomFilter:
+        return BloomFilter.for_bytes(self.generation_bytes, self.error_rate / self.generations)
+
+    def _add_to_filter(self, item_id: str):
+        """加入目前的世代，滿了就輪替"""
+        current = self.filters[-1]
+        if current.full:
+            current = self._new_filter()
+            self.filters.append(current)
+            if len(self.filters) > self.generations:
+                dropped = self.filters.pop(0)
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ♻️ 已知 items 超過記憶體上限，丟棄最舊的 {dropped.count} 筆記錄")
+        current.add(item_id)
+
+    def add(self, item_id: str):
+        """加入 item"""
+        if item_id in self.recent:
+            return
+        self.recent[item_id] = None
+        if len(self.recent) > self.recent_size:
+            oldest = next(iter(self.recent))
+            del self.recent[oldest]
+            self._add_to_filter(oldest)
+
+    def update(self, item_ids: Iterable[str]):
+        """加入多個 item"""
+        for item_id in item_ids:
+            self.add(item_id)
+
+    def __contains__(self, item_id: str) -> bool:
+        if item_id in self.recent:
+            return True
+        for index in range(len(self.filters) - 1, -1, -1):
+            if item_id in self.filters[index]:
+                if index != len(self.filters) - 1:
+                    self._add_to_filter(item_id)
+                return True
+        return False
+
+    def __len__(self) -> int:
+        """大約的數量（重新加入目前世代的 item 會被重複計算）"""
+        return len(self.recent) + sum(bloom.count for bloom in self.filters)
+
+    @property
+    def nbytes(self) -> int:
+        """Bloom filter 使用的位元組數（不含精確視窗）"""
+        return sum(len(bloom.bits) for bloom in self.filters)
+
+    def save(self, path: str):
+        """寫入狀態檔案"""
+        save_json(path, {
+            'recent': list(self.recent),
+            'filters': [bloom.to_dict() for bloom in self.filters]
+        })
+
+    def load(self, path: str) -> 'CompactKnownSet':
+        """載入 save() 寫入的狀態，檔案不存在時維持空集合"""
+        data = load_json(path, None)
+        if data:
+            self.recent = dict.fromkeys(data.get('recent', []))
+            self.filters = [BloomFilter.from_dict(bloom) for bloom in data.get('filters', [])] or [self._new_filter()]
+        return self
+
+
+def known_item_set(recent_size: int = None) -> Union[Set[str], CompactKnownSet]:
+    """
+    依 KNOWN_ITEMS_MODE 建立已知 item 集合
+
+    exact（預設）為一般的 set；compact 為 CompactKnownSet，
+    大小由 KNOWN_ITEMS_RECENT、KNOWN_ITEMS_ERROR_RATE 與 KNOWN_ITEMS_MAX_MB 設定。
+
+    Args:
+        recent_size: 覆寫精確視窗的大小
+    """
+    if os.getenv('KNOWN_ITEMS_MODE', 'exact').lower() != 'compact':
+        return set()
+    return CompactKnownSet(
+        recent_size=recent_size if recent_size is not None else int(os.getenv('KNOWN_ITEMS_RECENT', '10000')),
+        error_rate=float(os.getenv('KNOWN_ITEMS_ERROR_RATE', '1e-6')),
+        max_bytes=int(float(os.getenv('KNOWN_ITEMS_MAX_MB', '8')) * 1024 * 1024)
+    )
@@ -0,0 +1,187 @@
+"""
+線上效能剖析
+收到 SIGUSR1（或建立觸發檔案）後，對接下來 N 個檢查週期執行 cProfile，
+並比較前後的 tracemalloc 快照與所有執行緒的堆疊，輸出到帶時間戳記的目錄，
+不需重新啟動監聽器即可診斷 CPU 與記憶體問題
+
+使用方式：
+    kill -USR1 <監聽器 PID>                 # 剖析接下來 PROFILE_TICKS 個檢查週期
+    touch .monitor_state/profile.trigger   # 無法送 signal 時（例如 Windows）使用
+"""
+
+import os
+import sys
+import time
+import signal
+import pstats
+import cProfile
+import threading
+import traceback
+import tracemalloc
+from datetime import datetime
+from contextlib import contextmanager
+from typing import Optional, Iterator
+
+
+def dump_thread_stacks(path: str):
+    """將所有執行緒目前的堆疊寫入檔案"""
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    with open(path, 'w', encoding='utf-8') as f:
+        for ident, frame in sys._current_frames().items():
+            f.write(f"# Thread {names.get(ident, '?')} ({ident})\n")
+            f.write(''.join(traceback.format_stack(frame)))
+            f.write('\n')
+
+
+class TickProfiler:
+    # 排除剖析工具本身的配置
+    _SNAPSHOT_FILTERS = [
+        tracemalloc.Filter(False, cProfile.__file__),
+        tracemalloc.Filter(False, pstats.__file__),
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__)
+    ]
+
+    def __init__(self, output_dir: str, ticks: int = 5, top: int = 40, trigger_file: Optional[str] = None):
+        """
+        初始化剖析器
+
+        Args:
+            output_dir: 剖析結果的根目錄，每次剖析會建立一個帶時間戳記的子目錄
+            ticks: 每次觸發要剖析的檢查週期數
+            top: 報表列出的筆數
+            trigger_file: 觸發檔案路徑，存在時開始剖析並刪除檔案
+        """
+        self.output_dir = output_dir
+        self.ticks = max(1, ticks)
+        self.top = top
+        self.trigger_file = trigger_file
+        self._requested = 0
+        self._session: Optional[dict] = None
+
+    @classmethod
+    def from_env(cls) -> 'TickProfiler':
+        """依環境變數建立剖析器"""
+        from project_monitor.state import state_path
+        return cls(
+            os.getenv('PROFILE_DIR') or state_path('profiles'),
+            ticks=int(os.getenv('PROFILE_TICKS', '5')),
+            trigger_file=state_path('profile.trigger')
+        )
+
+    def install_signal_handler(self, signum: int = None):
+        """
+        註冊觸發剖析的 signal（預設 SIGUSR1）
+
+        只能在主執行緒呼叫；不支援 SIGUSR1 的平台會略過，改用觸發檔案。
+        """
+        signum = signum or getattr(signal, 'SIGUSR1', None)
+        if signum is None or threading.current_thread() is not threading.main_thread():
+            return
+        # signal handler 只設定旗標，實際剖析在下一個檢查週期開始
+        signal.signal(signum, lambda _signum, _frame: self.request())
+
+    def request(self, ticks: int = None):
+        """要求剖析接下來的檢查週期"""
+        self._requested = ticks or self.ticks
+
+    @property
+    def active(self) -> bool:
+        """是否正在剖析"""
+        return self._session is not None
+
+    def _check_trigger_file(self):
+        """觸發檔案存在時要求剖析"""
+        if self.trigger_file and os.path.exists(self.trigger_file):
+            try:
+                os.remove(self.trigger_file)
+            except OSError:
+                pass
+            self.request()
+
+    def _start(self):
+        """開始一次剖析"""
+        directory = os.path.join(self.output_dir, datetime.now().strftime('profile-%Y%m%d-%H%M%S'))
+        os.makedirs(directory, exist_ok=True)
+        dump_thread_stacks(os.path.join(directory, 'threads_start.txt'))
+
+        started_tracemalloc = not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start(25)
+
+        self._session = {
+            'dir': directory,
+            'remaining': self._requested,
+            'ticks': 0,
+            'profile': cProfile.Profile(),
+            'snapshot': tracemalloc.take_snapshot().filter_traces(self._SNAPSHOT_FILTERS),
+            'started_tracemalloc': started_tracemalloc,
+            'started_at': time.perf_counter()
+        }
+        self._requested = 0
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🔬 開始剖析接下來 {self._session['remaining']} 個檢查週期 → {directory}")
+
+    def _finish(self):
+        """寫出剖析結果"""
+        session, self._session = self._session, None
+        directory = session['dir']
+
+        # 先取快照，避免把寫出報表時的配置算進去
+        snapshot = tracemalloc.take_snapshot().filter_traces(self._SNAPSHOT_FILTERS)
+        if session['started_tracemalloc']:
+            tracemalloc.stop()
+
+        profile = session['profile']
+        profile.dump_stats(os.path.join(directory, 'cpu.prof'))
+        with open(os.path.join(directory, 'cpu.txt'), 'w', encoding='utf-8') as f:
+            stats = pstats.Stats(profile, stream=f)
+            stats.sort_stats('cumulative').print_stats(self.top)
+            stats.sort_stats('tottime').print_stats(self.top)
+
+        with open(os.path.join(directory, 'memory.txt'), 'w', encoding='utf-8') as f:
+            current = sum(stat.size for stat in snapshot.statistics('filename'))
+            f.write(f"# 剖析期間 {session['ticks']} 個檢查週期、{time.perf_counter() - session['started_at']:.1f} 秒\n")
+            f.write(f"# 目前追蹤的配置總量: {current / 1024:.1f} KiB\n\n")
+            f.write("# 記憶體增加最多的位置\n")
+            for stat in snapshot.compare_to(session['snapshot'], 'lineno')[:self.top]:
+                f.write(f"{stat}\n")
+            f.write("\n# 目前配置最多的位置\n")
+            for stat in snapshot.statistics('lineno')[:self.top]:
+                f.write(f"{stat}\n")
+
+        dump_thread_stacks(os.path.join(directory, 'threads_end.txt'))
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🔬 剖析完成: {directory}")
+
+    @contextmanager
+    def tick(self) -> Iterator[None]:
+        """
+        包住一個檢查週期；有剖析要求時對這個週期執行 cProfile
+
+        cProfile 只會記錄執行檢查週期的執行緒，背景執行中的 Claude 任務
+        可從開始與結束時的執行緒堆疊觀察。
+        """
+        self._check_trigger_file()
+        if self._session is None and self._requested:
+            try:
+                self._start()
+            except Exception as e:
+                self._requested = 0
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ❌ 無法開始剖析: {e}")
+
+        if self._session is None:
+            yield
+            return
+
+        self._session['profile'].enable()
+        try:
+            yield
+        finally:
+            self._session['profile'].disable()
+            self._session['ticks'] += 1
+            self._session['remaining'] -= 1
+            if self._session['remaining'] <= 0:
+                try:
+                    self._finish()
+                except Exception as e:
+                    self._session = None
+                    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ❌ 無法寫出剖析結果: {e}")
@@ -0,0 +1,251 @@
+"""
+提示詞建立
+任務內容（item 標題與內文）送給 Claude 前先量測大小並壓縮：合併重複的行、
+截斷過長的行與程式碼區塊（保留開頭與結尾並加上明確的標記），
+仍然過大的內容改存成檔案讓 Claude 自行讀取，不直接放在命令列參數中
+"""
+
+import os
+import re
+import time
+import hashlib
+from typing import Dict, Any, List, Tuple
+
+from project_monitor.batching import build_batch_prompt
+
+# 至少這麼長的行重複出現時才省略（避免把 "}"、"```" 之類的短行當成重複內容）
+_MIN_DUPLICATE_LINE_CHARS = 40
+
+
+def _head_tail(lines: List[str], keep: int) -> Tuple[List[str], int]:
+    """保留開頭約三分之二與結尾約三分之一的行，回傳結果與省略的行數"""
+    if len(lines) <= keep:
+        return lines, 0
+    head = max(1, keep * 2 // 3)
+    tail = max(1, keep - head)
+    omitted = lines[head:len(lines) - tail]
+    marker = f"[… 省略中間 {len(omitted)} 行、{sum(len(line) + 1 for line in omitted)} 字元 …]"
+    return lines[:head] + [marker] + lines[len(lines) - tail:], len(omitted)
+
+
+def compact_text(text: str, max_chars: int = 40000, max_line_chars: int = 2000,
+                 max_block_lines: int = 200) -> Tuple[str, Dict[str, int]]:
+    """
+    壓縮任務內容
+
+    1. 連續重複的行合併為一行並標註重複次數
+    2. 較長的行（例如 log）再次出現時省略
+    3. 過長的行截斷
+    4. 超過 max_block_lines 行的程式碼區塊只保留開頭與結尾
+    5. 整體仍超過 max_chars 時只保留開頭與結尾
+
+    Args:
+        text: 原始內容
+        max_chars: 整體字元上限
+        max_line_chars: 單行字元上限
+        max_block_lines: 單一程式碼區塊（``` 包住的內容）的行數上限
+
+    Returns:
+        Tuple[str, Dict[str, int]]: 壓縮後的內容與統計（duplicate_lines、truncated_lines、omitted_lines）
+    """
+    stats = {'duplicate_lines': 0, 'truncated_lines': 0, 'omitted_lines': 0}
+    lines = [line.rstrip() for line in text.replace('\r\n', '\n').split('\n')]
+
+    # 1. 連續重複的行
+    collapsed: List[str] = []
+    index = 0
+    while index < len(lines):
+        run = 1
+        while index + run < len(lines) and lines[index + run] == lines[index] and lines[index]:
+            run += 1
+        collapsed.append(lines[index])
+        if run > 2:
+            collapsed.append(f"[… 上一行重複 {run - 1} 次 …]")
+            stats['duplicate_lines'] += run - 1
+        elif run == 2:
+            collapsed.append(lines[index])
+        index += run
+
+    # 2. 再次出現的長行，連續省略的行只留一個標記
+    seen = set()
+    deduped: List[str] = []
+    for line in collapsed:
+        if len(line) >= _MIN_DUPLICATE_LINE_CHARS and line in seen:
+            stats['duplicate_lines'] += 1
+            if not deduped or not deduped[-1].startswith('[… 省略重複的行'):
+                deduped.append("[… 省略重複的行 …]")
+            continue
+        seen.add(line)
+        deduped.append(line)
+
+    # 3. 過長的行
+    for i, line in enumerate(deduped):
+        if len(line) > max_line_chars:
+            deduped[i] = f"{line[:max_line_chars]} [… 此行截斷 {len(line) - max_line_chars} 字元 …]"
+            stats['truncated_lines'] += 1
+
+    # 4. 過長的程式碼區塊
+    result: List[str] = []
+    block: List[str] = []
+    in_block = False
+    for line in deduped:
+        if line.lstrip().startswith('```'):
+            if in_block:
+                kept, omitted = _head_tail(block, max_block_lines)
+                result.extend(kept)
+                stats['omitted_lines'] += omitted
+                block = []
+            in_block = not in_block
+            result.append(line)
+        elif in_block:
+            block.append(line)
+        else:
+            result.append(line)
+    result.extend(block)
+
+    # 5. 整體上限（依平均行長估計可保留的行數）
+    compacted = '\n'.join(result)
+    if len(compacted) > max_chars:
+        average = max(1, len(compacted) // max(1, len(result)))
+        kept, omitted = _head_tail(result, max(2, max_chars // average))
+        compacted = '\n'.join(kept)[:max_chars]
+        stats['omitted_lines'] += omitted
+    return compacted, stats
+
+
+class PromptBuilder:
+    def __init__(self, attachment_dir: str, enabled: bool = True, max_chars: int = 40000,
+                 inline_max_chars: int = 12000, max_line_chars: int = 2000, max_block_lines: int = 200,
+                 attachment_ttl_seconds: float = 7 * 86400):
+        """
+        初始化提示詞建立
+
+        Args:
+            attachment_dir: 過大內容存放的目錄
+            enabled: 是否壓縮（False 時與原本相同，直接使用任務內容）
+            max_chars: 每個任務壓縮後的字元上限
+            inline_max_chars: 原始內容超過此長度時存成檔案，提示詞中只放壓縮後的摘要與檔案路徑
+            max_line_chars: 單行字元上限
+            max_block_lines: 單一程式碼區塊的行數上限
+            attachment_ttl_seconds: 附件保留時間（依最後使用時間計算）
+        """
+        self.attachment_dir = attachment_dir
+        self.enabled = enabled
+        self.max_chars = max_chars
+        self.inline_max_chars = inline_max_chars
+        self.max_line_chars = max_line_chars
+        self.max_block_lines = max_block_lines
+        self.attachment_ttl_seconds = attachment_ttl_seconds
+
+    @classmethod
+    def from_env(cls, attachment_dir: str) -> 'PromptBuilder':
+        """依環境變數建立提示詞建立"""
+        return cls(
+            attachment_dir,
+            enabled=os.getenv('PROMPT_COMPACT', 'true').lower() == 'true',
+            max_chars=int(os.getenv('PROMPT_MAX_CHARS', '40000')),
+            inline_max_chars=int(os.getenv('PROMPT_INLINE_MAX_CHARS', '12000')),
+            max_line_chars=int(os.getenv('PROMPT_MAX_LINE_CHARS', '2000')),
+            max_block_lines=int(os.getenv('PROMPT_MAX_BLOCK_LINES', '200')),
+            attachment_ttl_seconds=float(os.getenv('PROMPT_ATTACHMENT_TTL_DAYS', '7')) * 86400
+        )
+
+    def _attach(self, content: str) -> str:
+        """將原始內容存成檔案（依內容命名，相同內容只存一份），回傳檔案路徑"""
+        os.makedirs(self.attachment_dir, exist_ok=True)
+        path = os.path.join(self.attachment_dir, f"task-{hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]}.md")
+        if os.path.exists(path):
+            # 重複使用的附件更新修改時間，避免剛被引用就因過期被刪除
+            os.utime(path)
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+        self._prune(keep=path)
+        return path
+
+    def _prune(self, keep: str = None):
+        """刪除過期的附件（keep 為即將回傳的附件，不會刪除）"""
+        cutoff = time.time() - self.attachment_ttl_seconds
+        for filename in os.listdir(self.attachment_dir):
+            path = os.path.join(self.attachment_dir, filename)
+            if path == keep:
+                continue
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def attachments_in(self, prompt: str) -> Dict[str, str]:
+        """
+        取得提示詞中引用的附件內容（交給遠端 worker 執行時隨工作一起送出）
+
+        Returns:
+            Dict[str, str]: 附件路徑 -> 內容
+        """
+        attachments = {}
+        pattern = re.escape(os.path.join(self.attachment_dir, '')) + r'task-[0-9a-f]{16}\.md'
+        for path in set(re.findall(pattern, prompt)):
+            with open(path, 'r', encoding='utf-8') as f:
+                attachments[path] = f.read()
+        return attachments
+
+    def compact_task(self, content: str) -> Tuple[str, Dict[str, int]]:
+        """
+        壓縮單一任務內容，過大時存成附件
+
+        Returns:
+            Tuple[str, Dict[str, int]]: 提示詞中的任務內容與統計
+        """
+        compacted, stats = compact_text(content, self.max_chars, self.max_line_chars, self.max_block_lines)
+        stats['attachments'] = 0
+        if len(content) > self.inline_max_chars:
+            path = self._attach(content)
+            summary, _ = compact_text(compacted, self.inline_max_chars, self.inline_max_chars, self.max_block_lines)
+            compacted = (f"{summary}\n\n[完整內容共 {len(content)} 字元，以上為節錄，"
+                         f"完整內容存放於檔案 {path}，請先閱讀該檔案再開始]")
+            stats['attachments'] = 1
+        return compacted, stats
+
+    def build(self, batch: List[Dict[str, Any]]) -> Tuple[str, Dict[str, int]]:
+        """
+        建立提示詞並量測大小
+
+        Args:
+            batch: 任務清單（item_id、item_data、task_content）
+
+        Returns:
+            Tuple[str, Dict[str, int]]: 提示詞與大小統計
+            （raw_chars、chars、duplicate_lines、truncated_lines、omitted_lines、attachments）
+        """
+        metrics = {'raw_chars': 0, 'chars': 0, 'duplicate_lines': 0, 'truncated_lines': 0,
+                   'omitted_lines': 0, 'attachments': 0}
+        compacted_batch = []
+        for task in batch:
+            metrics['raw_chars'] += len(task['task_content'])
+            if not self.enabled:
+                compacted_batch.append(task)
+                continue
+            content, stats = self.compact_task(task['task_content'])
+            for name, value in stats.items():
+                metrics[name] += value
+            compacted_batch.append({**task, 'task_content': content})
+
+        prompt = build_batch_prompt(compacted_batch)
+        metrics['chars'] = len(prompt)
+        return prompt, metrics
+
+
+def format_prompt_metrics(metrics: Dict[str, int]) -> str:
+    """將提示詞統計格式化為一行文字"""
+    text = f"{metrics['raw_chars']:,} → {metrics['chars']:,} 字元"
+    details = []
+    if metrics.get('duplicate_lines'):
+        details.append(f"合併 {metrics['duplicate_lines']} 行重複")
+    if metrics.get('truncated_lines'):
+        details.append(f"截斷 {metrics['truncated_lines']} 行")
+    if metrics.get('omitted_lines'):
+        details.append(f"省略 {metrics['omitted_lines']} 行")
+    if metrics.get('attachments'):
+        details.append(f"{metrics['attachments']} 個附件")
+    return text + (f"（{'、'.join(details)}）" if details else '')
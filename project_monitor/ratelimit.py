@@ -0,0 +1,208 @@
+"""
+跨程序共用的請求速率限制
+監聽器、GitHub Actions 處理器與其他執行個體共用同一個 GitHub token 的 GraphQL 額度
+與同一個 Discord webhook 的限制，所有請求送出前都從 SQLite 中的 token bucket 取得額度
+
+bucket 是本機的 SQLite 檔案，只有指向同一個 RATE_LIMIT_DB 的程序（同一台主機，
+例如監聽器與 self-hosted runner）會互相協調；在 GitHub-hosted runner 上執行的處理器
+使用 runner 自己的 bucket，與監聽器之間沒有共用額度。
+
+每個 bucket 的速率依權重分給最近有發送請求的程序：只有一個程序在執行時可使用全部額度，
+多個程序同時執行時依 RATE_LIMIT_WEIGHTS 分配，任何一方都不會把其他程序餓死。
+收到 429 或 Retry-After 時，所有程序一起暫停到指定時間。
+"""
+
+import os
+import time
+import socket
+from datetime import datetime
+from typing import Dict, Tuple, Optional
+
+from project_monitor.state import connect
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS consumers (
+    bucket TEXT NOT NULL,
+    consumer TEXT NOT NULL,
+    weight REAL NOT NULL,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (bucket, consumer)
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    bucket TEXT PRIMARY KEY,
+    blocked_until REAL NOT NULL
+);
+"""
+
+# 呼叫類型 -> bucket（GraphQL 查詢與 mutation 共用同一個 token 的額度）
+CALL_BUCKETS = {
+    'graphql_query': 'graphql',
+    'graphql_mutation': 'graphql',
+    'discord': 'discord'
+}
+
+
+def parse_weights(value: str) -> Dict[str, float]:
+    """
+    解析 RATE_LIMIT_WEIGHTS（例如 "monitor:2,processor:1"）
+
+    Returns:
+        Dict[str, float]: consumer 名稱 -> 權重
+    """
+    weights = {}
+    for part in (value or '').split(','):
+        name, _, weight = part.strip().partition(':')
+        if name and weight:
+            weights[name] = float(weight)
+    return weights
+
+
+class SharedRateLimiter:
+    def __init__(self, path: str, rates: Dict[str, Tuple[float, float]], consumer: str, weight: float = 1.0,
+                 idle_seconds: float = 10):
+        """
+        初始化共用速率限制
+
+        Args:
+            path: SQLite 資料庫路徑（共用的程序需指向同一個檔案）
+            rates: bucket -> (每秒補充的額度, 最大累積額度)，補充額度 <= 0 的 bucket 不限制
+            consumer: 這個程序的名稱（同名的多個程序各自計算，權重相同）
+            weight: 這個程序分配額度的權重
+            idle_seconds: 超過這段時間沒有請求的程序不參與分配
+        """
+        self.path = path
+        self.rates = {bucket: rate for bucket, rate in rates.items() if rate[0] > 0}
+        self.consumer = f"{consumer}@{socket.gethostname()}:{os.getpid()}"
+        self.weight = max(weight, 0.01)
+        self.idle_seconds = idle_seconds
+        with connect(self.path) as conn:
+            conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_env(cls, consumer: str) -> Optional['SharedRateLimiter']:
+        """
+        依環境變數建立速率限制，RATE_LIMIT_DB 設為空字串時停用
+
+        Args:
+            consumer: 程序名稱（monitor、processor），用來查詢 RATE_LIMIT_WEIGHTS
+        """
+        from project_monitor.state import state_path
+        path = os.getenv('RATE_LIMIT_DB')
+        if path is None:
+            path = state_path('ratelimit.db')
+        if not path:
+            return None
+        if os.getenv('RUNNER_ENVIRONMENT') == 'github-hosted':
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ℹ️ 在 GitHub-hosted runner 上執行，"
+                  f"速率限制只在這個 runner 內生效，不會與監聽器共用額度")
+        weights = parse_weights(os.getenv('RATE_LIMIT_WEIGHTS', 'monitor:2,processor:1'))
+        return cls(
+            path,
+            rates={
+                'graphql': (float(os.getenv('RATE_LIMIT_GRAPHQL_PER_MINUTE', '80')) / 60,
+                            float(os.getenv('RATE_LIMIT_GRAPHQL_BURST', '20'))),
+                'discord': (float(os.getenv('RATE_LIMIT_DISCORD_PER_MINUTE', '25')) / 60,
+                            float(os.getenv('RATE_LIMIT_DISCORD_BURST', '5')))
+            },
+            consumer=consumer,
+            weight=weights.get(consumer, 1.0)
+        )
+
+    def _try_acquire(self, bucket: str, cost: float) -> float:
+        """
+        嘗試取得額度
+
+        Returns:
+            float: 0 表示已取得，否則為建議等待的秒數
+        """
+        rate, burst = self.rates[bucket]
+        now = time.time()
+        with connect(self.path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                blocked = conn.execute("SELECT blocked_until FROM buckets WHERE bucket = ?", (bucket,)).fetchone()
+                if blocked and blocked['blocked_until'] > now:
+                    conn.execute("COMMIT")
+                    return blocked['blocked_until'] - now
+
+                # 清除早已停止的程序，只有最近有請求的程序參與分配
+                conn.execute("DELETE FROM consumers WHERE bucket = ? AND updated_at < ?",
+                             (bucket, now - self.idle_seconds * 10))
+                row = conn.execute("SELECT tokens, updated_at FROM consumers WHERE bucket = ? AND consumer = ?",
+                                   (bucket, self.consumer)).fetchone()
+                total_weight = conn.execute(
+                    "SELECT COALESCE(SUM(weight), 0) AS total FROM consumers "
+                    "WHERE bucket = ? AND consumer != ? AND updated_at >= ?",
+                    (bucket, self.consumer, now - self.idle_seconds)
+                ).fetchone()['total'] + self.weight
+                share = self.weight / total_weight
+                my_rate, my_burst = rate * share, max(cost, burst * share)
+
+                if row is None:
+                    tokens = my_burst
+                else:
+                    tokens = min(my_burst, row['tokens'] + (now - row['updated_at']) * my_rate)
+
+                wait = 0.0
+                if tokens >= cost:
+                    tokens -= cost
+                else:
+                    wait = (cost - tokens) / my_rate
+                conn.execute(
+                    "INSERT INTO consumers (bucket, consumer, weight, tokens, updated_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(bucket, consumer) DO UPDATE SET weight = excluded.weight, tokens = excluded.tokens, "
+                    "updated_at = excluded.updated_at",
+                    (bucket, self.consumer, self.weight, tokens, now)
+                )
+                conn.execute("COMMIT")
+                return wait
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def acquire(self, call_type: str, cost: float = 1.0) -> float:
+        """
+        取得發送一個請求的額度，額度不足時等待
+
+        Args:
+            call_type: 呼叫類型（見 CALL_BUCKETS）
+            cost: 這個請求消耗的額度
+
+        Returns:
+            float: 等待的秒數
+        """
+        bucket = CALL_BUCKETS.get(call_type, call_type)
+        if bucket not in self.rates:
+            return 0.0
+
+        waited = 0.0
+        while True:
+            wait = self._try_acquire(bucket, cost)
+            if wait <= 0:
+                if waited >= 1:
+                    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🪣 {bucket} 額度不足，等待 {waited:.1f} 秒")
+                return waited
+            # 分段等待，其他程序停止後可以較快取得它們釋出的額度
+            wait = min(wait, 5.0)
+            time.sleep(wait)
+            waited += wait
+
+    def block(self, call_type: str, seconds: float):
+        """
+        收到 429 或 Retry-After 時讓所有程序暫停使用這個 bucket
+
+        Args:
+            call_type: 呼叫類型
+            seconds: 暫停秒數
+        """
+        bucket = CALL_BUCKETS.get(call_type, call_type)
+        if bucket not in self.rates or seconds <= 0:
+            return
+        until = time.time() + seconds
+        with connect(self.path) as conn:
+            conn.execute(
+                "INSERT INTO buckets (bucket, blocked_until) VALUES (?, ?) "
+                "ON CONFLICT(bucket) DO UPDATE SET blocked_until = MAX(blocked_until, excluded.blocked_until)",
+                (bucket, until)
+            )
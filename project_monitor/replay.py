@@ -0,0 +1,271 @@
+"""
+GraphQL 流量錄製與重播
+錄製模式（HTTP_RECORD_DIR）會把實際的請求與回應寫成 fixture 檔案（移除 token），
+重播伺服器依請求內容回傳錄製的回應並模擬延遲，不需要網路即可對完整的監聽流程做回歸與負載測試
+
+使用方式：
+    HTTP_RECORD_DIR=fixtures/github python github_project_monitor.py        # 錄製
+    python -m project_monitor.replay fixtures/github --port 8765 --latency-ms 80 --jitter-ms 20
+    GITHUB_GRAPHQL_URL=http://127.0.0.1:8765/graphql \\
+    DISCORD_WEBHOOK_URL=http://127.0.0.1:8765/discord python github_project_monitor.py
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+from urllib.parse import urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional
+
+# 可能出現在請求或回應中的 GitHub token 與 Discord webhook 路徑
+_SECRET_PATTERNS = [
+    re.compile(r'gh[pousr]_[A-Za-z0-9]{20,}'),
+    re.compile(r'github_pat_[A-Za-z0-9_]{20,}'),
+    re.compile(r'(/api/webhooks/\d+/)[A-Za-z0-9_\-]+')
+]
+REDACTED = '[REDACTED]'
+
+
+def redact(value: Any) -> Any:
+    """遞迴移除字串中的 token"""
+    if isinstance(value, str):
+        for pattern in _SECRET_PATTERNS:
+            value = pattern.sub(lambda match: (match.group(1) if match.groups() else '') + REDACTED, value)
+        return value
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    return value
+
+
+def _normalize_query(query: str) -> str:
+    """壓縮 GraphQL 查詢中的空白，讓排版不同的相同查詢對應到同一個 fixture"""
+    return ' '.join((query or '').split())
+
+
+def request_keys(path: str, body: Any) -> List[str]:
+    """
+    計算請求的比對鍵：先比對完整內容（查詢 + 變數），找不到時只比對查詢
+
+    路徑只依類別比對（graphql、discord），錄製與重播時的網址不同也能對應。
+
+    Args:
+        path: 請求路徑（不含主機）
+        body: JSON 請求內容
+
+    Returns:
+        List[str]: [精確鍵, 查詢鍵]
+    """
+    path = _fixture_path(path)
+    if isinstance(body, dict) and 'query' in body:
+        query = _normalize_query(body.get('query'))
+        variables = json.dumps(redact(body.get('variables') or {}), sort_keys=True)
+        exact = f"{path}|{query}|{variables}"
+        loose = f"{path}|{query}"
+    else:
+        exact = loose = path
+    return [hashlib.sha256(key.encode('utf-8')).hexdigest()[:16] for key in (exact, loose)]
+
+
+def _fixture_path(path: str) -> str:
+    """依請求路徑決定 fixture 的檔名前綴"""
+    if 'graphql' in path:
+        return 'graphql'
+    if '/api/webhooks/' in path or path.rstrip('/').endswith('discord'):
+        return 'discord'
+    return re.sub(r'[^A-Za-z0-9]+', '_', path).strip('_') or 'root'
+
+
+class RecordingSession:
+    def __init__(self, session, directory: str):
+        """
+        包裝 requests.Session，將每個請求與回應寫入 fixture 目錄
+
+        Args:
+            session: 實際發送請求的 requests.Session
+            directory: fixture 目錄
+        """
+        self.session = session
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def post(self, url: str, **kwargs):
+        """發送請求並錄製"""
+        start = time.perf_counter()
+        response = self.session.post(url, **kwargs)
+        latency_ms = (time.perf_counter() - start) * 1000
+        try:
+            self._record(url, kwargs.get('json'), response, latency_ms)
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 無法錄製請求: {str(e)}")
+        return response
+
+    def _record(self, url: str, body: Any, response, latency_ms: float):
+        """將一組請求與回應附加到對應的 fixture 檔案"""
+        path = redact(urlparse(url).path)
+        exact_key, loose_key = request_keys(path, body)
+        try:
+            response_body = response.json()
+        except ValueError:
+            response_body = response.text
+
+        filename = os.path.join(self.directory, f"{_fixture_path(path)}-{exact_key}.json")
+        with self._lock:
+            fixture = {'path': path, 'keys': [exact_key, loose_key], 'request': redact(body), 'responses': []}
+            if os.path.exists(filename):
+                with open(filename, 'r', encoding='utf-8') as f:
+                    fixture = json.load(f)
+            fixture['responses'].append({
+                'status': response.status_code,
+                'headers': {key: value for key, value in response.headers.items()
+                            if key.lower() in ('content-type', 'retry-after') or key.lower().startswith('x-ratelimit')},
+                'body': redact(response_body),
+                'latency_ms': round(latency_ms, 1)
+            })
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(fixture, f, ensure_ascii=False, indent=2)
+
+
+class FixtureStore:
+    def __init__(self, directory: str, loop: bool = False):
+        """
+        載入 fixture 目錄
+
+        同一個請求錄到多個回應時依序回傳（例如輪詢時 items 逐漸增加），
+        用完後重複最後一個回應；loop 為 True 時從頭開始。
+
+        Args:
+            directory: fixture 目錄
+            loop: 回應用完後是否從頭重播
+        """
+        self.loop = loop
+        self.fixtures: Dict[str, Dict[str, Any]] = {}
+        self.loose: Dict[str, Dict[str, Any]] = {}
+        self._served: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith('.json'):
+                continue
+            with open(os.path.join(directory, filename), 'r', encoding='utf-8') as f:
+                fixture = json.load(f)
+            exact_key, loose_key = fixture['keys']
+            self.fixtures[exact_key] = fixture
+            self.loose.setdefault(loose_key, fixture)
+
+    def lookup(self, path: str, body: Any) -> Optional[Dict[str, Any]]:
+        """
+        找出請求對應的下一個回應
+
+        Returns:
+            Optional[Dict[str, Any]]: 錄製的回應，找不到時回傳 None
+        """
+        exact_key, loose_key = request_keys(path, body)
+        fixture = self.fixtures.get(exact_key) or self.loose.get(loose_key)
+        if fixture is None:
+            return None
+        with self._lock:
+            index = self._served.get(id(fixture), 0)
+            self._served[id(fixture)] = index + 1
+        responses = fixture['responses']
+        return responses[index % len(responses)] if self.loop else responses[min(index, len(responses) - 1)]
+
+
+def make_handler(store: FixtureStore, latency_ms: Optional[float], jitter_ms: float, seed: int):
+    """建立重播伺服器的 request handler"""
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+
+    class ReplayHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            raw = self.rfile.read(length) if length else b''
+            try:
+                body = json.loads(raw) if raw else None
+            except ValueError:
+                body = None
+
+            recorded = store.lookup(redact(self.path), body)
+            if recorded is None:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ❓ 沒有對應的 fixture: {self.path}")
+                self._send(404, {'Content-Type': 'application/json'}, {'errors': [{'message': 'no recorded fixture'}]})
+                return
+
+            # 未指定延遲時使用錄製時的延遲
+            delay = recorded.get('latency_ms', 0) if latency_ms is None else latency_ms
+            with rng_lock:
+                delay += rng.uniform(-jitter_ms, jitter_ms) if jitter_ms else 0
+            time.sleep(max(0.0, delay) / 1000)
+            self._send(recorded['status'], recorded.get('headers', {}), recorded['body'])
+
+        def _send(self, status: int, headers: Dict[str, str], body: Any):
+            data = b'' if status == 204 else (json.dumps(body) if not isinstance(body, str) else body).encode('utf-8')
+            self.send_response(status)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ReplayHandler
+
+
+def serve(directory: str, host: str = '127.0.0.1', port: int = 8765, latency_ms: Optional[float] = None,
+          jitter_ms: float = 0, seed: int = 0, loop: bool = False) -> ThreadingHTTPServer:
+    """
+    建立重播伺服器（呼叫端負責 serve_forever / shutdown）
+
+    Args:
+        directory: fixture 目錄
+        host: 監聽位址
+        port: 監聽埠（0 表示自動選擇）
+        latency_ms: 固定延遲毫秒數，None 表示使用錄製時的延遲
+        jitter_ms: 延遲的隨機抖動範圍
+        seed: 抖動的亂數種子，相同種子產生相同的延遲序列
+        loop: 回應用完後是否從頭重播
+
+    Returns:
+        ThreadingHTTPServer: 伺服器
+    """
+    store = FixtureStore(directory, loop=loop)
+    server = ThreadingHTTPServer((host, port), make_handler(store, latency_ms, jitter_ms, seed))
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 📼 重播 {len(store.fixtures)} 個 fixture: http://{host}:{server.server_address[1]}")
+    return server
+
+
+def main():
+    """啟動重播伺服器"""
+    parser = argparse.ArgumentParser(description='重播錄製的 GitHub GraphQL / Discord 流量')
+    parser.add_argument('directory', help='fixture 目錄（HTTP_RECORD_DIR）')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=None, help='固定延遲，預設使用錄製時的延遲')
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--loop', action='store_true', help='回應用完後從頭重播')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        print(f"❌ 找不到 fixture 目錄: {args.directory}")
+        sys.exit(1)
+
+    server = serve(args.directory, args.host, args.port, args.latency_ms, args.jitter_ms, args.seed, args.loop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+"""
+Git 倉庫管理
+在背景定期 prefetch 基準分支，每次執行前把工作目錄快速重設到最新的基準版本，
+執行成功後由監聽器自行 commit 並以重試的方式 push，並統計每個任務花在 Git 的時間
+
+平行執行時，除了 PROJECT_DIR 之外的工作目錄以 git worktree 建立，
+共用同一份物件資料庫，不需要重新 clone。
+"""
+
+import os
+import time
+import random
+import threading
+import subprocess
+from datetime import datetime
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Iterator
+
+
+class GitError(Exception):
+    """Git 指令執行失敗"""
+
+
+class RepoManager:
+    def __init__(self, project_dir: str, enabled: bool = False, remote: str = 'origin', base_branch: str = None,
+                 worktree_root: str = None, prefetch_seconds: float = 300, max_staleness_seconds: float = 60,
+                 push_attempts: int = 4, git_timeout: float = 120):
+        """
+        初始化倉庫管理器
+
+        Args:
+            project_dir: 主要工作目錄（PROJECT_DIR）
+            enabled: 是否由監聽器管理 Git（False 時維持由 Claude 自行 commit/push）
+            remote: 遠端名稱
+            base_branch: 基準分支，未指定時使用遠端的預設分支
+            worktree_root: 平行執行時建立額外 worktree 的目錄
+            prefetch_seconds: 背景 prefetch 間隔
+            max_staleness_seconds: 執行前若超過這段時間沒有 fetch，先同步再開始
+            push_attempts: push 被拒絕時最多嘗試次數
+            git_timeout: 單一 Git 指令的逾時秒數
+        """
+        self.project_dir = project_dir
+        self.enabled = enabled
+        self.remote = remote
+        self.base_branch = base_branch
+        self.worktree_root = worktree_root
+        self.prefetch_seconds = prefetch_seconds
+        self.max_staleness_seconds = max_staleness_seconds
+        self.push_attempts = max(1, push_attempts)
+        self.git_timeout = git_timeout
+
+        self.last_fetch: Optional[float] = None
+        self._fetch_lock = threading.Lock()
+        self._push_lock = threading.Lock()
+        self._pool_lock = threading.Lock()
+        self._free: List[str] = [project_dir]
+        self._created = 0
+        self._prefetch_thread = None
+
+    @classmethod
+    def from_env(cls, project_dir: str) -> 'RepoManager':
+        """依環境變數建立倉庫管理器"""
+        from project_monitor.state import state_path
+        return cls(
+            project_dir,
+            enabled=os.getenv('REPO_MANAGED', 'false').lower() == 'true',
+            remote=os.getenv('REPO_REMOTE', 'origin'),
+            base_branch=os.getenv('REPO_BASE_BRANCH') or None,
+            worktree_root=os.getenv('REPO_WORKTREE_DIR') or state_path('worktrees'),
+            prefetch_seconds=float(os.getenv('REPO_PREFETCH_SECONDS', '300')),
+            max_staleness_seconds=float(os.getenv('REPO_MAX_STALENESS_SECONDS', '60')),
+            push_attempts=int(os.getenv('REPO_PUSH_ATTEMPTS', '4'))
+        )
+
+    def _git(self, args: List[str], cwd: str = None, check: bool = True) -> subprocess.CompletedProcess:
+        """執行 Git 指令"""
+        result = subprocess.run(
+            ['git'] + args, cwd=cwd or self.project_dir, capture_output=True, text=True, timeout=self.git_timeout
+        )
+        if check and result.returncode != 0:
+            raise GitError(f"git {' '.join(args)}: {(result.stderr or result.stdout).strip()}")
+        return result
+
+    @property
+    def base_ref(self) -> str:
+        """遠端基準分支的 ref"""
+        return f"{self.remote}/{self._base_branch()}"
+
+    def _base_branch(self) -> str:
+        """取得基準分支，未設定時使用遠端 HEAD 指向的分支"""
+        if not self.base_branch:
+            result = self._git(['symbolic-ref', '--short', f"refs/remotes/{self.remote}/HEAD"], check=False)
+            if result.returncode == 0 and '/' in result.stdout:
+                self.base_branch = result.stdout.strip().split('/', 1)[1]
+            else:
+                self.base_branch = 'main'
+        return self.base_branch
+
+    def prefetch(self) -> float:
+        """
+        從遠端抓取基準分支的最新版本
+
+        Returns:
+            float: 花費秒數
+        """
+        start = time.perf_counter()
+        branch = self._base_branch()
+        with self._fetch_lock:
+            self._git(['fetch', '--prune', '--no-tags', self.remote,
+                       f"+refs/heads/{branch}:refs/remotes/{self.remote}/{branch}"])
+            self.last_fetch = time.monotonic()
+        return time.perf_counter() - start
+
+    def start_prefetch(self):
+        """啟動背景 prefetch 執行緒，讓執行前的同步只需要本機操作"""
+        if not self.enabled or (self._prefetch_thread and self._prefetch_thread.is_alive()):
+            return
+        self._prefetch_thread = threading.Thread(target=self._prefetch_loop, name='git-prefetch', daemon=True)
+        self._prefetch_thread.start()
+
+    def _prefetch_loop(self):
+        """定期 prefetch"""
+        while True:
+            try:
+                self.prefetch()
+            except Exception as e:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ Git prefetch 失敗: {str(e)}")
+            time.sleep(self.prefetch_seconds)
+
+    @contextmanager
+    def workspace(self) -> Iterator[str]:
+        """
+        取得一個可獨佔使用的工作目錄
+
+        未啟用時直接回傳 PROJECT_DIR（與原本行為相同）；啟用時優先使用 PROJECT_DIR，
+        被佔用時建立或重用 git worktree。
+        """
+        if not self.enabled:
+            yield self.project_dir
+            return
+
+        with self._pool_lock:
+            if self._free:
+                path = self._free.pop(0)
+            else:
+                self._created += 1
+                path = os.path.join(self.worktree_root, f"worker-{self._created}")
+        try:
+            if not os.path.exists(path):
+                self._git(['worktree', 'prune'], check=False)
+                self._git(['worktree', 'add', '--detach', '--force', os.path.abspath(path), self.base_ref])
+            yield path
+        finally:
+            with self._pool_lock:
+                self._free.append(path)
+
+    def prepare(self, path: str) -> Dict[str, float]:
+        """
+        把工作目錄重設到最新的基準版本
+
+        背景 prefetch 已經把物件抓到本機，這裡通常只需要重設工作目錄。
+
+        Args:
+            path: 工作目錄
+
+        Returns:
+            Dict[str, float]: fetch 與 reset 各自花費的秒數
+        """
+        timings = {'fetch': 0.0, 'reset': 0.0}
+        if self.last_fetch is None or time.monotonic() - self.last_fetch > self.max_staleness_seconds:
+            timings['fetch'] = self.prefetch()
+
+        start = time.perf_counter()
+        self._git(['checkout', '--detach', '--force', self.base_ref], cwd=path)
+        self._git(['clean', '-fd'], cwd=path)
+        timings['reset'] = time.perf_counter() - start
+        return timings
+
+    def head(self, path: str) -> str:
+        """工作目錄目前的 commit"""
+        return self._git(['rev-parse', 'HEAD'], cwd=path).stdout.strip()
+
+    def diff_from(self, path: str, base_commit: str) -> bytes:
+        """
+        取得工作目錄相對於 base_commit 的所有變更（包含 Claude 自行建立的 commit 與新檔案）
+
+        Returns:
+            bytes: binary patch，沒有變更時為空
+        """
+        self._git(['add', '-A'], cwd=path)
+        result = subprocess.run(['git', 'diff', '--cached', '--binary', base_commit], cwd=path,
+                                capture_output=True, timeout=self.git_timeout)
+        if result.returncode != 0:
+            raise GitError(f"git diff: {result.stderr.decode('utf-8', 'replace').strip()}")
+        return result.stdout
+
+    def apply_patch(self, path: str, patch: bytes):
+        """
+        把 diff_from() 產生的 patch 套用到工作目錄
+
+        Raises:
+            GitError: patch 無法套用
+        """
+        if not patch:
+            return
+        result = subprocess.run(['git', 'apply', '--index', '--binary', '--whitespace=nowarn', '-'], cwd=path,
+                                input=patch, capture_output=True, timeout=self.git_timeout)
+        if result.returncode != 0:
+            raise GitError(f"git apply: {result.stderr.decode('utf-8', 'replace').strip()}")
+
+    def publish(self, path: str, message: str) -> Dict[str, Any]:
+        """
+        提交工作目錄的變更並推送到基準分支
+
+        Claude 自行建立的 commit 也會一起推送。推送被拒絕（遠端有新的 commit）時
+        重新 fetch、rebase 後以指數退避重試；同一時間只有一個工作目錄在推送。
+
+        Args:
+            path: 工作目錄
+            message: commit 訊息
+
+        Returns:
+            Dict[str, Any]: commit、push 花費的秒數、推送的 commit 數與是否推送
+
+        Raises:
+            GitError: rebase 衝突或重試後仍無法推送
+        """
+        timings: Dict[str, Any] = {'commit': 0.0, 'push': 0.0, 'commits': 0, 'pushed': False}
+
+        start = time.perf_counter()
+        self._git(['add', '-A'], cwd=path)
+        if self._git(['diff', '--cached', '--quiet'], cwd=path, check=False).returncode != 0:
+            self._git(['commit', '-q', '-m', message], cwd=path)
+        timings['commits'] = int(self._git(['rev-list', '--count', f"{self.base_ref}..HEAD"], cwd=path).stdout.strip() or 0)
+        timings['commit'] = time.perf_counter() - start
+        if not timings['commits']:
+            return timings
+
+        start = time.perf_counter()
+        with self._push_lock:
+            for attempt in range(1, self.push_attempts + 1):
+                result = self._git(['push', self.remote, f"HEAD:refs/heads/{self._base_branch()}"], cwd=path, check=False)
+                if result.returncode == 0:
+                    timings['pushed'] = True
+                    break
+                if attempt == self.push_attempts:
+                    raise GitError(f"push 失敗: {(result.stderr or result.stdout).strip()}")
+
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🔁 push 被拒絕，rebase 後重試 ({attempt}/{self.push_attempts - 1})")
+                self.prefetch()
+                rebase = self._git(['rebase', self.base_ref], cwd=path, check=False)
+                if rebase.returncode != 0:
+                    self._git(['rebase', '--abort'], cwd=path, check=False)
+                    raise GitError(f"rebase 衝突: {(rebase.stderr or rebase.stdout).strip()}")
+                time.sleep(random.uniform(0, min(10.0, 2 ** (attempt - 1))))
+        timings['push'] = time.perf_counter() - start
+        return timings
@@ -0,0 +1,361 @@
+"""
+Claude 執行的資源取樣
+執行期間由背景執行緒定期從 /proc 讀取 Claude 子程序及其所有後代程序的
+CPU 時間、RSS、I/O 位元組與程序數，結束後彙總並判斷這次執行主要受 CPU、
+記憶體限制或是在等待（網路、API 回應），取樣結果依 item 記錄到 SQLite
+
+使用方式：
+    python -m project_monitor.resources            # 最近的執行
+    python -m project_monitor.resources <item_id>  # 單一 item 的取樣記錄
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from project_monitor.state import connect
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS resource_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_id TEXT NOT NULL,
+    batch_size INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    summary TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS resource_samples (
+    run_id INTEGER NOT NULL,
+    offset_seconds REAL NOT NULL,
+    cpu_seconds REAL NOT NULL,
+    rss_mb REAL NOT NULL,
+    read_bytes INTEGER NOT NULL,
+    write_bytes INTEGER NOT NULL,
+    rchar INTEGER NOT NULL,
+    wchar INTEGER NOT NULL,
+    processes INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_resource_runs_item ON resource_runs(item_id);
+CREATE INDEX IF NOT EXISTS idx_resource_runs_time ON resource_runs(started_at);
+CREATE INDEX IF NOT EXISTS idx_resource_samples_run ON resource_samples(run_id);
+"""
+
+_IO_FIELDS = ('rchar', 'wchar', 'read_bytes', 'write_bytes')
+
+# CPU 時間 / 經過時間超過此比例時視為 CPU-bound
+CPU_BOUND_RATIO = 0.5
+
+try:
+    _CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+    _PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    _CLOCK_TICKS, _PAGE_SIZE = 100, 4096
+
+
+def _read_stat(pid: int) -> Optional[Dict[str, int]]:
+    """讀取 /proc/<pid>/stat，程序已結束或無法讀取時回傳 None"""
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            data = f.read()
+    except OSError:
+        return None
+    # 程序名稱可能包含空白與括號，從最後一個 ')' 之後開始解析
+    fields = data[data.rfind(')') + 2:].split()
+    try:
+        return {
+            'ppid': int(fields[1]),
+            'pgrp': int(fields[2]),
+            'cpu': int(fields[11]) + int(fields[12]),
+            'child_cpu': int(fields[13]) + int(fields[14]),
+            'starttime': int(fields[19]),
+            'rss': int(fields[21]) * _PAGE_SIZE
+        }
+    except (IndexError, ValueError):
+        return None
+
+
+def _read_io(pid: int) -> Dict[str, int]:
+    """讀取 /proc/<pid>/io，沒有權限時回傳 0"""
+    counters = dict.fromkeys(_IO_FIELDS, 0)
+    try:
+        with open(f'/proc/{pid}/io', 'r') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in counters:
+                    counters[name] = int(value)
+    except (OSError, ValueError):
+        pass
+    return counters
+
+
+def process_tree(root_pid: int) -> Dict[int, Dict[str, int]]:
+    """
+    取得 root_pid 及其所有後代程序的 stat
+
+    也包含同一個 process group 中已被重新指派父程序的程序（Claude 以獨立 process group 啟動）。
+
+    Returns:
+        Dict[int, Dict[str, int]]: pid -> _read_stat() 的結果
+    """
+    stats: Dict[int, Dict[str, int]] = {}
+    for name in os.listdir('/proc'):
+        if name.isdigit():
+            stat = _read_stat(int(name))
+            if stat:
+                stats[int(name)] = stat
+
+    children: Dict[int, List[int]] = {}
+    for pid, stat in stats.items():
+        children.setdefault(stat['ppid'], []).append(pid)
+
+    tree = {}
+    pending = [root_pid] + [pid for pid, stat in stats.items() if stat['pgrp'] == root_pid]
+    while pending:
+        pid = pending.pop()
+        if pid in tree or pid not in stats:
+            continue
+        tree[pid] = stats[pid]
+        pending.extend(children.get(pid, []))
+    return tree
+
+
+def classify(summary: Dict[str, Any], memory_bound_mb: float) -> str:
+    """
+    判斷執行主要的瓶頸
+
+    Returns:
+        str: cpu（CPU 時間佔經過時間的比例高）、memory（峰值 RSS 超過 memory_bound_mb）
+        或 waiting（大部分時間在等待網路、API 回應或 I/O）
+    """
+    if summary['cpu_ratio'] >= CPU_BOUND_RATIO:
+        return 'cpu'
+    if memory_bound_mb and summary['peak_rss_mb'] >= memory_bound_mb:
+        return 'memory'
+    return 'waiting'
+
+
+class ResourceSampler:
+    def __init__(self, pid: int, interval: float = 1.0, memory_bound_mb: float = 2048):
+        """
+        初始化資源取樣
+
+        Args:
+            pid: Claude 子程序的 pid
+            interval: 取樣間隔（秒）
+            memory_bound_mb: 峰值 RSS 超過此值時視為 memory-bound
+        """
+        self.pid = pid
+        self.interval = interval
+        self.memory_bound_mb = memory_bound_mb
+        self.enabled = interval > 0 and os.path.isdir('/proc')
+        self.samples: List[Dict[str, Any]] = []
+
+        # (pid, starttime) -> 最後一次讀到的 CPU ticks 與 I/O 計數（程序結束後仍保留）
+        self._seen: Dict[Tuple[int, int], Dict[str, int]] = {}
+        self._peak_tree_cpu = 0
+        self._peak_rss = 0
+        self._peak_processes = 0
+        self._started = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> 'ResourceSampler':
+        """開始背景取樣"""
+        if self.enabled:
+            self._started = time.monotonic()
+            self._thread = threading.Thread(target=self._loop, name=f'resource-sampler-{self.pid}', daemon=True)
+            self._thread.start()
+        return self
+
+    def _loop(self):
+        while True:
+            self.sample()
+            if self._stop.wait(self.interval):
+                return
+
+    def sample(self):
+        """取樣一次"""
+        tree = process_tree(self.pid)
+        if not tree:
+            return
+        rss = sum(stat['rss'] for stat in tree.values())
+        # 已被回收的子程序 CPU 時間會累加到父程序的 cutime/cstime
+        tree_cpu = sum(stat['cpu'] + stat['child_cpu'] for stat in tree.values())
+        for pid, stat in tree.items():
+            self._seen[(pid, stat['starttime'])] = {'cpu': stat['cpu'], **_read_io(pid)}
+        self._peak_tree_cpu = max(self._peak_tree_cpu, tree_cpu)
+        self._peak_rss = max(self._peak_rss, rss)
+        self._peak_processes = max(self._peak_processes, len(tree))
+
+        totals = self._totals()
+        self.samples.append({
+            'offset_seconds': round(time.monotonic() - self._started, 3),
+            'cpu_seconds': totals['cpu_seconds'],
+            'rss_mb': round(rss / 1024 / 1024, 1),
+            **{name: totals[name] for name in _IO_FIELDS},
+            'processes': len(tree)
+        })
+
+    def _totals(self) -> Dict[str, Any]:
+        """
+        目前累計的 CPU 時間與 I/O
+
+        CPU 時間取兩種估計中較大的一個：所有看過的程序各自的 CPU 時間總和
+        （不含取樣間隔之間就結束的短命程序），以及程序樹包含已回收子程序的 CPU 時間
+        （不含被重新指派父程序的程序）。
+        """
+        own_cpu = sum(seen['cpu'] for seen in self._seen.values())
+        totals = {'cpu_seconds': round(max(own_cpu, self._peak_tree_cpu) / _CLOCK_TICKS, 2)}
+        for name in _IO_FIELDS:
+            totals[name] = sum(seen[name] for seen in self._seen.values())
+        return totals
+
+    def stop(self) -> Optional[Dict[str, Any]]:
+        """
+        停止取樣並回傳彙總
+
+        Returns:
+            Optional[Dict[str, Any]]: wall_seconds、cpu_seconds、cpu_ratio、peak_rss_mb、I/O 位元組、
+            peak_processes、processes、samples、bound，未啟用或沒有任何取樣時回傳 None
+        """
+        if not self.enabled:
+            return None
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if not self.samples:
+            return None
+
+        wall = time.monotonic() - self._started
+        summary = {
+            'wall_seconds': round(wall, 1),
+            **self._totals(),
+            'peak_rss_mb': round(self._peak_rss / 1024 / 1024, 1),
+            'peak_processes': self._peak_processes,
+            'processes': len(self._seen),
+            'samples': len(self.samples)
+        }
+        summary['cpu_ratio'] = round(summary['cpu_seconds'] / wall, 3) if wall > 0 else 0.0
+        summary['bound'] = classify(summary, self.memory_bound_mb)
+        return summary
+
+
+def format_bytes(value: float) -> str:
+    """將位元組數格式化為 KB/MB/GB"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if value < 1024 or unit == 'GB':
+            return f"{value:.0f} {unit}" if unit == 'B' else f"{value:.1f} {unit}"
+        value /= 1024
+
+
+def format_resources(summary: Dict[str, Any]) -> str:
+    """將資源彙總格式化為一行文字（用於 log 與通知）"""
+    bounds = {'cpu': 'CPU-bound', 'memory': 'memory-bound', 'waiting': '等待為主'}
+    return (f"CPU {summary['cpu_seconds']:.1f} 秒 ({summary['cpu_ratio']:.0%}) / "
+            f"峰值 RSS {summary['peak_rss_mb']:.0f} MB / "
+            f"磁碟 讀 {format_bytes(summary['read_bytes'])} 寫 {format_bytes(summary['write_bytes'])} / "
+            f"I/O 讀 {format_bytes(summary['rchar'])} 寫 {format_bytes(summary['wchar'])} / "
+            f"程序 最多 {summary['peak_processes']} 個（共 {summary['processes']} 個）→ "
+            f"{bounds.get(summary['bound'], summary['bound'])}")
+
+
+class ResourceLedger:
+    def __init__(self, path: str, retention_days: float = 30):
+        """
+        初始化資源記錄
+
+        Args:
+            path: SQLite 資料庫路徑
+            retention_days: 取樣記錄保留天數
+        """
+        self.path = path
+        self.retention_days = retention_days
+        with connect(self.path) as conn:
+            conn.executescript(_SCHEMA)
+
+    def record(self, item_ids: List[str], started_at: float, summary: Dict[str, Any], samples: List[Dict[str, Any]]):
+        """
+        記錄一次執行的彙總與取樣（批次執行時每個 item 各記一份）
+
+        Args:
+            item_ids: 這次執行的 item
+            started_at: 開始時間（Unix timestamp）
+            summary: ResourceSampler.stop() 的結果
+            samples: ResourceSampler.samples
+        """
+        with connect(self.path) as conn:
+            conn.execute("BEGIN")
+            for item_id in item_ids:
+                run_id = conn.execute(
+                    "INSERT INTO resource_runs (item_id, batch_size, started_at, summary) VALUES (?, ?, ?, ?)",
+                    (item_id, len(item_ids), started_at, json.dumps(summary))
+                ).lastrowid
+                conn.executemany(
+                    "INSERT INTO resource_samples (run_id, offset_seconds, cpu_seconds, rss_mb, read_bytes, write_bytes, "
+                    "rchar, wchar, processes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(run_id, sample['offset_seconds'], sample['cpu_seconds'], sample['rss_mb'], sample['read_bytes'],
+                      sample['write_bytes'], sample['rchar'], sample['wchar'], sample['processes']) for sample in samples]
+                )
+            # 清除過期的記錄
+            cutoff = time.time() - self.retention_days * 86400
+            conn.execute("DELETE FROM resource_samples WHERE run_id IN (SELECT id FROM resource_runs WHERE started_at < ?)",
+                         (cutoff,))
+            conn.execute("DELETE FROM resource_runs WHERE started_at < ?", (cutoff,))
+            conn.execute("COMMIT")
+
+    def item_summary(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """取得單一 item 最近一次執行的資源彙總，沒有記錄時回傳 None"""
+        with connect(self.path) as conn:
+            row = conn.execute(
+                "SELECT summary FROM resource_runs WHERE item_id = ? ORDER BY started_at DESC, id DESC LIMIT 1", (item_id,)
+            ).fetchone()
+        return json.loads(row['summary']) if row else None
+
+    def runs(self, item_id: str = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """最近的執行（指定 item_id 時只取該 item）"""
+        query = "SELECT * FROM resource_runs"
+        params: Tuple = ()
+        if item_id:
+            query += " WHERE item_id = ?"
+            params = (item_id,)
+        with connect(self.path) as conn:
+            rows = conn.execute(query + " ORDER BY started_at DESC, id DESC LIMIT ?", params + (limit,)).fetchall()
+        return [{**dict(row), 'summary': json.loads(row['summary'])} for row in rows]
+
+    def samples(self, run_id: int) -> List[Dict[str, Any]]:
+        """單次執行的取樣"""
+        with connect(self.path) as conn:
+            rows = conn.execute("SELECT * FROM resource_samples WHERE run_id = ? ORDER BY offset_seconds",
+                                (run_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+
+def main():
+    """輸出最近的執行或單一 item 的取樣記錄"""
+    from project_monitor.state import state_path
+
+    ledger = ResourceLedger(state_path('resources.db'))
+    item_id = sys.argv[1] if len(sys.argv) > 1 else None
+    runs = ledger.runs(item_id, limit=1 if item_id else 20)
+    if not runs:
+        print("📭 沒有資源記錄")
+        return
+
+    for run in runs:
+        started = datetime.fromtimestamp(run['started_at']).strftime('%Y-%m-%d %H:%M:%S')
+        print(f"[{started}] {run['item_id']} ({run['summary']['wall_seconds']:.0f} 秒)")
+        print(f"   {format_resources(run['summary'])}")
+
+    if item_id:
+        print(f"\n{'秒':>8} {'CPU 秒':>8} {'RSS MB':>8} {'磁碟讀':>10} {'磁碟寫':>10} {'I/O 讀':>10} {'I/O 寫':>10} {'程序':>5}")
+        for sample in ledger.samples(runs[0]['id']):
+            print(f"{sample['offset_seconds']:>8.1f} {sample['cpu_seconds']:>8.1f} {sample['rss_mb']:>8.0f} "
+                  f"{format_bytes(sample['read_bytes']):>10} {format_bytes(sample['write_bytes']):>10} "
+                  f"{format_bytes(sample['rchar']):>10} {format_bytes(sample['wchar']):>10} {sample['processes']:>5}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""
+Claude 執行結果快取
+以（正規化後的提示詞雜湊、基準 commit）為 key 保存成功執行產生的 patch 與輸出，
+同一個任務在倉庫沒有變動時再次觸發（item 被退回 Backlog 重新建立、workflow 重新執行、
+推送失敗後重試），直接把 patch 套用到工作目錄，不再重新執行 Claude
+
+快取總大小超過上限時依最後使用時間淘汰最舊的項目。
+
+使用方式：
+    python -m project_monitor.result_cache    # 輸出快取項目
+"""
+
+import os
+import re
+import time
+import hashlib
+import sqlite3
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from project_monitor.state import connect
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    prompt_hash TEXT NOT NULL,
+    base_commit TEXT NOT NULL,
+    patch BLOB NOT NULL,
+    stdout TEXT NOT NULL,
+    execution_time TEXT,
+    size INTEGER NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    PRIMARY KEY (prompt_hash, base_commit)
+);
+CREATE INDEX IF NOT EXISTS idx_results_used ON results(last_used_at);
+"""
+
+
+def prompt_hash(prompt: str) -> str:
+    """
+    正規化後的提示詞雜湊
+
+    統一換行、去掉行尾空白與前後空行、合併連續空行，只有排版不同的提示詞會得到相同的雜湊。
+    """
+    lines = [line.rstrip() for line in prompt.replace('\r\n', '\n').split('\n')]
+    normalized = re.sub(r'\n{3,}', '\n\n', '\n'.join(lines)).strip()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024):
+        """
+        初始化結果快取
+
+        Args:
+            path: SQLite 資料庫路徑
+            max_bytes: 快取總大小上限（patch 與輸出），0 表示停用
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        if self.enabled:
+            with connect(self.path) as conn:
+                conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_env(cls, path: str) -> 'ResultCache':
+        """依 RESULT_CACHE_MAX_MB（預設 256，設為 0 停用）建立結果快取"""
+        return cls(path, max_bytes=int(float(os.getenv('RESULT_CACHE_MAX_MB', '256')) * 1024 * 1024))
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: str, base_commit: str) -> Optional[Dict[str, Any]]:
+        """
+        取得快取的結果並更新使用時間
+
+        Args:
+            key: prompt_hash() 的結果
+            base_commit: 執行前工作目錄的 commit
+
+        Returns:
+            Optional[Dict[str, Any]]: patch（bytes）、stdout、execution_time、hits、created_at，沒有時回傳 None
+        """
+        if not self.enabled:
+            return None
+        with connect(self.path) as conn:
+            conn.execute("BEGIN")
+            row = conn.execute("SELECT patch, stdout, execution_time, hits, created_at FROM results "
+                               "WHERE prompt_hash = ? AND base_commit = ?", (key, base_commit)).fetchone()
+            if row:
+                conn.execute("UPDATE results SET hits = hits + 1, last_used_at = ? "
+                             "WHERE prompt_hash = ? AND base_commit = ?", (time.time(), key, base_commit))
+            conn.execute("COMMIT")
+        if not row:
+            return None
+        return {**dict(row), 'patch': bytes(row['patch']), 'hits': row['hits'] + 1}
+
+    def put(self, key: str, base_commit: str, patch: bytes, stdout: str, execution_time: str = None) -> bool:
+        """
+        保存一次成功執行的結果，超過總大小上限時淘汰最久沒有使用的項目
+
+        Args:
+            key: prompt_hash() 的結果
+            base_commit: 執行前工作目錄的 commit
+            patch: 相對於 base_commit 的 binary patch（沒有變更時為空）
+            stdout: Claude 的輸出（批次執行時用來取得個別結果）
+            execution_time: 原本的執行時間
+
+        Returns:
+            bool: 是否保存（單一項目超過上限時不保存）
+        """
+        size = len(patch) + len(stdout.encode('utf-8'))
+        if not self.enabled or size > self.max_bytes:
+            return False
+        now = time.time()
+        with connect(self.path) as conn:
+            conn.execute("BEGIN")
+            conn.execute(
+                "INSERT OR REPLACE INTO results (prompt_hash, base_commit, patch, stdout, execution_time, size, hits, "
+                "created_at, last_used_at) VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?)",
+                (key, base_commit, sqlite3.Binary(patch), stdout, execution_time, size, now, now)
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if total > self.max_bytes:
+                for row in conn.execute("SELECT prompt_hash, base_commit, size FROM results "
+                                        "ORDER BY last_used_at ASC").fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM results WHERE prompt_hash = ? AND base_commit = ?",
+                                 (row['prompt_hash'], row['base_commit']))
+                    total -= row['size']
+            conn.execute("COMMIT")
+        return True
+
+    def discard(self, key: str, base_commit: str):
+        """移除無法套用的項目"""
+        if not self.enabled:
+            return
+        with connect(self.path) as conn:
+            conn.execute("DELETE FROM results WHERE prompt_hash = ? AND base_commit = ?", (key, base_commit))
+
+    def stats(self) -> Dict[str, Any]:
+        """項目數、總大小與累計命中次數"""
+        if not self.enabled:
+            return {'entries': 0, 'bytes': 0, 'hits': 0}
+        with connect(self.path) as conn:
+            row = conn.execute("SELECT COUNT(*) AS entries, COALESCE(SUM(size), 0) AS bytes, "
+                               "COALESCE(SUM(hits), 0) AS hits FROM results").fetchone()
+        return dict(row)
+
+
+def main():
+    """輸出快取項目"""
+    from project_monitor.state import state_path
+    from project_monitor.resources import format_bytes
+
+    cache = ResultCache.from_env(state_path('result_cache.db'))
+    if not cache.enabled:
+        print("📭 結果快取已停用（RESULT_CACHE_MAX_MB=0）")
+        return
+    stats = cache.stats()
+    print(f"♻️ {stats['entries']} 個項目，{format_bytes(stats['bytes'])} / {format_bytes(cache.max_bytes)}，"
+          f"累計命中 {stats['hits']} 次")
+    with connect(cache.path) as conn:
+        rows = conn.execute("SELECT prompt_hash, base_commit, size, hits, execution_time, created_at, last_used_at "
+                            "FROM results ORDER BY last_used_at DESC LIMIT 50").fetchall()
+    if rows:
+        print(f"\n{'prompt':<14} {'base':<10} {'大小':>10} {'命中':>5} {'原執行時間':>10}  {'建立時間':<19}  最後使用")
+    for row in rows:
+        print(f"{row['prompt_hash'][:12]:<14} {row['base_commit'][:8]:<10} {format_bytes(row['size']):>10} "
+              f"{row['hits']:>5} {row['execution_time'] or '-':>10}  "
+              f"{datetime.fromtimestamp(row['created_at']).strftime('%Y-%m-%d %H:%M:%S')}  "
+              f"{datetime.fromtimestamp(row['last_used_at']).strftime('%Y-%m-%d %H:%M:%S')}")
+
+
+if __name__ == '__main__':
+    main()
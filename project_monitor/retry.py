@@ -0,0 +1,275 @@
+"""
+HTTP 重試機制
+所有 GraphQL 與 Discord 請求都透過 HttpClient 發送，依呼叫類型套用
+重試次數、時間預算、逾時、帶抖動的指數退避與斷路器，
+並在送出前向跨程序共用的速率限制取得額度（見 project_monitor.ratelimit）
+"""
+
+import os
+import time
+import random
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+# 視為暫時性錯誤、值得重試的 HTTP 狀態碼
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """斷路器開啟時直接拒絕請求"""
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts: int = 3, base_delay: float = 1.0, max_delay: float = 30.0,
+                 timeout: float = 30.0, max_elapsed: float = 120.0):
+        """
+        初始化重試策略
+
+        Args:
+            max_attempts: 最多嘗試次數（包含第一次）
+            base_delay: 指數退避的基準秒數
+            max_delay: 單次等待的上限秒數
+            timeout: 單次請求的逾時秒數
+            max_elapsed: 整體時間預算，超過時不再重試
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.max_elapsed = max_elapsed
+
+    def backoff(self, attempt: int) -> float:
+        """
+        計算第 attempt 次失敗後的等待時間（full jitter）
+
+        Args:
+            attempt: 已失敗的次數（從 1 開始）
+
+        Returns:
+            float: 等待秒數
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        """
+        初始化斷路器
+
+        連續失敗（每次呼叫用完重試後才算一次）達到門檻後開啟斷路器，在 reset_timeout 內直接拒絕請求；
+        時間到後只允許一個試探請求（half-open），成功即恢復，失敗則重新開啟。
+
+        Args:
+            failure_threshold: 開啟斷路器的連續失敗次數
+            reset_timeout: 開啟後多久允許試探請求
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.half_open = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        是否允許發送請求
+
+        half-open 期間只有第一個呼叫端取得試探資格，之後的呼叫端在試探結束前都被拒絕；
+        取得允許的呼叫端必須以 record_success() 或 record_failure() 回報結果。
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.half_open or time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.half_open = True
+            return True
+
+    def record_success(self):
+        """記錄成功並關閉斷路器"""
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.half_open = False
+
+    def record_failure(self) -> bool:
+        """
+        記錄一次呼叫失敗
+
+        Returns:
+            bool: 斷路器是否因此開啟（包含試探失敗後重新開啟）
+        """
+        with self._lock:
+            self.failures += 1
+            if self.half_open or (self.opened_at is None and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self.half_open = False
+                return True
+            return False
+
+
+def default_policies() -> Dict[str, RetryPolicy]:
+    """
+    依環境變數建立各呼叫類型的重試策略
+
+    Returns:
+        Dict[str, RetryPolicy]: 呼叫類型 -> 重試策略
+    """
+    timeout = float(os.getenv('HTTP_TIMEOUT_SECONDS', '30'))
+    return {
+        # 查詢失敗只會延後偵測，重試預算較短，避免拖慢整個檢查週期
+        'graphql_query': RetryPolicy(
+            max_attempts=int(os.getenv('RETRY_GRAPHQL_ATTEMPTS', '4')),
+            base_delay=1.0, max_delay=15.0, timeout=timeout, max_elapsed=60.0
+        ),
+        # 狀態更新失敗會讓 item 停在 Backlog，給予較多重試
+        'graphql_mutation': RetryPolicy(
+            max_attempts=int(os.getenv('RETRY_MUTATION_ATTEMPTS', '6')),
+            base_delay=2.0, max_delay=30.0, timeout=timeout, max_elapsed=180.0
+        ),
+        'discord': RetryPolicy(
+            max_attempts=int(os.getenv('RETRY_DISCORD_ATTEMPTS', '3')),
+            base_delay=1.0, max_delay=10.0, timeout=min(timeout, 10.0), max_elapsed=30.0
+        )
+    }
+
+
+class HttpClient:
+    def __init__(self, policies: Dict[str, RetryPolicy] = None, consumer: str = None):
+        """
+        初始化具備重試機制的 HTTP client
+
+        Args:
+            policies: 呼叫類型 -> 重試策略（預設由 default_policies() 建立）
+            consumer: 共用速率限制中的程序名稱（monitor、processor），未指定時不限制
+        """
+        self.policies = policies or default_policies()
+        self.consumer = consumer
+        self._limiter = None
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.failure_threshold = int(os.getenv('CIRCUIT_BREAKER_THRESHOLD', '5'))
+        self.reset_timeout = float(os.getenv('CIRCUIT_BREAKER_RESET_SECONDS', '60'))
+        self._session = None
+
+    def _get_session(self):
+        """
+        延遲建立 requests.Session，沒有請求時不需載入 requests
+
+        設定 HTTP_RECORD_DIR 時會錄製所有請求與回應（見 project_monitor.replay）。
+        """
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+            record_dir = os.getenv('HTTP_RECORD_DIR')
+            if record_dir:
+                from project_monitor.replay import RecordingSession
+                self._session = RecordingSession(self._session, record_dir)
+        return self._session
+
+    def _get_limiter(self):
+        """延遲建立共用速率限制，處理器的快速路徑不需要開啟資料庫"""
+        if self._limiter is None and self.consumer:
+            from project_monitor.ratelimit import SharedRateLimiter
+            self._limiter = SharedRateLimiter.from_env(self.consumer) or False
+        return self._limiter or None
+
+    def acquire(self, call_type: str) -> float:
+        """
+        向共用速率限制取得一個請求的額度（不經過 post() 發送的請求使用）
+
+        Returns:
+            float: 等待的秒數，未設定速率限制時為 0
+        """
+        limiter = self._get_limiter()
+        return limiter.acquire(call_type) if limiter is not None else 0.0
+
+    def _breaker(self, call_type: str) -> CircuitBreaker:
+        """取得呼叫類型對應的斷路器"""
+        if call_type not in self.breakers:
+            self.breakers[call_type] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return self.breakers[call_type]
+
+    @staticmethod
+    def _retry_after(response) -> Optional[float]:
+        """解析 Retry-After 標頭（秒數）"""
+        value = response.headers.get('Retry-After') if response is not None else None
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+
+    def post(self, call_type: str, url: str, **kwargs):
+        """
+        發送 POST 請求，暫時性錯誤時依策略重試
+
+        重試用完仍失敗時才對斷路器記錄一次失敗，重試次數不受斷路器門檻影響。
+
+        Args:
+            call_type: 呼叫類型（graphql_query、graphql_mutation、discord）
+            url: 請求網址
+            **kwargs: 傳給 requests 的參數（未指定 timeout 時使用策略的逾時）
+
+        Returns:
+            requests.Response: 最後一次的回應（可能仍是錯誤狀態碼）
+
+        Raises:
+            CircuitOpenError: 斷路器開啟中
+            requests.RequestException: 重試後仍發生連線錯誤
+        """
+        policy = self.policies.get(call_type) or RetryPolicy()
+        breaker = self._breaker(call_type)
+        kwargs.setdefault('timeout', policy.timeout)
+
+        if not breaker.allow():
+            raise CircuitOpenError(f"{call_type} 斷路器開啟中，暫停發送請求")
+
+        try:
+            response = self._post_with_retries(call_type, url, policy, **kwargs)
+        except Exception:
+            self._record_failure(breaker, call_type)
+            raise
+        if response.status_code in RETRYABLE_STATUSES:
+            self._record_failure(breaker, call_type)
+        else:
+            breaker.record_success()
+        return response
+
+    def _record_failure(self, breaker: CircuitBreaker, call_type: str):
+        if breaker.record_failure():
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🚫 {call_type} 連續失敗，斷路器開啟 {self.reset_timeout:.0f} 秒")
+
+    def _post_with_retries(self, call_type: str, url: str, policy: RetryPolicy, **kwargs):
+        """依策略重試，回傳最後一次的回應或拋出最後一次的連線錯誤"""
+        session = self._get_session()
+        limiter = self._get_limiter()
+        start = time.monotonic()
+        attempt = 0
+
+        while True:
+            attempt += 1
+            response, error = None, None
+            if limiter is not None:
+                limiter.acquire(call_type)
+            try:
+                response = session.post(url, **kwargs)
+            except Exception as e:
+                error = e
+
+            if error is None and response.status_code not in RETRYABLE_STATUSES:
+                return response
+
+            retry_after = self._retry_after(response)
+            if limiter is not None and (retry_after or (response is not None and response.status_code == 429)):
+                # 額度用完時其他程序也會被拒絕，讓所有程序一起暫停
+                limiter.block(call_type, retry_after or policy.backoff(attempt))
+            delay = retry_after or policy.backoff(attempt)
+            elapsed = time.monotonic() - start
+            if attempt >= policy.max_attempts or elapsed + delay > policy.max_elapsed:
+                if error is not None:
+                    raise error
+                return response
+
+            reason = str(error) if error is not None else response.status_code
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🔁 {call_type} 重試 ({attempt}/{policy.max_attempts - 1})，{delay:.1f} 秒後再試: {reason}")
+            time.sleep(delay)
@@ -0,0 +1,227 @@
+"""
+Project items 掃描
+以 cursor 分頁取得 Project 的所有 items；設定 SCAN_SHARDS 時把完整掃描切成數個
+以 query 篩選條件（例如 status、建立日期）劃分的分片，以有限的執行緒平行取得後合併，
+大型 Project 的完整同步只需要最慢的分片的時間
+"""
+
+import os
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+# 監聽器與處理器共用的 item 欄位
+ITEM_FIELDS = """
+                  id
+                  createdAt
+                  updatedAt
+                  creator {
+                    login
+                  }
+                  content {
+                    ... on Issue {
+                      title
+                      number
+                      state
+                      url
+                    }
+                    ... on PullRequest {
+                      title
+                      number
+                      state
+                      url
+                    }
+                    ... on DraftIssue {
+                      title
+                      body
+                    }
+                  }
+                  fieldValues(first: 10) {
+                    nodes {
+                      ... on ProjectV2ItemFieldTextValue {
+                        text
+                        field {
+                          ... on ProjectV2Field {
+                            name
+                          }
+                        }
+                      }
+                      ... on ProjectV2ItemFieldSingleSelectValue {
+                        name
+                        optionId
+                        field {
+                          ... on ProjectV2SingleSelectField {
+                            name
+                          }
+                        }
+                      }
+                    }
+                  }
+"""
+
+_PAGE_QUERY = """
+query($owner: String!, $repo: String!, $projectNumber: Int!, $first: Int!, $after: String%(filter_variable)s) {
+  repository(owner: $owner, name: $repo) {
+    projectV2(number: $projectNumber) {
+      title
+      items(first: $first, after: $after%(filter_argument)s) {
+        nodes {%(fields)s}
+        pageInfo {
+          hasNextPage
+          endCursor
+        }
+        totalCount
+      }
+    }
+  }
+}
+"""
+
+
+def parse_shards(value: str) -> List[str]:
+    """
+    解析 SCAN_SHARDS（以分號分隔的 Project 篩選條件）
+
+    例如 "status:Backlog;status:Review;-status:Backlog,Review"，
+    各分片必須互不重疊且合起來涵蓋所有 items。
+    """
+    return [shard.strip() for shard in (value or '').split(';') if shard.strip()]
+
+
+class ProjectScanner:
+    def __init__(self, http, graphql_url: str, headers: Dict[str, str], owner: str, repo: str, project_number: int,
+                 shards: List[str] = None, concurrency: int = 4, page_size: int = 100):
+        """
+        初始化 Project 掃描
+
+        Args:
+            http: HttpClient
+            graphql_url: GraphQL API endpoint
+            headers: 請求標頭
+            owner: GitHub 組織或用戶名
+            repo: 儲存庫名稱
+            project_number: Project 編號
+            shards: 分片的篩選條件，未設定時以單一 cursor 依序分頁
+            concurrency: 同時取得的分片數
+            page_size: 每頁 items 數（GitHub 上限為 100）
+        """
+        self.http = http
+        self.graphql_url = graphql_url
+        self.headers = headers
+        self.owner = owner
+        self.repo = repo
+        self.project_number = project_number
+        self.shards = shards or []
+        self.concurrency = max(1, concurrency)
+        self.page_size = max(1, min(100, page_size))
+
+    @classmethod
+    def from_env(cls, http, graphql_url: str, headers: Dict[str, str], owner: str, repo: str,
+                 project_number: int) -> 'ProjectScanner':
+        """依環境變數建立 Project 掃描"""
+        return cls(
+            http, graphql_url, headers, owner, repo, project_number,
+            shards=parse_shards(os.getenv('SCAN_SHARDS', '')),
+            concurrency=int(os.getenv('SCAN_CONCURRENCY', '4')),
+            page_size=int(os.getenv('SCAN_PAGE_SIZE', '100'))
+        )
+
+    def _fetch_page(self, shard: Optional[str], cursor: Optional[str], first: int = None) -> Dict[str, Any]:
+        """取得一頁 items"""
+        query = _PAGE_QUERY % {
+            'filter_variable': ', $filter: String' if shard is not None else '',
+            'filter_argument': ', query: $filter' if shard is not None else '',
+            'fields': ITEM_FIELDS
+        }
+        variables = {
+            'owner': self.owner,
+            'repo': self.repo,
+            'projectNumber': self.project_number,
+            'first': self.page_size if first is None else first,
+            'after': cursor
+        }
+        if shard is not None:
+            variables['filter'] = shard
+
+        response = self.http.post(
+            'graphql_query',
+            self.graphql_url,
+            headers=self.headers,
+            json={'query': query, 'variables': variables}
+        )
+
+        if response.status_code != 200:
+            raise Exception(f"GraphQL query failed: {response.status_code} - {response.text}")
+
+        data = response.json()
+
+        if 'errors' in data:
+            raise Exception(f"GraphQL errors: {data['errors']}")
+
+        return data.get('data', {}).get('repository', {}).get('projectV2', {})
+
+    def _walk(self, shard: Optional[str] = None) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        依序取得一個分片的所有頁
+
+        Returns:
+            Tuple[Dict[str, Any], List[Dict[str, Any]]]: 第一頁的 Project 資料與所有 items
+        """
+        first_page, nodes, cursor = None, [], None
+        while True:
+            project = self._fetch_page(shard, cursor)
+            first_page = first_page or project
+            items = project.get('items') or {}
+            nodes.extend(node for node in items.get('nodes', []) if node)
+            page_info = items.get('pageInfo') or {}
+            if not page_info.get('hasNextPage') or not page_info.get('endCursor'):
+                return first_page, nodes
+            cursor = page_info['endCursor']
+
+    def scan(self) -> Dict[str, Any]:
+        """
+        取得 Project 的所有 items
+
+        分片合併後的數量少於 Project 的 items 總數時（分片沒有涵蓋所有 items），
+        這一次改用單一 cursor 完整掃描；伺服器不支援 query 篩選時停用分片。
+
+        Returns:
+            Dict[str, Any]: 與單次查詢相同格式的 Project 資料（title、items.nodes、items.totalCount）
+        """
+        start = time.perf_counter()
+        if not self.shards:
+            project, nodes = self._walk()
+            return self._merged(project, nodes, (project.get('items') or {}).get('totalCount', len(nodes)))
+
+        try:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(self.shards) + 1),
+                                    thread_name_prefix='project-scan') as pool:
+                total_future = pool.submit(self._fetch_page, None, None, 1)
+                results = list(pool.map(self._walk, self.shards))
+                total = (total_future.result().get('items') or {}).get('totalCount', 0)
+        except Exception as e:
+            if "argument 'query'" not in str(e):
+                raise
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 無法以篩選條件分片掃描，改為依序掃描: {str(e)}")
+            self.shards = []
+            return self.scan()
+
+        merged: Dict[str, Dict[str, Any]] = {}
+        for _, nodes in results:
+            for node in nodes:
+                merged.setdefault(node['id'], node)
+
+        if len(merged) < total:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 分片只涵蓋 {len(merged)}/{total} 個 items，改為依序掃描（請檢查 SCAN_SHARDS）")
+            project, nodes = self._walk()
+            return self._merged(project, nodes, total)
+
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 🧩 {len(self.shards)} 個分片共 {len(merged)} 個 items，"
+              f"耗時 {time.perf_counter() - start:.2f} 秒")
+        return self._merged(results[0][0], list(merged.values()), total)
+
+    @staticmethod
+    def _merged(project: Dict[str, Any], nodes: List[Dict[str, Any]], total: int) -> Dict[str, Any]:
+        """組合成與單次查詢相同的格式"""
+        return {'title': project.get('title'), 'items': {'nodes': nodes, 'totalCount': total}}
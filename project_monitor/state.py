@@ -0,0 +1,83 @@
+"""
+監聽器的本地狀態檔案
+所有持久化資料都放在 MONITOR_STATE_DIR（預設為 .monitor_state）底下
+"""
+
+import os
+import json
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+
+def state_path(filename: str) -> str:
+    """
+    取得狀態檔案的完整路徑，必要時建立狀態目錄
+
+    Args:
+        filename: 狀態檔案名稱
+
+    Returns:
+        str: 狀態檔案路徑
+    """
+    state_dir = os.getenv('MONITOR_STATE_DIR', '.monitor_state')
+    os.makedirs(state_dir, exist_ok=True)
+    return os.path.join(state_dir, filename)
+
+
+@contextmanager
+def connect(db_path: str) -> Iterator[sqlite3.Connection]:
+    """
+    開啟 SQLite 連線，離開時關閉
+
+    每次操作使用獨立連線，可安全地跨執行緒與程序使用；autocommit 模式，
+    需要原子操作時自行以 BEGIN IMMEDIATE / COMMIT 包住。
+
+    Args:
+        db_path: 資料庫路徑
+    """
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def load_json(path: str, default: Any) -> Any:
+    """
+    載入 JSON 狀態檔案，檔案不存在或損毀時回傳預設值
+
+    Args:
+        path: 檔案路徑
+        default: 預設值
+
+    Returns:
+        Any: 檔案內容
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return default
+
+
+def save_json(path: str, data: Any):
+    """
+    以原子方式寫入 JSON 狀態檔案（先寫暫存檔再取代），避免中途中斷留下半個檔案
+
+    Args:
+        path: 檔案路徑
+        data: 要寫入的資料
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp_', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,26 @@
+"""
+共用的統計函式
+逾時估計、trace 報表、SLO 延遲與事件分析都使用同一個百分位數定義，同樣的資料得到同樣的 p95
+"""
+
+from typing import List, Optional
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """
+    以線性內插計算百分位數
+
+    Args:
+        values: 樣本（不需排序）
+        pct: 百分位數（0-100）
+
+    Returns:
+        Optional[float]: 百分位數，沒有樣本時回傳 None
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
@@ -0,0 +1,421 @@
+"""
+持久化任務佇列
+以 SQLite 記錄每個任務的狀態（queued / running / succeeded / failed），
+監聽器中斷或被終止後可以從佇列恢復，不會遺失任務
+
+重複任務以 linked 狀態記錄並指向原始任務，不會被執行；原始任務完成時在同一個交易內
+沿用其結果，之後與一般任務一樣進行狀態更新與通知的收尾
+
+多個監聽器節點可以共用同一個資料庫檔案：每個任務由取得租約的節點執行，
+執行期間以心跳延長租約，節點停止後租約到期，其他節點會接手
+"""
+
+import json
+import time
+import sqlite3
+from typing import Dict, Any, List, Optional, Tuple
+
+from project_monitor.state import connect
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+LINKED = 'linked'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    item_id TEXT PRIMARY KEY,
+    item_json TEXT NOT NULL,
+    task_content TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_expires_at REAL,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    execution_time TEXT,
+    status_updated INTEGER NOT NULL DEFAULT 0,
+    notified INTEGER NOT NULL DEFAULT 0,
+    claimed_by TEXT,
+    finalize_owner TEXT,
+    finalize_lease_expires_at REAL,
+    author TEXT,
+    linked_to TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_state ON tasks(state);
+CREATE INDEX IF NOT EXISTS idx_tasks_enqueued ON tasks(enqueued_at);
+"""
+
+# 舊版資料庫缺少的欄位
+_MIGRATIONS = {
+    'claimed_by': "ALTER TABLE tasks ADD COLUMN claimed_by TEXT",
+    'finalize_owner': "ALTER TABLE tasks ADD COLUMN finalize_owner TEXT",
+    'finalize_lease_expires_at': "ALTER TABLE tasks ADD COLUMN finalize_lease_expires_at REAL",
+    'author': "ALTER TABLE tasks ADD COLUMN author TEXT",
+    'linked_to': "ALTER TABLE tasks ADD COLUMN linked_to TEXT"
+}
+
+
+class TaskQueue:
+    def __init__(self, path: str, max_attempts: int = 3, finalize_lease_seconds: float = 300):
+        """
+        初始化持久化任務佇列
+
+        Args:
+            path: SQLite 資料庫路徑（多個節點共用時指向同一個檔案）
+            max_attempts: 每個任務最多嘗試次數，超過時標記為失敗
+            finalize_lease_seconds: 狀態更新與通知的租約長度，到期前其他節點不會接手
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self.finalize_lease_seconds = finalize_lease_seconds
+        with connect(self.path) as conn:
+            conn.executescript(_SCHEMA)
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(tasks)")}
+            for column, statement in _MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(statement)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_linked ON tasks(linked_to)")
+
+    @staticmethod
+    def _to_task(row: sqlite3.Row) -> Dict[str, Any]:
+        """將資料列轉換為與批次器相同格式的任務資料"""
+        return {
+            'item_id': row['item_id'],
+            'item_data': json.loads(row['item_json']),
+            'task_content': row['task_content'],
+            'enqueued_at': row['enqueued_at'],
+            'state': row['state'],
+            'attempts': row['attempts'],
+            'claimed_by': row['claimed_by'],
+            'linked_to': row['linked_to']
+        }
+
+    @classmethod
+    def _to_result(cls, row: sqlite3.Row) -> Dict[str, Any]:
+        """已有結果的任務資料，包含 success 與 execution_time"""
+        task = cls._to_task(row)
+        task['success'] = row['state'] == SUCCEEDED
+        task['execution_time'] = row['execution_time']
+        return task
+
+    def enqueue(self, item_id: str, item: Dict[str, Any], task_content: str, author: str = None) -> bool:
+        """
+        將任務加入佇列（重複加入同一個 item 不會有任何效果）
+
+        Args:
+            item_id: Project Item 的 ID
+            item: Project Item 數據
+            task_content: 任務內容
+            author: item 建立者（用於准入控制的配額）
+
+        Returns:
+            bool: 是否為新加入的任務
+        """
+        with connect(self.path) as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO tasks (item_id, item_json, task_content, state, enqueued_at, author) VALUES (?, ?, ?, ?, ?, ?)",
+                (item_id, json.dumps(item, ensure_ascii=False), task_content, QUEUED, time.time(), author)
+            )
+            return cursor.rowcount == 1
+
+    def link(self, item_id: str, item: Dict[str, Any], task_content: str, original_id: str,
+             original_succeeded: bool = False, execution_time: str = None) -> Tuple[str, Optional[str]]:
+        """
+        將重複任務記錄為連結到原始任務（不會被執行，也不計入准入配額）
+
+        原始任務已有結果時直接沿用；原始任務仍在佇列中（或尚未加入佇列）時記錄為 linked，
+        由 complete() 在原始任務完成時一併更新。
+
+        Args:
+            item_id: 重複任務的 Project Item ID
+            item: Project Item 數據（用於收尾時發送通知）
+            task_content: 任務內容
+            original_id: 原始任務的 Project Item ID
+            original_succeeded: 重複任務索引中原始任務是否已成功（原始任務不在佇列中時使用）
+            execution_time: 原始任務的執行時間（原始任務不在佇列中時使用）
+
+        Returns:
+            Tuple[str, Optional[str]]: 重複任務的狀態與沿用的執行時間
+        """
+        now = time.time()
+        with connect(self.path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            original = conn.execute("SELECT state, execution_time FROM tasks WHERE item_id = ?", (original_id,)).fetchone()
+            if original is not None and original['state'] in (SUCCEEDED, FAILED):
+                state, execution_time = original['state'], original['execution_time']
+            elif original is None and original_succeeded:
+                state = SUCCEEDED
+            else:
+                state, execution_time = LINKED, None
+            conn.execute(
+                "INSERT OR IGNORE INTO tasks (item_id, item_json, task_content, state, enqueued_at, finished_at, "
+                "execution_time, linked_to) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (item_id, json.dumps(item, ensure_ascii=False), task_content, state, now,
+                 None if state == LINKED else now, execution_time, original_id)
+            )
+            row = conn.execute("SELECT state, execution_time FROM tasks WHERE item_id = ?", (item_id,)).fetchone()
+            conn.execute("COMMIT")
+            return row['state'], row['execution_time']
+
+    def unlink(self, original_id: str) -> int:
+        """
+        原始任務不會執行時（被准入控制略過），將連結到它的重複任務改為獨立執行
+
+        Returns:
+            int: 重新排入佇列的任務數量
+        """
+        with connect(self.path) as conn:
+            cursor = conn.execute("UPDATE tasks SET state = ?, linked_to = NULL WHERE linked_to = ? AND state = ?",
+                                  (QUEUED, original_id, LINKED))
+            return cursor.rowcount
+
+    def linked_results(self, original_id: str) -> List[Dict[str, Any]]:
+        """列出連結到原始任務、已沿用結果但收尾尚未完成的重複任務"""
+        with connect(self.path) as conn:
+            rows = conn.execute(
+                "SELECT * FROM tasks WHERE linked_to = ? AND ("
+                "(state = ? AND (status_updated = 0 OR notified = 0)) OR (state = ? AND notified = 0))",
+                (original_id, SUCCEEDED, FAILED)
+            ).fetchall()
+            return [self._to_result(row) for row in rows]
+
+    def requeue_expired(self) -> int:
+        """
+        將租約已過期的 running 任務放回佇列（執行中的程序已中斷）
+
+        超過最大嘗試次數的任務會直接標記為失敗。
+
+        Returns:
+            int: 重新排入佇列的任務數量
+        """
+        now = time.time()
+        with connect(self.path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE tasks SET state = ?, finished_at = ?, execution_time = ? "
+                "WHERE state = ? AND lease_expires_at < ? AND attempts >= ?",
+                (FAILED, now, '多次中斷後放棄', RUNNING, now, self.max_attempts)
+            )
+            cursor = conn.execute(
+                "UPDATE tasks SET state = ?, lease_expires_at = NULL WHERE state = ? AND lease_expires_at < ?",
+                (QUEUED, RUNNING, now)
+            )
+            conn.execute("COMMIT")
+            return cursor.rowcount
+
+    def queued_tasks(self) -> List[Dict[str, Any]]:
+        """依加入順序列出所有等待中的任務"""
+        with connect(self.path) as conn:
+            rows = conn.execute("SELECT * FROM tasks WHERE state = ? ORDER BY enqueued_at", (QUEUED,)).fetchall()
+            return [self._to_task(row) for row in rows]
+
+    def claim(self, item_ids: List[str], lease_seconds: float, owner: str = None) -> List[Dict[str, Any]]:
+        """
+        取得任務的執行權，只有仍在 queued 狀態的任務會被取得
+
+        Args:
+            item_ids: 要執行的任務 ID
+            lease_seconds: 租約長度，超過時間未完成（未續約）會被視為中斷
+            owner: 取得執行權的節點 ID
+
+        Returns:
+            List[Dict[str, Any]]: 成功取得的任務
+        """
+        now = time.time()
+        claimed = []
+        with connect(self.path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for item_id in item_ids:
+                cursor = conn.execute(
+                    "UPDATE tasks SET state = ?, attempts = attempts + 1, lease_expires_at = ?, started_at = ?, claimed_by = ? "
+                    "WHERE item_id = ? AND state = ?",
+                    (RUNNING, now + lease_seconds, now, owner, item_id, QUEUED)
+                )
+                if cursor.rowcount == 1:
+                    row = conn.execute("SELECT * FROM tasks WHERE item_id = ?", (item_id,)).fetchone()
+                    claimed.append(self._to_task(row))
+            conn.execute("COMMIT")
+        return claimed
+
+    def renew_leases(self, item_ids: List[str], lease_seconds: float, owner: str = None) -> List[str]:
+        """
+        延長執行中任務的租約（心跳）
+
+        Args:
+            item_ids: 本節點執行中的任務 ID
+            lease_seconds: 從現在起算的租約長度
+            owner: 本節點 ID
+
+        Returns:
+            List[str]: 已被其他節點接手的任務 ID（租約曾經過期）
+        """
+        lost = []
+        expires_at = time.time() + lease_seconds
+        with connect(self.path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for item_id in item_ids:
+                cursor = conn.execute(
+                    "UPDATE tasks SET lease_expires_at = ? WHERE item_id = ? AND state = ? AND claimed_by IS ?",
+                    (expires_at, item_id, RUNNING, owner)
+                )
+                if cursor.rowcount == 0:
+                    row = conn.execute("SELECT state, claimed_by FROM tasks WHERE item_id = ?", (item_id,)).fetchone()
+                    # 已完成的任務不需要續約；被重新排入佇列或由其他節點執行才算遺失
+                    if row and (row['state'] == QUEUED or (row['state'] == RUNNING and row['claimed_by'] != owner)):
+                        lost.append(item_id)
+            conn.execute("COMMIT")
+        return lost
+
+    def complete(self, item_id: str, success: bool, execution_time: str = None, owner: str = None) -> bool:
+        """
+        記錄任務執行結果
+
+        執行權已被其他節點接手時不會覆寫結果。記錄成功的節點同時取得收尾租約。
+        連結到此任務的重複任務在同一個交易內沿用相同結果。
+
+        Args:
+            item_id: Project Item 的 ID
+            success: 是否成功
+            execution_time: 執行時間
+            owner: 本節點 ID
+
+        Returns:
+            bool: 是否記錄了結果
+        """
+        now = time.time()
+        state = SUCCEEDED if success else FAILED
+        with connect(self.path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.execute(
+                "UPDATE tasks SET state = ?, finished_at = ?, execution_time = ?, lease_expires_at = NULL, "
+                "finalize_owner = ?, finalize_lease_expires_at = ? "
+                "WHERE item_id = ? AND (state = ? OR (state = ? AND (claimed_by IS NULL OR claimed_by IS ?)))",
+                (state, now, execution_time, owner, now + self.finalize_lease_seconds,
+                 item_id, QUEUED, RUNNING, owner)
+            )
+            completed = cursor.rowcount == 1
+            if completed:
+                conn.execute("UPDATE tasks SET state = ?, finished_at = ?, execution_time = ? "
+                             "WHERE linked_to = ? AND state = ?", (state, now, execution_time, item_id, LINKED))
+            conn.execute("COMMIT")
+            return completed
+
+    def acquire_finalization(self, item_id: str, owner: str = None) -> bool:
+        """
+        取得任務狀態更新與通知的收尾權，避免多個節點重複通知
+
+        不在佇列中的 item 一律允許。
+
+        Args:
+            item_id: Project Item 的 ID
+            owner: 本節點 ID
+
+        Returns:
+            bool: 是否可以執行收尾
+        """
+        now = time.time()
+        with connect(self.path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT state FROM tasks WHERE item_id = ?", (item_id,)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return True
+            cursor = conn.execute(
+                "UPDATE tasks SET finalize_owner = ?, finalize_lease_expires_at = ? "
+                "WHERE item_id = ? AND state IN (?, ?) AND "
+                "(finalize_owner IS ? OR finalize_lease_expires_at IS NULL OR finalize_lease_expires_at < ?)",
+                (owner, now + self.finalize_lease_seconds, item_id, SUCCEEDED, FAILED, owner, now)
+            )
+            conn.execute("COMMIT")
+            return cursor.rowcount == 1
+
+    def is_status_updated(self, item_id: str) -> bool:
+        """檢查任務的 Project 狀態是否已經更新過"""
+        with connect(self.path) as conn:
+            row = conn.execute("SELECT status_updated FROM tasks WHERE item_id = ?", (item_id,)).fetchone()
+            return bool(row and row['status_updated'])
+
+    def mark_status_updated(self, item_id: str) -> bool:
+        """
+        記錄 Project 狀態已更新
+
+        Returns:
+            bool: 是否為第一次記錄（已記錄過時回傳 False）
+        """
+        with connect(self.path) as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status_updated = 1 WHERE item_id = ? AND status_updated = 0", (item_id,)
+            )
+            return cursor.rowcount == 1
+
+    def is_notified(self, item_id: str) -> bool:
+        """檢查任務結果是否已經通知過"""
+        with connect(self.path) as conn:
+            row = conn.execute("SELECT notified FROM tasks WHERE item_id = ?", (item_id,)).fetchone()
+            return bool(row and row['notified'])
+
+    def mark_notified(self, item_id: str) -> bool:
+        """記錄任務結果已通知"""
+        with connect(self.path) as conn:
+            cursor = conn.execute("UPDATE tasks SET notified = 1 WHERE item_id = ? AND notified = 0", (item_id,))
+            return cursor.rowcount == 1
+
+    def unfinished_finalizations(self, max_age_seconds: float = 86400) -> List[Dict[str, Any]]:
+        """
+        列出已有結果但狀態更新或通知尚未完成的任務（例如在更新狀態前中斷）
+
+        Args:
+            max_age_seconds: 只重試在這段時間內完成的任務，避免無限重試
+
+        Returns:
+            List[Dict[str, Any]]: 任務資料，包含 success 與 execution_time
+        """
+        with connect(self.path) as conn:
+            rows = conn.execute(
+                "SELECT * FROM tasks WHERE finished_at > ? AND ("
+                "(state = ? AND (status_updated = 0 OR notified = 0)) OR (state = ? AND notified = 0))",
+                (time.time() - max_age_seconds, SUCCEEDED, FAILED)
+            ).fetchall()
+            return [self._to_result(row) for row in rows]
+
+    def count_enqueued_since(self, since: float, author: str = None) -> int:
+        """
+        計算某個時間之後加入佇列的任務數（不含連結到原始任務的重複任務）
+
+        Args:
+            since: 起始時間（Unix 秒）
+            author: 只計算此建立者的任務
+
+        Returns:
+            int: 任務數
+        """
+        with connect(self.path) as conn:
+            if author is None:
+                row = conn.execute("SELECT COUNT(*) AS n FROM tasks WHERE enqueued_at >= ? AND linked_to IS NULL",
+                                   (since,)).fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT COUNT(*) AS n FROM tasks WHERE enqueued_at >= ? AND author = ? AND linked_to IS NULL",
+                    (since, author)
+                ).fetchone()
+            return row['n']
+
+    def oldest(self) -> Dict[str, Optional[float]]:
+        """
+        回傳等待最久的任務加入時間與執行最久的任務開始時間（用於健康檢查）
+
+        Returns:
+            Dict[str, Optional[float]]: queued（最早的 enqueued_at）、running（最早的 started_at），沒有任務時為 None
+        """
+        with connect(self.path) as conn:
+            queued = conn.execute("SELECT MIN(enqueued_at) AS t FROM tasks WHERE state = ?", (QUEUED,)).fetchone()
+            running = conn.execute("SELECT MIN(started_at) AS t FROM tasks WHERE state = ?", (RUNNING,)).fetchone()
+            return {'queued': queued['t'], 'running': running['t']}
+
+    def counts(self) -> Dict[str, int]:
+        """回傳各狀態的任務數量"""
+        with connect(self.path) as conn:
+            rows = conn.execute("SELECT state, COUNT(*) AS n FROM tasks GROUP BY state").fetchall()
+            return {row['state']: row['n'] for row in rows}
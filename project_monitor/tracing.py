@@ -0,0 +1,193 @@
+"""
+任務流程追蹤
+記錄 poll → detect → queue → execute → status → notify 各階段的 span，
+以 OpenTelemetry (OTLP JSON) 相容的格式逐行寫入 JSONL 檔案
+
+同一個 Project Item 的所有 span 使用由 item ID 推導出的 traceId，
+即使跨越多次檢查週期或程序重啟也會歸在同一個 trace。
+
+使用方式：
+    python -m project_monitor.tracing [traces.jsonl]    # 輸出各階段延遲百分位數
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Iterator
+
+from project_monitor.stats import percentile
+
+SERVICE_NAME = 'github-project-monitor'
+
+
+def trace_id_for(item_id: Optional[str]) -> str:
+    """由 item ID 推導固定的 traceId（32 個十六進位字元），沒有 item 時隨機產生"""
+    if item_id:
+        return hashlib.sha256(item_id.encode('utf-8')).hexdigest()[:32]
+    return os.urandom(16).hex()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    """轉換為 OTLP 的 AnyValue 格式"""
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class Tracer:
+    def __init__(self, path: Optional[str]):
+        """
+        初始化追蹤器
+
+        Args:
+            path: JSONL 輸出檔案路徑，None 或空字串表示停用
+        """
+        self.path = path or None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> List[Dict[str, Any]]:
+        """目前執行緒的 span 堆疊"""
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def _write(self, span: Dict[str, Any]):
+        """寫入一個 span"""
+        if not self.path:
+            return
+        line = json.dumps(span, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+    def _build(self, name: str, trace_id: str, start_ns: int, end_ns: int, attributes: Dict[str, Any],
+               parent_span_id: Optional[str] = None, error: Optional[str] = None) -> Dict[str, Any]:
+        """組合 OTLP 相容的 span"""
+        span = {
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': SERVICE_NAME}}]},
+            'traceId': trace_id,
+            'spanId': os.urandom(8).hex(),
+            'parentSpanId': parent_span_id or '',
+            'name': name,
+            'kind': 'SPAN_KIND_INTERNAL',
+            'startTimeUnixNano': str(start_ns),
+            'endTimeUnixNano': str(end_ns),
+            'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in attributes.items() if value is not None],
+            'status': {'code': 'STATUS_CODE_ERROR', 'message': error} if error else {'code': 'STATUS_CODE_OK'}
+        }
+        return span
+
+    @contextmanager
+    def span(self, name: str, item_id: Optional[str] = None, **attributes) -> Iterator[Dict[str, Any]]:
+        """
+        記錄一段程式碼的 span
+
+        同一執行緒中巢狀且屬於同一個 trace 的 span 會自動設定 parentSpanId。
+        呼叫端可在 yield 出來的 dict 中加入 attributes 或設定 'error' 標記失敗。
+
+        Args:
+            name: span 名稱（階段名稱）
+            item_id: Project Item ID，作為 trace 鍵
+            **attributes: 額外屬性
+        """
+        trace_id = trace_id_for(item_id)
+        stack = self._stack()
+        parent = next((s for s in reversed(stack) if s['traceId'] == trace_id), None)
+        context = {'traceId': trace_id, 'spanId': os.urandom(8).hex(), 'attributes': dict(attributes), 'error': None}
+        if item_id:
+            context['attributes']['item.id'] = item_id
+        stack.append(context)
+        start_ns = time.time_ns()
+        try:
+            yield context
+        except Exception as e:
+            context['error'] = str(e)
+            raise
+        finally:
+            stack.pop()
+            span = self._build(name, trace_id, start_ns, time.time_ns(), context['attributes'],
+                               parent['spanId'] if parent else None, context['error'])
+            span['spanId'] = context['spanId']
+            self._write(span)
+
+    def record_span(self, name: str, item_id: Optional[str], start_seconds: float, end_seconds: float,
+                    error: Optional[str] = None, **attributes):
+        """
+        以指定的起訖時間記錄 span（用於佇列等待、輪詢延遲等事後才知道長度的階段）
+
+        Args:
+            name: span 名稱
+            item_id: Project Item ID
+            start_seconds: 開始時間（Unix 秒）
+            end_seconds: 結束時間（Unix 秒）
+            error: 失敗訊息
+            **attributes: 額外屬性
+        """
+        if item_id:
+            attributes['item.id'] = item_id
+        self._write(self._build(name, trace_id_for(item_id), int(start_seconds * 1e9), int(end_seconds * 1e9),
+                                attributes, error=error))
+
+
+def summarize(path: str) -> Dict[str, List[float]]:
+    """
+    逐行讀取 trace 檔案，彙整各階段與每個 item 端到端的耗時（秒）
+
+    Args:
+        path: JSONL 檔案路徑
+
+    Returns:
+        Dict[str, List[float]]: 階段名稱 -> 耗時清單
+    """
+    stages: Dict[str, List[float]] = {}
+    item_bounds: Dict[str, List[int]] = {}
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                span = json.loads(line)
+            except ValueError:
+                continue
+            start, end = int(span['startTimeUnixNano']), int(span['endTimeUnixNano'])
+            stages.setdefault(span['name'], []).append((end - start) / 1e9)
+
+            is_item_span = any(attr['key'] == 'item.id' for attr in span.get('attributes', []))
+            if is_item_span:
+                bounds = item_bounds.setdefault(span['traceId'], [start, end])
+                bounds[0], bounds[1] = min(bounds[0], start), max(bounds[1], end)
+
+    if item_bounds:
+        stages['end_to_end'] = [(end - start) / 1e9 for start, end in item_bounds.values()]
+    return stages
+
+
+def main():
+    """輸出各階段延遲百分位數"""
+    from project_monitor.state import state_path
+
+    path = sys.argv[1] if len(sys.argv) > 1 else os.getenv('TRACE_FILE') or state_path('traces.jsonl')
+    if not os.path.exists(path):
+        print(f"📭 找不到 trace 檔案: {path}")
+        return
+
+    stages = summarize(path)
+    print(f"📈 各階段延遲（秒） - {path}")
+    print(f"{'stage':<16} {'count':>7} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+    order = ['poll', 'poll_delay', 'queue', 'git_prepare', 'execute', 'git_publish', 'status_update', 'notify', 'end_to_end']
+    for name in sorted(stages, key=lambda n: (order.index(n) if n in order else len(order), n)):
+        values = stages[name]
+        print(f"{name:<16} {len(values):>7} {percentile(values, 50):>9.2f} {percentile(values, 90):>9.2f} "
+              f"{percentile(values, 99):>9.2f} {max(values):>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
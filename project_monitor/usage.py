@@ -0,0 +1,201 @@
+"""
+Claude 執行用量與費用記錄
+解析 Claude CLI 結構化輸出（--output-format json）中的 token 用量、回合數與費用，
+依 item 記錄到 SQLite，並依日期、標籤與結果彙總，用來計算每個成功任務的成本
+
+使用方式：
+    python -m project_monitor.usage [天數]    # 輸出用量與費用報表
+"""
+
+import sys
+import json
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from project_monitor.state import connect
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_id TEXT NOT NULL,
+    session_id TEXT,
+    batch_size INTEGER NOT NULL,
+    labels TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    input_tokens REAL NOT NULL,
+    output_tokens REAL NOT NULL,
+    cache_read_tokens REAL NOT NULL,
+    cache_creation_tokens REAL NOT NULL,
+    num_turns REAL NOT NULL,
+    cost_usd REAL NOT NULL,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_usage_item ON usage(item_id);
+CREATE INDEX IF NOT EXISTS idx_usage_time ON usage(recorded_at);
+"""
+
+_METRICS = ['input_tokens', 'output_tokens', 'cache_read_tokens', 'cache_creation_tokens', 'num_turns', 'cost_usd']
+
+
+def parse_cli_output(stdout: str) -> Optional[Dict[str, Any]]:
+    """
+    解析 Claude CLI 的 JSON 輸出
+
+    Args:
+        stdout: CLI 標準輸出
+
+    Returns:
+        Optional[Dict[str, Any]]: result（最後的文字回覆）、is_error、session_id 與用量，
+        不是 JSON 輸出時回傳 None
+    """
+    text = (stdout or '').strip()
+    if not text:
+        return None
+    try:
+        data = json.loads(text)
+    except ValueError:
+        # 部分版本會在前面輸出其他訊息，只取最後一行
+        try:
+            data = json.loads(text.splitlines()[-1])
+        except ValueError:
+            return None
+    if not isinstance(data, dict) or data.get('type') != 'result':
+        return None
+
+    usage = data.get('usage') or {}
+    return {
+        'result': data.get('result') or '',
+        'is_error': bool(data.get('is_error')),
+        'session_id': data.get('session_id'),
+        'input_tokens': usage.get('input_tokens', 0) or 0,
+        'output_tokens': usage.get('output_tokens', 0) or 0,
+        'cache_read_tokens': usage.get('cache_read_input_tokens', 0) or 0,
+        'cache_creation_tokens': usage.get('cache_creation_input_tokens', 0) or 0,
+        'num_turns': data.get('num_turns', 0) or 0,
+        'cost_usd': data.get('total_cost_usd', data.get('cost_usd', 0)) or 0
+    }
+
+
+class UsageLedger:
+    def __init__(self, path: str):
+        """
+        初始化用量記錄
+
+        Args:
+            path: SQLite 資料庫路徑
+        """
+        self.path = path
+        with connect(self.path) as conn:
+            conn.executescript(_SCHEMA)
+
+    def record(self, usage: Dict[str, Any], tasks: List[Dict[str, Any]], outcomes: List[bool],
+               labels: List[List[str]]):
+        """
+        記錄一次執行的用量，批次執行時平均分攤到每個任務
+
+        Args:
+            usage: parse_cli_output() 的結果
+            tasks: 這次執行的任務（item_id）
+            outcomes: 每個任務的結果
+            labels: 每個任務的標籤
+        """
+        if not tasks:
+            return
+        share = 1 / len(tasks)
+        now = time.time()
+        with connect(self.path) as conn:
+            conn.execute("BEGIN")
+            for task, success, task_labels in zip(tasks, outcomes, labels):
+                conn.execute(
+                    "INSERT INTO usage (item_id, session_id, batch_size, labels, outcome, input_tokens, output_tokens, "
+                    "cache_read_tokens, cache_creation_tokens, num_turns, cost_usd, recorded_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (task['item_id'], usage.get('session_id'), len(tasks), ','.join(task_labels),
+                     'succeeded' if success else 'failed', *[usage.get(name, 0) * share for name in _METRICS], now)
+                )
+            conn.execute("COMMIT")
+
+    def item_usage(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """
+        取得單一 item 累計的用量（包含重試）
+
+        Returns:
+            Optional[Dict[str, Any]]: 各項用量總和與執行次數，沒有記錄時回傳 None
+        """
+        with connect(self.path) as conn:
+            row = conn.execute(
+                f"SELECT COUNT(*) AS runs, {', '.join(f'SUM({name}) AS {name}' for name in _METRICS)} "
+                "FROM usage WHERE item_id = ?", (item_id,)
+            ).fetchone()
+        if not row or not row['runs']:
+            return None
+        return dict(row)
+
+    def report(self, since_seconds: float = 30 * 86400) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        依日期、標籤與結果彙總用量
+
+        Args:
+            since_seconds: 統計最近多久的記錄
+
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: 分組方式 -> 各組統計（含每個成功任務的成本）
+        """
+        with connect(self.path) as conn:
+            rows = conn.execute("SELECT * FROM usage WHERE recorded_at > ?", (time.time() - since_seconds,)).fetchall()
+
+        groupings = {
+            'day': lambda row: [datetime.fromtimestamp(row['recorded_at']).strftime('%Y-%m-%d')],
+            'label': lambda row: row['labels'].split(',') if row['labels'] else ['(無標籤)'],
+            'outcome': lambda row: [row['outcome']],
+            'batch_size': lambda row: [str(row['batch_size'])]
+        }
+        report = {}
+        for grouping, keys_of in groupings.items():
+            groups: Dict[str, Dict[str, Any]] = {}
+            for row in rows:
+                for key in keys_of(row):
+                    group = groups.setdefault(key, {'key': key, 'tasks': 0, 'succeeded': 0, **{name: 0.0 for name in _METRICS}})
+                    group['tasks'] += 1
+                    group['succeeded'] += row['outcome'] == 'succeeded'
+                    for name in _METRICS:
+                        group[name] += row[name]
+            for group in groups.values():
+                group['cost_per_success'] = group['cost_usd'] / group['succeeded'] if group['succeeded'] else None
+            report[grouping] = sorted(groups.values(), key=lambda group: group['key'])
+        return report
+
+
+def format_usage(usage: Dict[str, Any]) -> str:
+    """將用量格式化為一行文字（用於 log 與通知）"""
+    tokens = usage['input_tokens'] + usage['output_tokens'] + usage['cache_read_tokens'] + usage['cache_creation_tokens']
+    return (f"${usage['cost_usd']:.4f} / {tokens:,.0f} tokens "
+            f"(輸入 {usage['input_tokens']:,.0f}、輸出 {usage['output_tokens']:,.0f}、快取讀取 {usage['cache_read_tokens']:,.0f}) / "
+            f"{usage['num_turns']:.0f} 回合")
+
+
+def main():
+    """輸出用量與費用報表"""
+    from project_monitor.state import state_path
+
+    days = float(sys.argv[1]) if len(sys.argv) > 1 else 30
+    report = UsageLedger(state_path('usage.db')).report(since_seconds=days * 86400)
+
+    if not report['outcome']:
+        print("📭 沒有用量記錄")
+        return
+
+    titles = {'day': '依日期', 'label': '依標籤', 'outcome': '依結果', 'batch_size': '依批次大小'}
+    print(f"💰 最近 {days:g} 天的 Claude 用量")
+    for grouping, groups in report.items():
+        print(f"\n{titles[grouping]}")
+        print(f"{'key':<32} {'tasks':>6} {'成功':>6} {'cost_usd':>10} {'每成功成本':>10} {'input':>10} {'output':>10} {'turns':>7}")
+        for group in groups:
+            per_success = f"{group['cost_per_success']:.4f}" if group['cost_per_success'] is not None else '-'
+            print(f"{group['key'][:32]:<32} {group['tasks']:>6} {group['succeeded']:>6} {group['cost_usd']:>10.4f} "
+                  f"{per_success:>10} {group['input_tokens']:>10.0f} {group['output_tokens']:>10.0f} {group['num_turns']:>7.0f}")
+
+
+if __name__ == '__main__':
+    main()
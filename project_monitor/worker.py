@@ -0,0 +1,209 @@
+"""
+工作伺服器的 worker
+從監聽器的工作伺服器（EXECUTOR_BACKEND=job_server）拉取 Claude 執行工作，
+在本機的 PROJECT_DIR 執行後回報結果；REPO_MANAGED=true 時由 worker 同步工作目錄並 commit/push
+
+每個 worker 一次執行一個工作，需要更多平行度時啟動多個 worker。
+
+使用方式：
+    python -m project_monitor.worker --server http://monitor-host:8765
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+import subprocess
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import requests
+from dotenv import load_dotenv
+
+from project_monitor.backends import run_process
+from project_monitor.executor import terminate_group
+from project_monitor.repo import RepoManager, GitError
+from project_monitor.state import state_path
+
+
+class Worker:
+    def __init__(self, server: str, name: str, token: str = None, claude_cli: str = 'claude', project_dir: str = None,
+                 repo_manager: RepoManager = None, heartbeat_seconds: float = 15, sample_seconds: float = 1,
+                 memory_bound_mb: float = 2048, nice: int = 10, memory_limit_mb: int = 0, attachment_dir: str = None):
+        """
+        初始化 worker
+
+        Args:
+            server: 工作伺服器網址
+            name: worker 名稱（顯示在監聽器的 log 與 /status）
+            token: JOB_SERVER_TOKEN
+            claude_cli: Claude CLI 路徑
+            project_dir: 執行的工作目錄
+            repo_manager: 倉庫管理器（enabled 時由 worker 同步工作目錄並 commit/push）
+            heartbeat_seconds: heartbeat 間隔，需小於伺服器的 JOB_LEASE_SECONDS
+            sample_seconds: 資源取樣間隔
+            memory_bound_mb: 峰值 RSS 超過此值時視為 memory-bound
+            nice: 子程序的 nice 值
+            memory_limit_mb: 子程序的位址空間上限
+            attachment_dir: 工作附帶的提示詞附件寫入的目錄
+        """
+        self.server = server.rstrip('/')
+        self.name = name
+        self.headers = {'Authorization': f"Bearer {token}"} if token else {}
+        self.claude_cli = claude_cli
+        self.project_dir = project_dir or os.getcwd()
+        self.repo_manager = repo_manager or RepoManager(self.project_dir)
+        self.heartbeat_seconds = heartbeat_seconds
+        self.sample_seconds = sample_seconds
+        self.memory_bound_mb = memory_bound_mb
+        self.nice = nice
+        self.memory_limit_mb = memory_limit_mb
+        self.attachment_dir = os.path.abspath(attachment_dir or state_path('attachments'))
+        self._process = None
+
+    @classmethod
+    def from_env(cls, server: str, name: str = None) -> 'Worker':
+        """依環境變數建立 worker（與監聽器相同的 CLAUDE_CLI_PATH、PROJECT_DIR、REPO_* 與 EXECUTOR_* 設定）"""
+        project_dir = os.getenv('PROJECT_DIR', os.getcwd())
+        return cls(
+            server,
+            name or os.getenv('WORKER_NAME') or f"{socket.gethostname()}-{os.getpid()}",
+            token=os.getenv('JOB_SERVER_TOKEN') or None,
+            claude_cli=os.getenv('CLAUDE_CLI_PATH', 'claude'),
+            project_dir=project_dir,
+            repo_manager=RepoManager.from_env(project_dir),
+            heartbeat_seconds=float(os.getenv('WORKER_HEARTBEAT_SECONDS', '15')),
+            sample_seconds=float(os.getenv('RESOURCE_SAMPLE_SECONDS', '1')),
+            memory_bound_mb=float(os.getenv('RESOURCE_MEMORY_BOUND_MB', os.getenv('EXECUTOR_RUN_MEMORY_MB', '2048'))),
+            nice=int(os.getenv('EXECUTOR_NICE', '10')),
+            memory_limit_mb=int(os.getenv('EXECUTOR_MEMORY_LIMIT_MB', '0'))
+        )
+
+    def _post(self, path: str, payload: Dict[str, Any], timeout: float = 10) -> requests.Response:
+        return requests.post(f"{self.server}{path}", json={'worker': self.name, **payload},
+                             headers=self.headers, timeout=timeout)
+
+    def run_forever(self):
+        """持續拉取並執行工作，伺服器無法連線時每 5 秒重試"""
+        print(f"🛠️ Worker {self.name} → {self.server}（工作目錄 {self.project_dir}）")
+        if self.repo_manager.enabled:
+            self.repo_manager.start_prefetch()
+        while True:
+            try:
+                response = self._post('/jobs/claim', {'wait': 20}, timeout=30)
+            except requests.RequestException as e:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 無法連線到工作伺服器: {str(e)}")
+                time.sleep(5)
+                continue
+            if response.status_code == 204:
+                continue
+            if response.status_code != 200:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 取得工作失敗: {response.status_code} - {response.text}")
+                time.sleep(5)
+                continue
+
+            job = response.json()
+            result = self.execute(job)
+            self._report(job['id'], result)
+
+    def _report(self, job_id: str, result: Dict[str, Any]):
+        """回報結果（失敗時重試，工作已被重新指派時放棄）"""
+        for attempt in range(5):
+            try:
+                response = self._post(f"/jobs/{job_id}/result", {'result': result}, timeout=30)
+                if response.status_code == 409:
+                    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 工作 {job_id[:8]} 已不屬於此 worker，結果未採用")
+                return
+            except requests.RequestException as e:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 回報結果失敗: {str(e)}")
+                time.sleep(2 ** attempt)
+
+    def _heartbeat_loop(self, job_id: str, stop: threading.Event):
+        """定期延長租約，工作被收回時終止執行中的 Claude"""
+        while not stop.wait(self.heartbeat_seconds):
+            try:
+                response = self._post(f"/jobs/{job_id}/heartbeat", {})
+            except requests.RequestException:
+                continue
+            if response.status_code == 409 and self._process is not None:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🛑 工作 {job_id[:8]} 已被收回，終止執行")
+                terminate_group(self._process)
+                return
+
+    def _localize_args(self, job: Dict[str, Any]) -> List[str]:
+        """把工作附帶的附件寫到本機，並把指令中監聽器上的附件路徑換成本機路徑"""
+        args = list(job['args'])
+        attachments = job.get('attachments') or {}
+        if attachments:
+            os.makedirs(self.attachment_dir, exist_ok=True)
+        for remote_path, content in attachments.items():
+            local_path = os.path.join(self.attachment_dir, os.path.basename(remote_path))
+            with open(local_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            args = [arg.replace(remote_path, local_path) for arg in args]
+        return args
+
+    def _set_process(self, process: Optional[subprocess.Popen]):
+        self._process = process
+
+    def execute(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        執行一個工作
+
+        Returns:
+            Dict[str, Any]: run_process() 的結果，加上 git（Git 時間）與 error
+        """
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🤖 執行工作 {job['id'][:8]}（逾時 {job['timeout']:.0f} 秒）")
+        stop = threading.Event()
+        threading.Thread(target=self._heartbeat_loop, args=(job['id'], stop), daemon=True).start()
+        start = time.time()
+        git_timings: Dict[str, Any] = {}
+        result = None
+        try:
+            with self.repo_manager.workspace() as workspace:
+                if self.repo_manager.enabled:
+                    git_timings.update(self.repo_manager.prepare(workspace))
+                result = run_process(
+                    [self.claude_cli] + self._localize_args(job), workspace, job['timeout'], self.nice, self.memory_limit_mb,
+                    self.sample_seconds, self.memory_bound_mb,
+                    on_start=self._set_process, on_exit=lambda process: self._set_process(None)
+                )
+                if self.repo_manager.enabled and result['returncode'] == 0:
+                    git_timings.update(self.repo_manager.publish(workspace, job.get('message') or 'Claude task'))
+        except (GitError, subprocess.TimeoutExpired) as e:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ❌ Git 失敗: {str(e)}")
+            result = result or {'returncode': None, 'stdout': '', 'stderr': '', 'timed_out': False,
+                                'resources': None, 'samples': []}
+            result['error'] = str(e)
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ❌ 執行失敗: {str(e)}")
+            result = {'returncode': None, 'stdout': '', 'stderr': '', 'timed_out': False, 'resources': None,
+                      'samples': [], 'error': str(e)}
+        finally:
+            stop.set()
+        result['git'] = git_timings
+        status = '⏰ 逾時' if result.get('timed_out') else f"exit code {result.get('returncode')}"
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ✅ 工作 {job['id'][:8]} 結束（{status}，{time.time() - start:.0f} 秒）")
+        return result
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description='從監聽器的工作伺服器拉取並執行 Claude 工作')
+    parser.add_argument('--server', default=os.getenv('JOB_SERVER_URL'), help='工作伺服器網址（JOB_SERVER_URL）')
+    parser.add_argument('--name', help='worker 名稱（WORKER_NAME，預設為主機名稱與 pid）')
+    args = parser.parse_args()
+    if not args.server:
+        parser.error('需要 --server 或 JOB_SERVER_URL')
+
+    try:
+        Worker.from_env(args.server, args.name).run_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Worker 已停止")
+        sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
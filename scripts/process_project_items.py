@@ -4,11 +4,30 @@ GitHub Project Items 處理器
 用於 GitHub Actions，單次執行版本的 Project 監聽器
 """
 
+import time
+
+# 記錄程序啟動時間，用於計算冷啟動成本
+_PROCESS_START = time.perf_counter()
+
 import os
+import sys
 import json
-import requests
+import math
 from datetime import datetime, timedelta
-from typing import Set, Dict, Any, List
+from typing import Set, Dict, Any, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from project_monitor import events
+from project_monitor.batching import TaskBatcher
+from project_monitor.events import EventLog, created_timestamp, parse_execution_time
+from project_monitor.prompt import PromptBuilder, format_prompt_metrics
+from project_monitor.retry import HttpClient
+from project_monitor.scan import ProjectScanner
+from project_monitor.state import state_path
+
+# GitHub Actions 單一 matrix 最多 256 個 job
+MAX_MATRIX_JOBS = 256
 
 
 class GitHubProjectProcessor:
@@ -37,7 +56,13 @@ class GitHubProjectProcessor:
         }
         
         # GraphQL API endpoint
-        self.graphql_url = 'https://api.github.com/graphql'
+        self.graphql_url = os.getenv('GITHUB_GRAPHQL_URL', 'https://api.github.com/graphql')
+        
+        # 所有 GraphQL 與 Discord 請求共用的重試 client（需要時才載入 requests）
+        self.http = HttpClient(consumer='processor')
+        
+        # Project items 掃描（分頁；SCAN_SHARDS 設定時平行分片）
+        self.scanner = ProjectScanner.from_env(self.http, self.graphql_url, self.headers, owner, repo, project_number)
         
         # Discord webhook URL
         self.discord_webhook_url = os.getenv('DISCORD_WEBHOOK_URL')
@@ -51,7 +76,81 @@ class GitHubProjectProcessor:
         # 已處理的 items 檔案路徑
         self.processed_items_file = 'processed_items.json'
         
-        # 初始化時獲取 Project 欄位資訊
+        # KNOWN_ITEMS_MODE=compact 時，超過 30 天的處理記錄移入 Bloom filter 而不是直接遺忘
+        # 與快取、事件記錄一樣放在狀態目錄（.monitor_state/），不會被 Claude 在 checkout 中 commit
+        self.processed_history_file = state_path('processed_items.history.json')
+        self.processed_history = None
+        
+        # Item 生命週期事件記錄（EVENT_LOG_DIR 設為空字串可停用）
+        self.events = EventLog.from_env('processor', state_path('events'))
+        
+        # 本次掃描完成後待記錄的水位線（任務全部輸出後才寫入）
+        self.pending_watermark = None
+        
+        # 單次執行的批次上限，超出的任務留待下次執行
+        self.batcher = TaskBatcher(
+            max_tasks=int(os.getenv('BATCH_MAX_TASKS', '10')),
+            max_prompt_chars=int(os.getenv('BATCH_MAX_PROMPT_CHARS', '20000'))
+        )
+        
+        # Job matrix 設定：每個 job 處理的任務數、內嵌在 matrix 中的內容上限與任務檔案目錄
+        self.matrix_tasks_per_job = max(1, int(os.getenv('MATRIX_TASKS_PER_JOB', '1')))
+        self.matrix_content_max_chars = int(os.getenv('MATRIX_CONTENT_MAX_CHARS', '4000'))
+        self.task_artifact_dir = os.getenv('TASK_ARTIFACT_DIR', 'claude_tasks')
+        
+        # 提示詞壓縮；過大的內容存成附件，與任務檔案一起上傳為 artifact
+        self.prompt_builder = PromptBuilder.from_env(os.path.join(self.task_artifact_dir, 'attachments'))
+        
+        # Project metadata 快取（欄位 ID 與水位線），避免每次執行都查詢欄位
+        self.project_cache_file = os.getenv('PROJECT_CACHE_FILE') or state_path('project_cache.json')
+        self.metadata_ttl = timedelta(hours=float(os.getenv('PROJECT_METADATA_TTL_HOURS', '24')))
+        self.project_cache = self._load_project_cache()
+        
+        # 優先使用快取的欄位資訊，需要時才向 GitHub 查詢
+        self._load_cached_project_fields()
+    
+    def _load_project_cache(self) -> Dict[str, Any]:
+        """載入 Project metadata 快取"""
+        try:
+            if os.path.exists(self.project_cache_file):
+                with open(self.project_cache_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 載入 Project 快取時發生錯誤: {str(e)}")
+        return {}
+    
+    def _save_project_cache(self):
+        """儲存 Project metadata 快取"""
+        try:
+            with open(self.project_cache_file, 'w', encoding='utf-8') as f:
+                json.dump(self.project_cache, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 儲存 Project 快取時發生錯誤: {str(e)}")
+    
+    def _load_cached_project_fields(self) -> bool:
+        """從快取載入 Project 欄位資訊，快取不存在或過期時回傳 False"""
+        fields = self.project_cache.get('project_fields')
+        if not fields:
+            return False
+        
+        try:
+            cached_at = datetime.fromisoformat(fields.get('cached_at', ''))
+        except ValueError:
+            return False
+        
+        if datetime.now() - cached_at > self.metadata_ttl:
+            return False
+        
+        self.project_id = fields.get('project_id')
+        self.status_field_id = fields.get('status_field_id')
+        self.review_option_id = fields.get('review_option_id')
+        self.backlog_option_id = fields.get('backlog_option_id')
+        return bool(self.project_id and self.status_field_id)
+    
+    def _ensure_project_fields(self):
+        """確保 Project 欄位資訊已載入，快取失效時才重新查詢"""
+        if self.project_id and self.status_field_id:
+            return
         self._initialize_project_fields()
     
     def _initialize_project_fields(self):
@@ -91,7 +190,8 @@ class GitHubProjectProcessor:
                 'projectNumber': self.project_number
             }
             
-            response = requests.post(
+            response = self.http.post(
+                'graphql_query',
                 self.graphql_url,
                 headers=self.headers,
                 json={'query': query, 'variables': variables}
@@ -123,6 +223,14 @@ class GitHubProjectProcessor:
             
             if self.project_id and self.status_field_id and self.review_option_id and self.backlog_option_id:
                 print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ✅ 成功獲取 Project 欄位資訊")
+                self.project_cache['project_fields'] = {
+                    'project_id': self.project_id,
+                    'status_field_id': self.status_field_id,
+                    'review_option_id': self.review_option_id,
+                    'backlog_option_id': self.backlog_option_id,
+                    'cached_at': datetime.now().isoformat()
+                }
+                self._save_project_cache()
             else:
                 print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 無法找到 Status 欄位或必要的選項 (Review/Backlog)")
                 
@@ -149,6 +257,24 @@ class GitHubProjectProcessor:
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 載入已處理項目時發生錯誤: {str(e)}")
             return {}
     
+    def load_processed_history(self):
+        """載入已移出 processed_items.json 的舊處理記錄（只在 KNOWN_ITEMS_MODE=compact 時使用）"""
+        if self.processed_history is None and os.getenv('KNOWN_ITEMS_MODE', 'exact').lower() == 'compact':
+            from project_monitor.known_items import known_item_set
+            path = self.processed_history_file
+            if not os.path.exists(path) and os.path.exists('processed_items.history.json'):
+                # 舊版放在工作目錄，下次儲存時改寫到狀態目錄
+                path = 'processed_items.history.json'
+            self.processed_history = known_item_set(recent_size=0).load(path)
+        return self.processed_history
+    
+    def is_processed(self, item_id: str, processed_items: Dict[str, datetime]) -> bool:
+        """item 是否已處理過（近 30 天的精確記錄或更早的歷史記錄）"""
+        if item_id in processed_items:
+            return True
+        history = self.load_processed_history()
+        return history is not None and item_id in history
+    
     def save_processed_items(self, processed_items: Dict[str, datetime]):
         """儲存已處理的 items 清單"""
         try:
@@ -160,6 +286,11 @@ class GitHubProjectProcessor:
                 if timestamp > cutoff_date
             }
             
+            history = self.load_processed_history()
+            if history is not None and len(cleaned_items) < len(processed_items):
+                history.update(item_id for item_id in processed_items if item_id not in cleaned_items)
+                history.save(self.processed_history_file)
+            
             # 將 datetime 物件轉換為字串
             data = {
                 item_id: timestamp.isoformat() 
@@ -175,58 +306,31 @@ class GitHubProjectProcessor:
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ❌ 儲存已處理項目時發生錯誤: {str(e)}")
     
     def get_project_items(self) -> Dict[str, Any]:
-        """透過 GraphQL API 獲取 Project 的所有 Items"""
+        """透過 GraphQL API 獲取 Project 的所有 Items（分頁，設定 SCAN_SHARDS 時平行分片掃描）"""
+        return self.scanner.scan()
+    
+    def probe_watermark(self) -> Optional[Dict[str, Any]]:
+        """
+        以單次輕量查詢取得 Project 目前的水位線
+        
+        只查詢 items 總數與最後一個 item 的 ID（新 item 預設加在最後），
+        並使用標準函式庫發送請求，快速路徑不需要載入 requests。
+        送出前一樣向共用速率限制取得 GraphQL 額度。
+        
+        Returns:
+            Optional[Dict[str, Any]]: 水位線資訊，查詢失敗時回傳 None
+        """
+        import urllib.request
+        
         query = """
         query($owner: String!, $repo: String!, $projectNumber: Int!) {
           repository(owner: $owner, name: $repo) {
             projectV2(number: $projectNumber) {
-              title
-              items(first: 100) {
+              items(last: 1) {
+                totalCount
                 nodes {
                   id
-                  createdAt
-                  updatedAt
-                  content {
-                    ... on Issue {
-                      title
-                      number
-                      state
-                      url
-                    }
-                    ... on PullRequest {
-                      title
-                      number
-                      state
-                      url
-                    }
-                    ... on DraftIssue {
-                      title
-                      body
-                    }
-                  }
-                  fieldValues(first: 10) {
-                    nodes {
-                      ... on ProjectV2ItemFieldTextValue {
-                        text
-                        field {
-                          ... on ProjectV2Field {
-                            name
-                          }
-                        }
-                      }
-                      ... on ProjectV2ItemFieldSingleSelectValue {
-                        name
-                        optionId
-                        field {
-                          ... on ProjectV2SingleSelectField {
-                            name
-                          }
-                        }
-                      }
-                    }
-                  }
                 }
-                totalCount
               }
             }
           }
@@ -239,21 +343,54 @@ class GitHubProjectProcessor:
             'projectNumber': self.project_number
         }
         
-        response = requests.post(
-            self.graphql_url,
-            headers=self.headers,
-            json={'query': query, 'variables': variables}
-        )
+        try:
+            self.http.acquire('graphql_query')
+            request = urllib.request.Request(
+                self.graphql_url,
+                data=json.dumps({'query': query, 'variables': variables}).encode('utf-8'),
+                headers={**self.headers, 'Content-Type': 'application/json'},
+                method='POST'
+            )
+            with urllib.request.urlopen(request, timeout=15) as response:
+                data = json.loads(response.read().decode('utf-8'))
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 水位線探測失敗，改為完整掃描: {str(e)}")
+            return None
         
-        if response.status_code != 200:
-            raise Exception(f"GraphQL query failed: {response.status_code} - {response.text}")
+        if 'errors' in data:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 水位線探測錯誤，改為完整掃描: {data['errors']}")
+            return None
         
-        data = response.json()
+        project = (data.get('data') or {}).get('repository', {}).get('projectV2') or {}
+        items = project.get('items') or {}
+        nodes = [node for node in items.get('nodes', []) if node]
+        last_item = nodes[-1] if nodes else {}
         
-        if 'errors' in data:
-            raise Exception(f"GraphQL errors: {data['errors']}")
+        return {
+            'total_count': items.get('totalCount', 0),
+            'last_item_id': last_item.get('id')
+        }
+    
+    def has_new_activity(self, watermark: Optional[Dict[str, Any]]) -> bool:
+        """
+        比對水位線判斷自上次執行後是否有新的變動
+        
+        Args:
+            watermark: probe_watermark() 取得的水位線
         
-        return data.get('data', {}).get('repository', {}).get('projectV2', {})
+        Returns:
+            bool: 是否需要執行完整處理流程
+        """
+        if watermark is None:
+            return True
+        return self.project_cache.get('watermark') != watermark
+    
+    def save_watermark(self, watermark: Optional[Dict[str, Any]]):
+        """在完整處理成功後記錄水位線"""
+        if watermark is None:
+            return
+        self.project_cache['watermark'] = watermark
+        self._save_project_cache()
     
     def _is_item_in_backlog(self, item: Dict[str, Any]) -> bool:
         """檢查 item 是否處於 Backlog 狀態"""
@@ -270,6 +407,7 @@ class GitHubProjectProcessor:
     
     def update_item_status(self, item_id: str, status: str = 'Review') -> bool:
         """更新 Project Item 的狀態"""
+        self._ensure_project_fields()
         if not all([self.project_id, self.status_field_id, self.review_option_id]):
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 缺少必要的 Project 欄位資訊，無法更新狀態")
             return False
@@ -303,7 +441,8 @@ class GitHubProjectProcessor:
                 'optionId': self.review_option_id
             }
             
-            response = requests.post(
+            response = self.http.post(
+                'graphql_mutation',
                 self.graphql_url,
                 headers=self.headers,
                 json={'query': mutation, 'variables': variables}
@@ -326,8 +465,18 @@ class GitHubProjectProcessor:
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ❌ 更新狀態時發生錯誤: {str(e)}")
             return False
     
-    def send_discord_notification(self, item: Dict[str, Any], new_item: bool = True, status_updated: bool = False):
-        """發送 Discord 通知"""
+    def send_discord_notification(self, item: Dict[str, Any], new_item: bool = True, status_updated: bool = False,
+                                  result: Optional[bool] = None, execution_time: str = None):
+        """
+        發送 Discord 通知
+        
+        Args:
+            item: Project Item 數據
+            new_item: 是否為新任務通知
+            status_updated: 狀態是否已更新
+            result: matrix job 的執行結果（None 表示不是結果通知）
+            execution_time: 執行時間
+        """
         if not self.discord_webhook_url:
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 未設置 Discord webhook URL，跳過通知")
             return
@@ -344,7 +493,9 @@ class GitHubProjectProcessor:
                     item_type = 'Draft Issue'
             
             # 建立 Discord Embed
-            if new_item:
+            if result is not None:
+                embed_title = "✅ 任務執行完成" if result else "❌ 任務執行失敗"
+            elif new_item:
                 embed_title = f"🆕 發現新的 Backlog 任務"
                 if status_updated:
                     embed_title += " (已加入處理佇列)"
@@ -354,7 +505,7 @@ class GitHubProjectProcessor:
             embed = {
                 "title": embed_title,
                 "description": f"**{item_type}:** {title}",
-                "color": 0x00ff00,
+                "color": 0x00ff00 if result is not False else 0xff0000,
                 "fields": [],
                 "timestamp": datetime.utcnow().isoformat(),
                 "footer": {
@@ -389,6 +540,13 @@ class GitHubProjectProcessor:
                     "inline": True
                 })
             
+            if execution_time:
+                embed["fields"].append({
+                    "name": "執行時間",
+                    "value": execution_time,
+                    "inline": True
+                })
+            
             # 如果有 body，加入預覽
             if 'body' in content and content.get('body'):
                 body_preview = content.get('body', '')[:200]
@@ -406,7 +564,8 @@ class GitHubProjectProcessor:
             }
             
             # 發送到 Discord
-            response = requests.post(
+            response = self.http.post(
+                'discord',
                 self.discord_webhook_url,
                 json=payload,
                 headers={'Content-Type': 'application/json'}
@@ -436,9 +595,17 @@ class GitHubProjectProcessor:
         else:
             return "無法提取任務內容"
     
-    def process_new_items(self) -> List[Dict[str, Any]]:
-        """處理新的 items，回傳需要由 Claude 處理的任務清單"""
+    def process_new_items(self, watermark: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        處理新的 items，回傳需要由 Claude 處理的任務清單
+        
+        Args:
+            watermark: 本次執行開始時探測到的水位線，處理成功後才會記錄
+        """
         try:
+            # 確保 Project 欄位資訊可用（快取失效時才查詢）
+            self._ensure_project_fields()
+            
             # 載入已處理的 items
             processed_items = self.load_processed_items()
             
@@ -454,10 +621,11 @@ class GitHubProjectProcessor:
             
             # 尋找新的 Backlog items
             new_backlog_items = []
+            deferred_count = 0
             
             for item_id, item in current_items.items():
                 # 跳過已處理的 items
-                if item_id in processed_items:
+                if self.is_processed(item_id, processed_items):
                     continue
                 
                 # 只處理 Backlog 狀態的 items
@@ -469,27 +637,44 @@ class GitHubProjectProcessor:
                 content = item.get('content', {})
                 title = content.get('title', 'No title')
                 
-                print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🆕 發現新的 Backlog Item: {title}")
-                
                 # 提取任務內容
                 task_content = self.extract_task_content(item)
+                task = {
+                    'item_id': item_id,
+                    'item_data': item,
+                    'task_content': task_content
+                }
+                
+                # 超出本次批次上限的任務不標記為已處理，留待下次執行
+                if task_content != "無法提取任務內容" and not self.batcher.can_add(new_backlog_items, task):
+                    deferred_count += 1
+                    continue
+                
+                print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🆕 發現新的 Backlog Item: {title}")
+                
                 if task_content and task_content != "無法提取任務內容":
-                    new_backlog_items.append({
-                        'item_id': item_id,
-                        'item_data': item,
-                        'task_content': task_content
-                    })
+                    # 任務在輸出檔案建立後才標記為已處理（見 mark_items_processed）
+                    new_backlog_items.append(task)
+                    created_ts = created_timestamp(item)
+                    now = time.time()
+                    self.events.emit(events.DETECTED, item_id, duration=now - created_ts if created_ts else None, ts=now)
                     
                     # 發送 Discord 通知
                     self.send_discord_notification(item, new_item=True)
                 else:
                     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️ 無法提取有效的任務內容，跳過處理")
-                
-                # 標記為已處理
-                processed_items[item_id] = datetime.now()
+                    processed_items[item_id] = datetime.now()
             
-            # 儲存處理狀態
+            # 儲存不需執行的 items；有延後的任務時不記錄水位線，確保下次執行會再掃描
             self.save_processed_items(processed_items)
+            if deferred_count:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⏳ {deferred_count} 個任務超出批次上限，留待下次執行")
+                self.pending_watermark = None
+            else:
+                self.pending_watermark = watermark
+            
+            if not new_backlog_items:
+                self.save_watermark(self.pending_watermark)
             
             if new_backlog_items:
                 print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 📋 共找到 {len(new_backlog_items)} 個新的待處理任務")
@@ -502,6 +687,22 @@ class GitHubProjectProcessor:
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ❌ 處理新項目時發生錯誤: {str(e)}")
             return []
     
+    def mark_items_processed(self, item_ids: List[str]):
+        """
+        在任務輸出完成後才將 items 標記為已處理，並記錄本次的水位線
+        
+        中途失敗時 items 不會被標記，下次執行會重新處理。
+        
+        Args:
+            item_ids: 已成功輸出的 item IDs
+        """
+        processed_items = self.load_processed_items()
+        for item_id in item_ids:
+            processed_items[item_id] = datetime.now()
+            self.events.emit(events.QUEUED, item_id)
+        self.save_processed_items(processed_items)
+        self.save_watermark(self.pending_watermark)
+    
     def create_task_output(self, tasks: List[Dict[str, Any]]) -> str:
         """建立任務輸出檔案供 GitHub Actions 使用"""
         if not tasks:
@@ -515,13 +716,124 @@ class GitHubProjectProcessor:
             summary = content[:100] + "..." if len(content) > 100 else content
             task_summaries.append(f"Task {i}: {summary}")
         
-        # 合併所有任務內容
-        all_tasks_content = "\n\n".join([
-            f"## Task {i}: {task['item_data'].get('content', {}).get('title', 'Untitled')}\n{task['task_content']}"
-            for i, task in enumerate(tasks, 1)
-        ])
+        # 合併所有任務內容（每個任務各自壓縮）
+        sections = []
+        raw_chars = 0
+        for i, task in enumerate(tasks, 1):
+            content = task['task_content']
+            raw_chars += len(content)
+            if self.prompt_builder.enabled:
+                content, _ = self.prompt_builder.compact_task(content)
+            sections.append(f"## Task {i}: {task['item_data'].get('content', {}).get('title', 'Untitled')}\n{content}")
+        all_tasks_content = "\n\n".join(sections)
         
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 📏 claude_tasks.txt: {raw_chars:,} → {len(all_tasks_content):,} 字元")
         return all_tasks_content
+    
+    def create_task_matrix(self, tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        將任務分組為 GitHub Actions job matrix 的項目
+        
+        每個項目包含 item IDs 與提示詞；任務數超過 matrix 上限時自動加大每個 job 的任務數。
+        
+        Args:
+            tasks: 任務清單
+        
+        Returns:
+            List[Dict[str, Any]]: matrix 項目（含完整提示詞與任務，寫入 artifact 前使用）
+        """
+        per_job = max(self.matrix_tasks_per_job, math.ceil(len(tasks) / MAX_MATRIX_JOBS))
+        entries = []
+        for start in range(0, len(tasks), per_job):
+            group = tasks[start:start + per_job]
+            titles = [task['item_data'].get('content', {}).get('title', 'Untitled') for task in group]
+            prompt, metrics = self.prompt_builder.build(group)
+            entries.append({
+                'id': f"task-{len(entries) + 1}",
+                'item_ids': [task['item_id'] for task in group],
+                'title': titles[0] if len(group) == 1 else f"{titles[0]} 等 {len(group)} 個任務",
+                'prompt': prompt,
+                'prompt_metrics': metrics,
+                'tasks': group
+            })
+            print(f"   📏 task-{len(entries)}: {format_prompt_metrics(metrics)}")
+        return entries
+    
+    def write_task_artifacts(self, entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        將每個 matrix 項目寫成獨立的任務檔案，並回傳要輸出到 GITHUB_OUTPUT 的 matrix
+        
+        每個項目產生 <id>.md（提示詞）與 <id>.json（item 資料，供回報結果使用），
+        上傳為 artifact 後各個 job 只需下載自己的檔案。提示詞過長時不內嵌在 matrix 中。
+        
+        Args:
+            entries: create_task_matrix() 的結果
+        
+        Returns:
+            Dict[str, Any]: {"include": [...]} 格式的 matrix
+        """
+        os.makedirs(self.task_artifact_dir, exist_ok=True)
+        include = []
+        for entry in entries:
+            prompt_file = os.path.join(self.task_artifact_dir, f"{entry['id']}.md")
+            item_file = os.path.join(self.task_artifact_dir, f"{entry['id']}.json")
+            with open(prompt_file, 'w', encoding='utf-8') as f:
+                f.write(entry['prompt'])
+            with open(item_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'id': entry['id'],
+                    'item_ids': entry['item_ids'],
+                    'items': [task['item_data'] for task in entry['tasks']]
+                }, f, ensure_ascii=False, indent=2)
+            
+            inline = len(entry['prompt']) <= self.matrix_content_max_chars
+            include.append({
+                'id': entry['id'],
+                'item_ids': ','.join(entry['item_ids']),
+                'title': entry['title'],
+                'task_count': len(entry['item_ids']),
+                'prompt_chars': len(entry['prompt']),
+                'prompt_file': prompt_file,
+                'item_file': item_file,
+                'content': entry['prompt'] if inline else ''
+            })
+        
+        matrix = {'include': include}
+        with open(os.path.join(self.task_artifact_dir, 'matrix.json'), 'w', encoding='utf-8') as f:
+            json.dump(matrix, f, ensure_ascii=False, indent=2)
+        return matrix
+    
+    def report_task_result(self, item_file: str, success: bool, execution_time: str = None):
+        """
+        由 matrix job 回報一個項目的執行結果，逐一通知其中的每個 item
+        
+        Args:
+            item_file: write_task_artifacts() 產生的 <id>.json
+            success: 是否執行成功
+            execution_time: 執行時間
+        """
+        with open(item_file, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        for item in entry.get('items', []):
+            self.events.emit(events.FINISHED, item.get('id'), duration=parse_execution_time(execution_time),
+                             outcome='succeeded' if success else 'failed')
+            title = item.get('content', {}).get('title', 'Untitled')
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {'✅' if success else '❌'} {entry['id']}: {title}")
+            self.send_discord_notification(item, new_item=False, result=success, execution_time=execution_time)
+
+
+def report_main(args: List[str]):
+    """
+    回報 matrix job 的執行結果
+    
+    用法: python scripts/process_project_items.py report <item_file> <success|failure> [執行時間]
+    """
+    if len(args) < 2 or args[1] not in ('success', 'failure'):
+        print("用法: python scripts/process_project_items.py report <item_file> <success|failure> [執行時間]")
+        exit(2)
+    
+    processor = GitHubProjectProcessor(owner='easylive1989', repo='ai_todo_app', project_number=5)
+    processor.report_task_result(args[0], args[1] == 'success', args[2] if len(args) > 2 else None)
 
 
 def main():
@@ -544,8 +856,23 @@ def main():
             project_number=project_number
         )
         
-        # 處理新的 items
-        new_tasks = processor.process_new_items()
+        # 快速路徑：先以單次輕量查詢判斷是否有新的 items
+        force_full_scan = os.getenv('FORCE_FULL_SCAN', 'false').lower() == 'true'
+        watermark = processor.probe_watermark()
+        startup_ms = (time.perf_counter() - _PROCESS_START) * 1000
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⏱️ 啟動至探測完成: {startup_ms:.0f} ms")
+        
+        github_output = os.getenv('GITHUB_OUTPUT')
+        if github_output:
+            with open(github_output, 'a', encoding='utf-8') as f:
+                f.write(f"startup_ms={startup_ms:.0f}\n")
+        
+        if not force_full_scan and not processor.has_new_activity(watermark):
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ✅ 水位線未變動，沒有新的 items")
+            new_tasks = []
+        else:
+            # 處理新的 items
+            new_tasks = processor.process_new_items(watermark)
         
         # 如果有新任務，建立輸出檔案給 GitHub Actions
         if new_tasks:
@@ -557,17 +884,28 @@ def main():
             
             print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 📝 已建立 claude_tasks.txt，包含 {len(new_tasks)} 個任務")
             
+            # 每個 matrix 項目一組任務檔案，讓 workflow 可以分散到多個 runner 平行執行
+            matrix = processor.write_task_artifacts(processor.create_task_matrix(new_tasks))
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🧩 已建立 {len(matrix['include'])} 個 matrix 項目於 {processor.task_artifact_dir}/")
+            
             # 設定 GitHub Actions 輸出
             github_output = os.getenv('GITHUB_OUTPUT')
             if github_output:
                 with open(github_output, 'a', encoding='utf-8') as f:
                     f.write(f"has_tasks=true\n")
                     f.write(f"task_count={len(new_tasks)}\n")
+                    f.write(f"matrix={json.dumps(matrix, ensure_ascii=False)}\n")
+            
+            # 任務已輸出，標記為已處理
+            processor.mark_items_processed([task['item_id'] for task in new_tasks])
             
             # 更新所有任務的狀態為 Review（表示已加入處理佇列）
             for task in new_tasks:
                 success = processor.update_item_status(task['item_id'])
                 if success:
+                    created_ts = created_timestamp(task['item_data'])
+                    processor.events.emit(events.STATUS_UPDATED, task['item_id'],
+                                          duration=time.time() - created_ts if created_ts else None)
                     # 發送狀態更新通知
                     processor.send_discord_notification(
                         task['item_data'], 
@@ -581,6 +919,7 @@ def main():
                 with open(github_output, 'a', encoding='utf-8') as f:
                     f.write(f"has_tasks=false\n")
                     f.write(f"task_count=0\n")
+                    f.write('matrix={"include":[]}\n')
         
         print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ✅ 處理完成")
         
@@ -593,9 +932,13 @@ def main():
             with open(github_output, 'a', encoding='utf-8') as f:
                 f.write(f"has_tasks=false\n")
                 f.write(f"task_count=0\n")
+                f.write('matrix={"include":[]}\n')
         
         exit(1)
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == 'report':
+        report_main(sys.argv[2:])
+    else:
+        main()
\ No newline at end of file